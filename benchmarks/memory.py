@@ -0,0 +1,163 @@
+"""Peak memory and parse throughput benchmarks for the DataFrame builders
+
+Each case generates a synthetic payload, then parses it in a fresh interpreter so the peak RSS
+reported covers only the response body, its JSON decode and the DataFrame build. The run fails
+(exit status 1) when a case exceeds its memory budget or falls below its throughput budget:
+
+    python -m benchmarks.memory --areas 2000 --occupations 200 --max-rss-mb 1500 --min-rows-per-second 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+    def json(self) -> dict:
+        return json.loads(self.content)
+
+
+class _NoCache:
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value) -> None:
+        pass
+
+
+def _offline_connection(content: bytes):
+    """A CoreLMIConnection whose every request answers with `content`, without any network access"""
+    from pyghtcast.coreLmi import CoreLMIConnection
+
+    class OfflineConnection(CoreLMIConnection):
+        def __init__(self) -> None:
+            # the parse is what is measured, so nothing may be served from the metadata cache
+            self.meta_cache = _NoCache()
+
+        def download_data(self, api_endpoint, payload=None, smart_limit=False):
+            return _Response(content)
+
+    return OfflineConnection()
+
+
+def child(kind: str, path: str) -> None:
+    """Runs inside the measuring interpreter and prints one JSON result line"""
+    import pandas  # noqa: F401  (imported before the baseline, as in a real process)
+
+    baseline = _rss_mb()
+    with open(path, "rb") as f:
+        content = f.read()
+
+    conn = _offline_connection(content)
+    start = time.perf_counter()
+    if kind == "post_retrieve_df":
+        df = conn.post_retrieve_df("emsi.us.occupation", {"metrics": []}, "2025.3")
+    else:
+        df = conn.get_dimension_hierarchy_df("emsi.us.occupation", "Occupation", "2025.3")
+    seconds = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "rows": len(df),
+                "columns": len(df.columns),
+                "payload_mb": round(len(content) / (1024 * 1024), 3),
+                "seconds": round(seconds, 6),
+                "rows_per_second": round(len(df) / seconds, 1) if seconds else None,
+                "peak_rss_mb": round(_rss_mb() - baseline, 3),
+            }
+        )
+    )
+
+
+def run_case(name: str, kind: str, payload: dict, max_rss_mb: float, min_rows_per_second: float) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        f.write(synthetic.to_json_bytes(payload))
+        path = f.name
+
+    try:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory", "--child", kind, path],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    finally:
+        os.unlink(path)
+
+    result = {"name": name, **json.loads(output.strip().splitlines()[-1])}
+    result["budget"] = {"max_rss_mb": max_rss_mb, "min_rows_per_second": min_rows_per_second}
+    result["within_budget"] = result["peak_rss_mb"] <= max_rss_mb and (result["rows_per_second"] or 0) >= (
+        min_rows_per_second
+    )
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--areas", type=int, default=500, help="ZIP areas in the data response")
+    parser.add_argument("--occupations", type=int, default=200, help="occupations in the data response")
+    parser.add_argument("--years", type=int, default=10, help="Jobs.<year> columns in the data response")
+    parser.add_argument("--leaves", type=int, default=50_000, help="leaf members in the hierarchy response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-rss-mb", type=float, default=1024, help="peak RSS budget per case")
+    parser.add_argument("--min-rows-per-second", type=float, default=50_000, help="parse throughput budget")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(*args.child)
+        return
+
+    cases = [
+        (
+            "post_retrieve_df",
+            "post_retrieve_df",
+            synthetic.column_response(
+                areas=args.areas, occupations=args.occupations, years=range(2024, 2024 + args.years), seed=args.seed
+            ),
+        ),
+        (
+            "get_dimension_hierarchy_df",
+            "hierarchy",
+            synthetic.hierarchy_response(leaves=args.leaves, seed=args.seed),
+        ),
+    ]
+    results = [
+        run_case(name, kind, payload, args.max_rss_mb, args.min_rows_per_second) for name, kind, payload in cases
+    ]
+
+    report = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if not all(result["within_budget"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Offline benchmark suite for pyghtcast
+
+Runs the client against the local stub server and writes one JSON document with a result per
+benchmark, so runs can be stored and compared between releases:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --latency 0.05 --rows 50000 --rate-limit-every 20
+
+With `--compare`, the run is checked against an earlier results file and the command exits 1 when
+a benchmark's throughput dropped by more than `--max-regression`:
+
+    python -m benchmarks.run --compare bench.json --max-regression 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+from benchmarks.stub_server import StubLightcastServer
+from pyghtcast.exceptions import RateLimitError
+
+QUERY = {
+    "metrics": [{"name": f"Jobs.{year}"} for year in range(2013, 2034)],
+    "constraints": [
+        {"dimensionName": "Area", "mapLevel": {"level": 4, "predicate": ["48113"]}},
+        {"dimensionName": "Occupation", "mapLevel": {"level": 5, "predicate": ["00-0000"]}},
+    ],
+}
+
+JOB_POSTING = (
+    "We are hiring a data analyst with Python SQL pandas Tableau statistics and communication skills "
+    "to build dashboards forecasting models and reports for regional labor market research"
+)
+
+
+def measure(name: str, fn: Callable[[], object], iterations: int, items_per_call: int = 1, **extra) -> dict:
+    """
+    Times `iterations` calls of `fn` and summarizes the latency distribution.
+    A call completes `items_per_call` items, unless it returns how many it completed (e.g. a batch whose
+    requests were partly rate limited). Calls that end in a 429 are counted as rate limited and complete
+    nothing; the throughput counts completed items only.
+    """
+    latencies = []
+    rate_limited = 0
+    completed = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        try:
+            done = fn()
+        except RateLimitError:
+            rate_limited += 1
+        else:
+            completed += done if isinstance(done, int) else items_per_call
+        latencies.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "rate_limited_calls": rate_limited,
+        "completed_items": completed,
+        "total_seconds": round(total, 6),
+        "throughput_per_second": round(completed / total, 3) if total else None,
+        "latency_ms": {
+            "min": round(latencies[0] * 1000, 3),
+            "p50": round(statistics.median(latencies) * 1000, 3),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        **extra,
+    }
+
+
+def bench_post_retrieve_df(stub: StubLightcastServer, iterations: int) -> dict:
+    conn = stub.core_lmi_connection()
+    return measure(
+        "post_retrieve_df",
+        lambda: conn.post_retrieve_df("emsi.us.occupation", QUERY, "2025.3"),
+        iterations,
+        items_per_call=stub.rows,
+        unit="rows",
+    )
+
+
+def bench_hierarchy(stub: StubLightcastServer, iterations: int) -> dict:
+    conn = stub.core_lmi_connection()
+
+    def fetch():
+        # measure the fetch and parse, not the metadata cache
+        conn.meta_cache.clear()
+        return conn.get_dimension_hierarchy_df("emsi.us.occupation", "Occupation", "2025.3")
+
+    return measure("hierarchy_fetch", fetch, iterations, items_per_call=stub.rows, unit="rows")
+
+
+def bench_batch_extract(stub: StubLightcastServer, iterations: int, batch_size: int = 32, workers: int = 8) -> dict:
+    conn = stub.skills_connection()
+
+    def extract(document: str) -> int:
+        try:
+            conn.post_extract(document)
+        except RateLimitError:
+            return 0
+        return 1
+
+    def extract_batch():
+        # one 429 in the batch only loses its own document, not the whole batch's
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return sum(executor.map(extract, [JOB_POSTING] * batch_size))
+
+    return measure(
+        "batch_extract",
+        extract_batch,
+        iterations,
+        items_per_call=batch_size,
+        unit="documents",
+        batch_size=batch_size,
+        workers=workers,
+    )
+
+
+def bench_cli_startup(iterations: int) -> dict:
+    command = [sys.executable, "-m", "pyghtcast.cli", "--help"]
+    return measure(
+        "cli_startup",
+        lambda: subprocess.run(command, check=True, capture_output=True),
+        iterations,
+        unit="invocations",
+    )
+
+
+def run(latency: float, rows: int, rate_limit_every: int, iterations: int) -> dict:
+    results = []
+    with StubLightcastServer(latency=latency, rows=rows, rate_limit_every=rate_limit_every) as stub:
+        for bench in (bench_post_retrieve_df, bench_hierarchy, bench_batch_extract):
+            before = stub.rate_limited
+            result = bench(stub, iterations)
+            result["rate_limited_responses"] = stub.rate_limited - before
+            results.append(result)
+
+    results.append(bench_cli_startup(iterations))
+
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "latency_seconds": latency,
+            "rows": rows,
+            "rate_limit_every": rate_limit_every,
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[str]:
+    """
+    Benchmarks whose throughput fell by more than `max_regression` (0.2 = 20%) since `baseline`.
+
+    Args:
+        baseline (dict): an earlier report from `run`
+        current (dict): the new report
+        max_regression (float): the largest tolerated relative drop in throughput
+
+    Returns:
+        list: one message per regressed benchmark (empty if none regressed)
+    """
+    before = {result["name"]: result.get("throughput_per_second") for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        old, new = before.get(result["name"]), result.get("throughput_per_second")
+        if not old or new is None:
+            continue
+        change = new / old - 1
+        if change < -max_regression:
+            regressions.append(f"{result['name']}: {old:g} -> {new:g} per second ({change:+.1%})")
+
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per request in seconds")
+    parser.add_argument("--rows", type=int, default=10_000, help="rows per data response / hierarchy leaves")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--iterations", type=int, default=10, help="timed calls per benchmark")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="an earlier results file to check this run against")
+    parser.add_argument(
+        "--max-regression", type=float, default=0.2, help="tolerated drop in throughput with --compare (default: 0.2)"
+    )
+    args = parser.parse_args(argv)
+
+    # the 429s a --rate-limit-every run provokes are counted in the results, not logged one by one
+    logging.getLogger("pyghtcast").setLevel(logging.ERROR)
+    results = run(args.latency, args.rows, args.rate_limit_every, args.iterations)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.max_regression)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
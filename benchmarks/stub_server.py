@@ -0,0 +1,202 @@
+"""A local stand-in for the Lightcast auth, Core LMI (Agnitio) and skills APIs
+
+The stub answers with correctly shaped payloads of a configurable size, after a configurable
+delay, and can answer every Nth request with a 429, so the client can be benchmarked without
+network access or credentials.
+
+Usage:
+
+    with StubLightcastServer(latency=0.05, rows=10_000) as stub:
+        conn = stub.core_lmi_connection()
+        conn.post_retrieve_df("emsi.us.occupation", payload, "2025.3")
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from benchmarks import synthetic
+
+
+def data_payload(query: dict, rows: int) -> dict:
+    """An Agnitio column response for the query's constraints (dimensions) and metrics"""
+    columns = []
+    for constraint in query.get("constraints", []):
+        name = constraint["dimensionName"]
+        columns.append({"name": name, "rows": [f"{name[:3].upper()}{i % 997:05d}" for i in range(rows)]})
+    for metric in query.get("metrics", []):
+        columns.append({"name": metric["name"], "rows": [float(i % 1000) + 0.5 for i in range(rows)]})
+
+    return {"data": columns}
+
+
+def extract_payload(text: str) -> dict:
+    words = text.split()[:20]
+    return {
+        "data": [
+            {
+                "skill": {"id": f"KS{i:06d}", "name": word, "type": {"id": "ST1", "name": "Specialized Skill"}},
+                "confidence": 1.0,
+            }
+            for i, word in enumerate(words)
+        ]
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _StubHTTPServer
+    # keep-alive, so the client's connection pooling is exercised like it is against the real API
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length)
+
+    def _route(self, method: str) -> None:
+        stub = self.server.stub
+        body = self._body()
+        path = urlparse(self.path).path.strip("/").split("/")
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if path == ["connect", "token"]:
+            self._reply(200, {"access_token": "stub-token", "expires_in": 3600, "token_type": "Bearer"})
+            return
+
+        if stub.count_request():
+            self._reply(429, {"errors": [{"status": 429, "title": "Too Many Requests"}]}, {"Retry-After": "1"})
+            return
+
+        if path[0] == "agnitio":
+            self._agnitio(method, path[1:], body)
+        elif path[0] == "skills" and path[-1] == "extract" and method == "POST":
+            self._reply(200, extract_payload(json.loads(body).get("text", "")))
+        else:
+            self._reply(404, {"errors": [{"status": 404, "title": "Not Found"}]})
+
+    def _agnitio(self, method: str, path: list, body: bytes) -> None:
+        stub = self.server.stub
+        if path == ["status"]:
+            self._reply(200, {"data": {"message": "Service is healthy", "healthy": True}})
+        elif path == ["meta"] or path == ["meta", "definitions"]:
+            self._reply(200, {"datasets": [{"name": "emsi.us.occupation", "versions": ["2025.3", "2025.2"]}]})
+        elif path[0] == "meta" and len(path) == 4:
+            self._reply(
+                200,
+                {
+                    "dimensions": [{"name": "Area"}, {"name": "Occupation"}],
+                    "metrics": [{"name": f"Jobs.{year}"} for year in range(2001, 2035)],
+                },
+            )
+        elif path[0] == "meta" and len(path) == 5:
+            self._reply(200, synthetic.hierarchy_response(leaves=stub.rows))
+        elif method == "POST" and len(path) == 2:
+            self._reply(200, data_payload(json.loads(body), stub.rows))
+        else:
+            self._reply(404, {"errors": [{"status": 404, "title": "Not Found"}]})
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: StubLightcastServer
+
+
+class StubLightcastServer:
+    """Runs the stub API on a free localhost port in a background thread
+
+    Attributes:
+        latency (float): seconds to wait before answering each request
+        rows (int): rows per data column and leaves per hierarchy
+        rate_limit_every (int): answer every Nth API request with a 429 (0 disables)
+        requests (int): API requests received so far (token requests excluded)
+        rate_limited (int): requests answered with a 429 so far
+    """
+
+    def __init__(self, latency: float = 0.0, rows: int = 1000, rate_limit_every: int = 0) -> None:
+        self.latency = latency
+        self.rows = rows
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._server: _StubHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count_request(self) -> bool:
+        """Counts an API request and returns True if it should be rate limited"""
+        with self._lock:
+            self.requests += 1
+            limited = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited += 1
+            return limited
+
+    def start(self) -> StubLightcastServer:
+        self._server = _StubHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> StubLightcastServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def core_lmi_connection(self):
+        """A CoreLMIConnection pointed at the stub"""
+        from pyghtcast.coreLmi import CoreLMIConnection
+
+        stub_class = type(
+            "StubCoreLMIConnection",
+            (CoreLMIConnection,),
+            {"auth_url": self.url + "connect/token", "base_url": self.url + "agnitio/"},
+        )
+        return stub_class("stub-user", "stub-pass")
+
+    def skills_connection(self):
+        """A SkillsClassificationConnection pointed at the stub"""
+        from pyghtcast.openSkills import SkillsClassificationConnection
+
+        stub_class = type(
+            "StubSkillsConnection",
+            (SkillsClassificationConnection,),
+            {"auth_url": self.url + "connect/token", "base_url": self.url + "skills/"},
+        )
+        return stub_class("stub-user", "stub-pass")
@@ -0,0 +1,113 @@
+"""Deterministic generator of large, Agnitio-shaped responses
+
+Produces data responses (``{"data": [{"name": ..., "rows": [...]}]}``) for an Area x Occupation
+cross product with one column per metric-year, and dimension hierarchies, at any scale. The same
+arguments and seed always produce the same payload, and no production data is involved.
+
+The full US scale is every ZIP code x every detailed SOC code x 10 years:
+
+    column_response(areas=US_ZIP_COUNT, occupations=SOC_DETAILED_COUNT, years=range(2024, 2034))
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from collections.abc import Iterable
+
+# roughly the number of US ZIP codes and of detailed (6-digit) 2018 SOC occupations
+US_ZIP_COUNT = 41_000
+SOC_DETAILED_COUNT = 867
+
+# 2018 SOC major groups
+SOC_MAJOR_GROUPS = [11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31, 33, 35, 37, 39, 41, 43, 45, 47, 49, 51, 53, 55]
+
+
+def zip_codes(count: int) -> list[str]:
+    """`count` distinct ZIP area codes spread over the 5-digit range, in the API's "ZIP" prefixed form"""
+    step = max((99_999 - 501) // max(count, 1), 1)
+    return [f"ZIP{501 + i * step:05d}" for i in range(count)]
+
+
+def soc_codes(count: int) -> list[str]:
+    """`count` distinct detailed SOC codes, spread over the major groups"""
+    per_group = -(-count // len(SOC_MAJOR_GROUPS))
+    codes = [f"{group}-{1011 + i * 10:04d}" for group in SOC_MAJOR_GROUPS for i in range(per_group)]
+    return codes[:count]
+
+
+def column_response(
+    areas: int = 100,
+    occupations: int = 50,
+    metrics: Iterable[str] = ("Jobs",),
+    years: Iterable[int] = range(2024, 2034),
+    seed: int = 0,
+) -> dict:
+    """
+    An Agnitio data response covering every Area x Occupation pair.
+
+    Args:
+        areas (int, optional): the number of ZIP areas
+        occupations (int, optional): the number of detailed occupations
+        metrics (iterable, optional): metric names, each requested for every year
+        years (iterable, optional): the years to generate `Metric.Year` columns for
+        seed (int, optional): seed for the metric values
+
+    Returns:
+        dict: {"data": [{"name": ..., "rows": [...]}, ...]} with areas * occupations rows
+    """
+    rng = random.Random(seed)
+    area_values = zip_codes(areas)
+    occupation_values = soc_codes(occupations)
+    rows = areas * occupations
+
+    columns = [
+        {"name": "Area", "rows": [area for area in area_values for _ in range(occupations)]},
+        {"name": "Occupation", "rows": occupation_values * areas},
+    ]
+    for metric in metrics:
+        for year in years:
+            columns.append({"name": f"{metric}.{year}", "rows": [round(rng.random() * 1000, 4) for _ in range(rows)]})
+
+    return {"data": columns}
+
+
+def hierarchy_response(leaves: int = 1000, fanout: int = 10, depth: int = 4, seed: int = 0) -> dict:
+    """
+    A dimension hierarchy with `depth` levels below the root, ending in `leaves` leaf members.
+
+    Args:
+        leaves (int, optional): the number of members on the deepest level
+        fanout (int, optional): the maximum number of children per member on the levels above the leaves
+        depth (int, optional): the number of levels below the root
+        seed (int, optional): seed for the member names
+
+    Returns:
+        dict: {"hierarchy": [{"child", "parent", "name", "level_name", "display_id"}, ...]}
+    """
+    rng = random.Random(seed)
+    words = ["Analysts", "Managers", "Technicians", "Workers", "Specialists", "Operators", "Assistants", "Engineers"]
+
+    hierarchy = [{"child": "0", "parent": "0", "name": "All", "level_name": "1", "display_id": "0"}]
+    parents = ["0"]
+    for level in range(1, depth + 1):
+        count = leaves if level == depth else min(leaves, fanout**level)
+        level_ids = [f"{level}-{i:07d}" for i in range(count)]
+        for i, member in enumerate(level_ids):
+            hierarchy.append(
+                {
+                    "child": member,
+                    "parent": parents[i * len(parents) // count],
+                    "name": f"{rng.choice(words)} {member}",
+                    "level_name": str(level + 1),
+                    "display_id": member,
+                }
+            )
+        parents = level_ids
+
+    return {"hierarchy": hierarchy}
+
+
+def to_json_bytes(payload: dict) -> bytes:
+    """The payload serialized the way the API sends it"""
+    return json.dumps(payload, separators=(",", ":")).encode()
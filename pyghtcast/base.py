@@ -1,10 +1,41 @@
 """Summary"""
 
+import json
+import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
 import pandas as pd
 import requests
 
+from . import metrics
+from .cache import SingleFlight, TaxonomyCache
+from .exceptions import AuthenticationError, check_response, is_success, truncate
+from .logs import log_failed_response
+from .transfer import ACCEPT_ENCODING, TransferStats, read_raw
+
+logger = logging.getLogger(__name__)
+
+
+def share_json(response: requests.Response) -> requests.Response:
+    """
+    Makes `response.json()` decode the body once and hand the same object to every caller, for a response
+    shared between coalesced requests. Callers must treat the decoded payload as read-only.
+    """
+    decode = response.json
+    lock = threading.Lock()
+    decoded = []
+
+    def json(**kwargs):
+        with lock:
+            if not decoded:
+                decoded.append(decode(**kwargs))
+        return decoded[0]
+
+    response.json = json
+    return response
+
 
 class Token:
     def __init__(self, token):
@@ -23,21 +54,32 @@ class EmsiBaseConnection:
         username (str): the client_id for accessing the API
         password (str): the client_secret for accessing the API
         scope (str): the scope for requesting an auth token from the API
+        auth_url (str): the OAuth endpoint tokens are requested from
     """
 
+    auth_url = "https://auth.emsicloud.com/connect/token"
+
     def __init__(self, username, password) -> None:
         """
         Parses the username and password from the permissions
         """
         self.username, self.password = username, password
+        self.token = None
+        self.token_lock = threading.Lock()
+        self.taxonomy_cache = TaxonomyCache()
+        self.in_flight = SingleFlight()
+        self.transfer_stats = TransferStats(type(self).__name__)
+
+        # one session per connection, so keep-alive connections are pooled and reused across requests
+        self.session = requests.Session()
 
     def get_new_token(self) -> None:
         """Creates a new access token for connecting to the API
 
         Raises:
-            ValueError: Raises an error if you don't have permission to access the given API
+            AuthenticationError: if the auth server rejects the credentials (a ValueError, as before)
         """
-        url = "https://auth.emsicloud.com/connect/token"
+        url = self.auth_url
 
         payload = {
             "grant_type": "client_credentials",
@@ -48,37 +90,60 @@ class EmsiBaseConnection:
 
         headers = {"content-type": "application/x-www-form-urlencoded"}
 
-        response = requests.request("POST", url, data=payload, headers=headers)
+        response = self.session.request("POST", url, data=payload, headers=headers)
 
-        # prints the error, if there is one
-        if response.status_code != 200:
-            print(response.text)
-            print(response.status_code)
+        metrics.count_token_refresh(type(self).__name__, "ok" if is_success(response) else "rejected")
+        if not is_success(response):
+            # the body is logged at DEBUG only: it answers a request that carried the client secret
+            logger.warning("Token request for %s was rejected with status %s", self.username, response.status_code)
+            logger.debug("Token response body: %s", truncate(response.text))
 
-            raise ValueError("Looks like you don't have access to this dataset with those credentials")
+            raise AuthenticationError(
+                "Looks like you don't have access to this dataset with those credentials",
+                status_code=response.status_code,
+                url=url,
+            )
 
         # self.token = response.json()['access_token']
 
         self.token = Token(response.json()["access_token"])
 
-    def get_data(self, url: str, querystring: dict = None) -> requests.Response:
+    def ensure_token(self) -> None:
+        """
+        Requests a token if there is none or it has expired. Threads sharing the connection wait for the
+        first one's request instead of each sending their own.
+        """
+        if self.token is not None and not self.token.is_expired():
+            return
+
+        with self.token_lock:
+            if self.token is None or self.token.is_expired():
+                self.get_new_token()
+
+    def get_data(self, url: str, querystring: dict = None, stream: bool = False) -> requests.Response:
         """
         Makes a GET request to the API, given the URL and any querystring parameters.
 
         Args:
             url (str): the url for the query
             querystring (dict, optional): any additional url parameters to pass to the API
+            stream (bool, optional): leave the body unread, for `transfer.read_raw`
 
         Returns:
             requests.Response: the response from the API
         """
         headers = {
             "content-type": "application/json",
+            "accept-encoding": ACCEPT_ENCODING,
             "authorization": f"Bearer {self.token.token}",
         }
 
+        started = time.perf_counter()
         # added timeout = None - some meta requests from Core LMI are taking a long time to fulfill
-        response = requests.get(url, headers=headers, params=querystring, timeout=None)
+        response = self.session.get(url, headers=headers, params=querystring, timeout=None, stream=stream)
+        self.record_request(url, response, started)
+        if not stream:
+            self.transfer_stats.record_response(response)
 
         # if response.status_code == 401:
         #     self.get_new_token()
@@ -86,7 +151,7 @@ class EmsiBaseConnection:
 
         return response
 
-    def post_data(self, url: str, payload: dict, querystring: dict = None) -> requests.Response:
+    def post_data(self, url: str, payload: dict, querystring: dict = None, stream: bool = False) -> requests.Response:
         """
         Makes a POST request to the API, given the url and payload (querystring optional)
 
@@ -94,20 +159,26 @@ class EmsiBaseConnection:
             url (str): the url for the query
             payload (dict or str): a json object to be sent to the payload
             querystring (dict, optional): any additional url parameters to pass to the API
+            stream (bool, optional): leave the body unread, for `transfer.read_raw`
 
         Returns:
             requests.Response: the response from the API
         """
         headers = {
             "content-type": "application/json",
+            "accept-encoding": ACCEPT_ENCODING,
             "authorization": f"Bearer {self.token.token}",
         }
 
+        started = time.perf_counter()
         # allows for users to pass in a string as the payload (yes, even though it is documented as a dict)
         if isinstance(payload, str):
-            response = requests.post(url, headers=headers, data=payload, params=querystring)
+            response = self.session.post(url, headers=headers, data=payload, params=querystring, stream=stream)
         else:
-            response = requests.post(url, headers=headers, json=payload, params=querystring)
+            response = self.session.post(url, headers=headers, json=payload, params=querystring, stream=stream)
+        self.record_request(url, response, started)
+        if not stream:
+            self.transfer_stats.record_response(response)
 
         # if response.status_code == 401:
         #     self.get_new_token()
@@ -115,11 +186,21 @@ class EmsiBaseConnection:
 
         return response
 
+    def record_request(self, url: str, response: requests.Response, started: float) -> None:
+        """Records a request's status and latency in `metrics` (a no-op while metrics are disabled)"""
+        if metrics.registry() is None:
+            return
+
+        endpoint = url[len(self.base_url) :] if url.startswith(self.base_url) else url
+        metrics.observe_request(type(self).__name__, endpoint, response.status_code, time.perf_counter() - started)
+
     def download_data(self, api_endpoint: str, payload: dict = None, querystring: dict = None) -> requests.Response:
         """
         Handles constructing the api_endpoint with the base url
         If the payload is None, we assume this should be a GET request (how Emsi's APIs function)
         If the payload is not None, we make a POST request instead.
+        Identical requests made at the same time (e.g. from several threads) share one response, and its
+        JSON is decoded once for all of them, so treat the decoded payload as read-only.
 
         Args:
             api_endpoint (TYPE): the API url endpoint to query from
@@ -128,21 +209,81 @@ class EmsiBaseConnection:
 
         Returns:
             requests.Response: the response from the API
+
+        Raises:
+            APIError: if the API answers with an error status (AuthenticationError, RateLimitError or APIError)
         """
-        if self.token.is_expired():
-            self.get_new_token()
+        self.ensure_token()
 
         url = self.base_url + api_endpoint
-        if payload is None:
-            response = self.get_data(url, querystring)
 
+        def send() -> requests.Response:
+            if payload is None:
+                return share_json(self.get_data(url, querystring))
+
+            return share_json(self.post_data(url, payload, querystring))
+
+        response = self.in_flight.do(self.request_key(url, payload, querystring), send)
+
+        if not is_success(response):
+            log_failed_response(logger, response, url, payload, endpoint=api_endpoint)
+
+        return check_response(response, url)
+
+    def download_raw(
+        self,
+        api_endpoint: str,
+        payload: dict = None,
+        querystring: dict = None,
+        path: str = None,
+        decode_content: bool = True,
+    ) -> bytes | int:
+        """
+        Like `download_data`, but returns the response body as bytes (or streams it into a file) instead of
+        a response to decode, e.g. to persist a large pull as-is. Raw requests are never shared between callers.
+
+        Args:
+            api_endpoint (str): the API url endpoint to query from
+            payload (dict or str, optional): a json object to be sent to the payload (GET if omitted)
+            querystring (dict, optional): any additional url parameters to pass to the API
+            path (str, optional): write the body to this file instead of returning it
+            decode_content (bool, optional): if False, keep the body as sent over the wire (e.g. gzipped)
+
+        Returns:
+            bytes | int: the body, or the number of bytes written to `path`
+
+        Raises:
+            APIError: if the API does not answer with a success
+        """
+        self.ensure_token()
+
+        url = self.base_url + api_endpoint
+        if payload is None:
+            response = self.get_data(url, querystring, stream=True)
         else:
-            response = self.post_data(url, payload, querystring)
+            response = self.post_data(url, payload, querystring, stream=True)
 
-        if response.status_code != 200:
-            print(response.text)
+        return read_raw(response, path, decode_content, stats=self.transfer_stats)
 
-        return response
+    def request_key(self, url: str, payload: dict = None, querystring: dict = None) -> tuple:
+        """
+        Identifies a request by method, url, payload and querystring, independent of key order,
+        so that identical requests made at the same time can share a single response.
+
+        Args:
+            url (str): the url for the query
+            payload (dict or str, optional): the json payload (None for a GET request)
+            querystring (dict, optional): any additional url parameters
+
+        Returns:
+            tuple: a hashable key for the request
+        """
+        method = "GET" if payload is None else "POST"
+        if payload is not None and not isinstance(payload, str):
+            payload = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        params = tuple(sorted((str(k), str(v)) for k, v in (querystring or {}).items()))
+
+        return method, url, payload, params
 
     def get_status(self) -> str:
         """
@@ -181,18 +322,54 @@ class EmsiBaseConnection:
         response = self.download_data("docs")
         return response.text
 
+    def search_taxonomy(self, facet: str, q: str = None, querystring: dict = None) -> list:
+        """
+        Searches a taxonomy facet through the autocomplete cache.
+        Repeated searches, and (with `autocomplete=true`) longer prefixes of a search that returned every match,
+        are answered locally; identical searches running at the same time share a single request.
+
+        Args:
+            facet (str): Which taxonomy to search for ID/name suggestions
+            q (str, optional): A query string of whole or partial keywords to search for
+            querystring (dict, optional): additional url parameters to pass to the API (e.g. {"autocomplete": "true"})
+
+        Returns:
+            list: the data response from the API
+        """
+        # copy so that the caller's dict is never mutated
+        querystring = dict(querystring or {})
+        querystring["q"] = q
+
+        def fetch() -> list:
+            response = self.download_data(f"taxonomies/{facet}", querystring=querystring)
+            return response.json()["data"]
+
+        return self.taxonomy_cache.search(facet, q, querystring, fetch)
+
 
 class JobPostingsConnection(EmsiBaseConnection):
     """Class for handling connections to APIs built on Emsi's postings data
 
-    Deleted Attributes:
+    Attributes:
         base_url (str): the base url that is built off for each request
         scope (str): the scope used in the request for a token (in the Base class above)
         token (str): the token used in the request for data
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    base_url = "https://emsiservices.com/jpa/"
+
+    def __init__(self, username, password, authenticate: bool = True) -> None:
+        """
+        Args:
+            username (str): the client_id for accessing the API
+            password (str): the client_secret for accessing the API
+            authenticate (bool, optional): request a token now; if False, the first request that needs one does
+        """
+        super().__init__(username, password)
+        self.scope = "postings:us"
+
+        if authenticate:
+            self.get_new_token()
 
     def post_totals(self, payload: dict, querystring: dict = None) -> dict:
         """
@@ -254,11 +431,7 @@ class JobPostingsConnection(EmsiBaseConnection):
             querystring=querystring,
         )
 
-        try:
-            return response.json()["data"]
-        except Exception:
-            print(response.text)
-            return response.json()["data"]
+        return response.json()["data"]
 
     def post_rankings(self, facet: str, payload: dict, querystring: dict = None) -> dict:
         """
@@ -365,6 +538,7 @@ class JobPostingsConnection(EmsiBaseConnection):
         """
         Get a list of current available taxonomy facets.
         If `q` parameter is used, will search taxonomies using either whole keywords (relevance search) or partial keywords (autocomplete).
+        Searches go through `search_taxonomy`, so repeated keystrokes are answered from the autocomplete cache.
 
         Args:
             facet (str, optional): Which taxonomy to search for ID/name suggestions (Cities will always have a null ID, and cannot be listed without a q query parameter).
@@ -376,16 +550,9 @@ class JobPostingsConnection(EmsiBaseConnection):
         """
         if facet is None:
             response = self.download_data("taxonomies")
-        else:
-            api_endpoint = f"taxonomies/{facet}"
-            if querystring is None:
-                querystring = {"q": q}
-            else:
-                querystring["q"] = q
+            return response.json()["data"]
 
-            response = self.download_data(api_endpoint, querystring=querystring)
-
-        return response.json()["data"]
+        return self.search_taxonomy(facet, q, querystring)
 
     def post_taxonomies(self, facet: str, payload: dict, querystring: dict = None) -> dict:
         """
@@ -461,14 +628,26 @@ class ProfilesConnection(EmsiBaseConnection):
     About the data
     Profiles are collected from various sources and processed/enriched to provide information such as standardized company name, occupation, skills, and geography.
 
-    Deleted Attributes:
+    Attributes:
         base_url (str): the beginning of the url for routing purposes (e.g. "https://emsiservices.com/profiles/")
         scope (str): the scope for requesting an auth token from the API
         token (str): the authentication token for accessing the given API
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    base_url = "https://emsiservices.com/profiles/"
+
+    def __init__(self, username, password, authenticate: bool = True) -> None:
+        """
+        Args:
+            username (str): the client_id for accessing the API
+            password (str): the client_secret for accessing the API
+            authenticate (bool, optional): request a token now; if False, the first request that needs one does
+        """
+        super().__init__(username, password)
+        self.scope = "profiles:us"
+
+        if authenticate:
+            self.get_new_token()
 
     def post_totals(self, payload: dict, querystring: dict = None) -> dict:
         """Get summary metrics on all profiles matching the filters.
@@ -525,6 +704,7 @@ class ProfilesConnection(EmsiBaseConnection):
         Search taxonomies using either whole keywords (relevance search) or partial keywords (autocomplete), or list taxonomy items.
         Get a list of current available taxonomy facets.
         Search taxonomies using either whole keywords (relevance search) or partial keywords (autocomplete).
+        Searches go through `search_taxonomy`, so repeated keystrokes are answered from the autocomplete cache.
 
         Args:
             facet (str, optional): Which taxonomy to search for ID/name suggestions (Cities will always have a null ID, and cannot be listed without a q query parameter).
@@ -535,16 +715,9 @@ class ProfilesConnection(EmsiBaseConnection):
         """
         if facet is None:
             response = self.download_data("taxonomies")
-        else:
-            api_endpoint = f"taxonomies/{facet}"
-            if querystring is None:
-                querystring = {"q": q}
-            else:
-                querystring["q"] = q
-
-            response = self.download_data(api_endpoint, querystring=querystring)
+            return response.json()["data"]
 
-        return response.json()["data"]
+        return self.search_taxonomy(facet, q, querystring)
 
     def post_taxonomies(self, facet: str, payload: dict, querystring: dict = None) -> dict:
         """Lookup taxonomy items by ID.
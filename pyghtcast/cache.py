@@ -0,0 +1,275 @@
+"""In-process caching helpers shared by the API connections"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+from urllib.parse import quote
+
+from . import metrics
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used cache
+
+    Attributes:
+        maxsize (int): the maximum number of entries kept before the oldest is evicted
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> list:
+        """Snapshot of the cached entries, most recently used last"""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class MetaCache(LRUCache):
+    """An LRUCache for JSON responses that can also persist them as files in a directory
+
+    With a directory, entries survive the process: a new connection (e.g. the next CLI command) finds them on disk.
+    Entries older than `max_age` seconds, in memory or on disk, are ignored, so listings that change when new
+    dataruns are published are eventually fetched again. `max_ages` gives such listings a shorter lifetime.
+
+    Attributes:
+        directory (str): where entries are persisted (memory only if None)
+        max_age (float): seconds an entry stays valid (forever if None)
+        max_ages (dict): key -> seconds, overriding `max_age` for those keys
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        directory: str | None = None,
+        max_age: float | None = None,
+        max_ages: dict | None = None,
+    ) -> None:
+        super().__init__(maxsize)
+        self.directory = directory
+        self.max_age = max_age
+        self.max_ages = dict(max_ages or {})
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, quote(str(key), safe="") + ".json")
+
+    def _fresh(self, key: Hashable, stored_at: float) -> bool:
+        max_age = self.max_ages.get(key, self.max_age)
+        return max_age is None or time.time() - stored_at <= max_age
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        # entries are kept in memory as (value, time stored)
+        entry = super().get(key)
+        if entry is not None and self._fresh(key, entry[1]):
+            return entry[0]
+        if self.directory is None:
+            return default
+
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if not self._fresh(key, stored_at):
+                return default
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return default
+
+        super().set(key, (value, stored_at))
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, (value, time.time()))
+        if self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        # write to a temporary file first, so a concurrent reader never sees a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, self._path(key))
+
+    def clear(self) -> None:
+        super().clear()
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into a single execution
+
+    The first caller for a key runs the function; callers arriving while it is still running
+    wait for it and receive the same result (or the same exception).
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+def _matches_prefix(item: dict, q: str) -> bool:
+    """True if the item's name has a word boundary followed by `q` (case-insensitive)"""
+    name = str(item.get("name") or "").lower()
+    return f" {q}" in f" {name}"
+
+
+class TaxonomyCache:
+    """Prefix-aware cache for taxonomy autocomplete searches
+
+    Results are kept in a bounded LRU per facet, keyed by the search text and the remaining
+    querystring parameters. In autocomplete mode (`autocomplete=true`), when a shorter prefix
+    returned fewer results than the requested limit the result set was complete, so any longer
+    query starting with that prefix is answered locally by filtering it; relevance searches
+    match whole keywords, so they are only answered from identical searches. Identical searches that are in flight at the same time
+    are coalesced into one request.
+
+    Attributes:
+        maxsize (int): the maximum number of searches cached per facet
+        default_limit (int): the API's result limit when the querystring does not set one
+    """
+
+    def __init__(self, maxsize: int = 256, default_limit: int = 10) -> None:
+        self.maxsize = maxsize
+        self.default_limit = default_limit
+        self._facets: dict[str, LRUCache] = {}
+        self._lock = threading.Lock()
+        self._in_flight = SingleFlight()
+
+    def _facet(self, facet: str) -> LRUCache:
+        with self._lock:
+            if facet not in self._facets:
+                self._facets[facet] = LRUCache(self.maxsize)
+            return self._facets[facet]
+
+    def _limit(self, querystring: dict) -> int:
+        try:
+            return int(querystring.get("limit", self.default_limit))
+        except (TypeError, ValueError):
+            return self.default_limit
+
+    def lookup(self, facet: str, q: str, querystring: dict) -> list | None:
+        """Answers a search from the cache, or returns None if it has to go to the API"""
+        params = _params_key(querystring)
+        cache = self._facet(facet)
+
+        exact = cache.get((q, params))
+        if exact is not None:
+            return _copy(exact[0])
+
+        if not q or str(querystring.get("autocomplete", "")).lower() != "true":
+            return None
+
+        needle = q.lower()
+        limit = self._limit(querystring)
+        for (cached_q, cached_params), (results, complete) in reversed(cache.items()):
+            if cached_params != params or not complete or not cached_q or not needle.startswith(cached_q.lower()):
+                continue
+            matches = [item for item in results if _matches_prefix(item, needle)][:limit]
+            cache.set((q, params), (matches, True))
+            return _copy(matches)
+
+        return None
+
+    def store(self, facet: str, q: str, querystring: dict, results: list) -> None:
+        complete = isinstance(results, list) and len(results) < self._limit(querystring)
+        self._facet(facet).set((q, _params_key(querystring)), (_copy(results), complete))
+
+    def search(self, facet: str, q: str, querystring: dict, fetch: Callable[[], list]) -> list:
+        """Returns cached results for the search, calling `fetch` at most once per concurrent search"""
+        cached = self.lookup(facet, q, querystring)
+        metrics.count_cache_lookup("taxonomy", cached is not None)
+        if cached is not None:
+            return cached
+
+        def load() -> list:
+            results = fetch()
+            self.store(facet, q, querystring, results)
+            return results
+
+        return _copy(self._in_flight.do((facet, q, _params_key(querystring)), load))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._facets.clear()
+
+
+def _copy(results):
+    # callers get their own list and items, so changing them never changes the cache
+    return copy.deepcopy(results)
+
+
+def _params_key(querystring: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in querystring.items() if k != "q"))
@@ -0,0 +1,123 @@
+"""Skill ID migration between Open Skills versions
+
+Each skills version publishes its changes from the version before it (`versions/{version}/changes`).
+`SkillChangeIndex` composes those changes across every version between two versions into a single
+lookup, so stored skill IDs can be migrated in one vectorized pass with `remap`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# keys the changes endpoint uses for the ID a removed or consolidated skill was folded into
+REPLACEMENT_KEYS = ("replacementId", "consolidatedId", "newId")
+
+
+def version_key(version: str) -> tuple:
+    """Sort key for skills versions such as "9.2" < "9.10"; numeric parts sort before text parts like "beta" """
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in str(version).split("."))
+
+
+def _replacement(record: dict) -> str | None:
+    for key in REPLACEMENT_KEYS:
+        if record.get(key):
+            return record[key]
+
+    return None
+
+
+class SkillChangeIndex:
+    """The changes between two skills versions, composed into lookups
+
+    Attributes:
+        from_version (str): the version the stored IDs come from
+        to_version (str): the version to migrate them to
+        mapping (dict): old ID -> ID in `to_version`, or None if the skill was removed without a replacement
+        added (set): IDs added after `from_version` and still present in `to_version`
+        renamed (dict): ID -> (old name, new name) for skills renamed in between
+    """
+
+    def __init__(self, from_version: str, to_version: str) -> None:
+        self.from_version = from_version
+        self.to_version = to_version
+        self.mapping: dict = {}
+        self.added: set = set()
+        self.renamed: dict = {}
+
+    @classmethod
+    def from_changes(cls, from_version: str, to_version: str, changes: list) -> SkillChangeIndex:
+        """
+        Builds the index from the changes of each version after `from_version`, up to and including `to_version`.
+
+        Args:
+            from_version (str): the version the stored IDs come from
+            to_version (str): the version to migrate them to
+            changes (list): (version, `get_version_changes` data) pairs, in ascending version order
+
+        Returns:
+            SkillChangeIndex: the composed changes
+        """
+        index = cls(from_version, to_version)
+        for _, data in changes:
+            index.apply(data)
+
+        return index
+
+    def apply(self, data: dict) -> None:
+        """Composes the changes of the next version onto the index"""
+        step = {}
+        for record in data.get("removals", []) + data.get("consolidations", []):
+            step[record["id"]] = _replacement(record)
+
+        # IDs that were already remapped follow their replacement through this version's changes
+        for old, current in self.mapping.items():
+            if current in step:
+                self.mapping[old] = step[current]
+        for old, new in step.items():
+            self.mapping.setdefault(old, new)
+
+        self.added -= step.keys()
+        self.added |= {record["id"] for record in data.get("additions", [])}
+
+        for record in data.get("renames", []):
+            old_name = self.renamed.get(record["id"], (record.get("oldName"),))[0]
+            self.renamed[record["id"]] = (old_name, record.get("newName", record.get("name")))
+
+    @property
+    def removed(self) -> set:
+        """IDs removed without a replacement"""
+        return {old for old, new in self.mapping.items() if new is None}
+
+    @property
+    def replaced(self) -> dict:
+        """Old ID -> replacement ID for removed or consolidated skills"""
+        return {old: new for old, new in self.mapping.items() if new is not None}
+
+    def remap(self, ids):
+        """
+        Migrates skill IDs from `from_version` to `to_version`. Only the distinct IDs are looked up,
+        then spread back over the input, so millions of stored IDs take one pass.
+
+        Args:
+            ids (pd.Series, np.ndarray or list): skill IDs from `from_version`
+
+        Returns:
+            pd.Series or np.ndarray: the IDs in `to_version` (a Series keeps its index); None where the skill was
+            removed without a replacement, unchanged where the skill did not change
+        """
+        codes, uniques = pd.factorize(np.asarray(ids, dtype=object), use_na_sentinel=True)
+        mapped = np.array([self.mapping.get(u, u) for u in uniques] + [None], dtype=object)
+        # the sentinel -1 picks the trailing None, so missing IDs stay missing
+        result = mapped[codes]
+
+        if isinstance(ids, pd.Series):
+            return pd.Series(result, index=ids.index, name=ids.name, dtype=object)
+
+        return result
+
+    def __repr__(self) -> str:
+        return (
+            f"SkillChangeIndex({self.from_version} -> {self.to_version}: {len(self.replaced)} replaced, "
+            f"{len(self.removed)} removed, {len(self.renamed)} renamed, {len(self.added)} added)"
+        )
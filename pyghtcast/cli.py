@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
-"""Command-line interface for pyghtcast library."""
+"""Command-line interface for pyghtcast library.
+
+Heavy dependencies (pandas, requests) are only imported inside the commands that need them,
+so that --help, --version and shell completion stay fast.
+"""
+
+from __future__ import annotations
 
 import json
 import os
 import sys
 import textwrap
+from typing import TYPE_CHECKING
 
 import click
 
-from .coreLmi import CoreLMIConnection
+from . import daemon, export
+
+if TYPE_CHECKING:
+    from .coreLmi import CoreLMIConnection
+    from .daemon import DaemonClient
+
+
+def get_cache_dir() -> str:
+    """Directory for cached metadata: $PYGHTCAST_CACHE_DIR, else pyghtcast under the user cache directory."""
+    cache_dir = os.getenv("PYGHTCAST_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
 
+    return os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "pyghtcast")
 
-def get_connection() -> CoreLMIConnection:
-    """Get a CoreLMIConnection instance using environment variables."""
+
+def _credentials() -> tuple[str, str]:
+    """The LCAPI_USER and LCAPI_PASS environment variables, exiting with an error if either is unset."""
     username = os.getenv("LCAPI_USER")
     password = os.getenv("LCAPI_PASS")
 
@@ -20,13 +40,40 @@ def get_connection() -> CoreLMIConnection:
         click.echo("Error: Please set LCAPI_USER and LCAPI_PASS environment variables", err=True)
         sys.exit(1)
 
+    return username, password
+
+
+def get_connection() -> CoreLMIConnection | DaemonClient:
+    """Get a connection to the API.
+
+    Uses a running `pyghtcast serve` daemon when there is one (unless PYGHTCAST_NO_DAEMON is set),
+    otherwise creates a CoreLMIConnection from the LCAPI_USER and LCAPI_PASS environment variables
+    that keeps metadata in the cache directory.
+    """
+    if not os.getenv("PYGHTCAST_NO_DAEMON"):
+        client = daemon.connect()
+        if client is not None:
+            return client
+
+    from .coreLmi import CoreLMIConnection
+
+    username, password = _credentials()
+
     try:
-        return CoreLMIConnection(username, password)
+        # the token is only requested once a command misses the metadata cache
+        return CoreLMIConnection(username, password, cache_dir=get_cache_dir(), authenticate=False)
     except Exception as e:
         click.echo(f"Error connecting to API: {e}", err=True)
         sys.exit(1)
 
 
+def _split_columns(columns: str | None) -> list[str] | None:
+    """Parse a comma-separated --columns option."""
+    if not columns:
+        return None
+    return [c.strip() for c in columns.split(",") if c.strip()]
+
+
 @click.group()
 @click.version_option(version="0.1.0")
 def cli() -> None:
@@ -260,16 +307,39 @@ def discover_dimensions(dataset: str, datarun: str, output_json: bool) -> None:
 @click.option("--json", "output_json", is_flag=True, help="Output as JSON")
 @click.option("--csv", "output_csv", is_flag=True, help="Output as CSV")
 @click.option("--limit", default=20, help="Limit number of items shown (default: 20)")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["parquet", "feather", "arrow"]),
+    help="Write the full hierarchy to --output in a columnar format",
+)
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="File to write to (required with --format)")
+@click.option("--columns", help="Comma-separated list of columns to keep (e.g., child,name)")
 def discover_hierarchy(
-    dataset: str, dimension: str, datarun: str, output_json: bool, output_csv: bool, limit: int
+    dataset: str,
+    dimension: str,
+    datarun: str,
+    output_json: bool,
+    output_csv: bool,
+    limit: int,
+    output_format: str | None,
+    output: str | None,
+    columns: str | None,
 ) -> None:
     """View the hierarchy of a specific dimension."""
+    if output_format and not output:
+        raise click.UsageError("--output is required when using --format")
+
     conn = get_connection()
 
     try:
-        if output_csv:
-            # Use DataFrame method for CSV output
+        if output_format:
             df = conn.get_dimension_hierarchy_df(dataset, dimension, datarun)
+            export.write_df(df, output, to=output_format, columns=_split_columns(columns))
+            click.echo(f"Wrote {len(df)} items to {output}", err=True)
+        elif output_csv:
+            # Use DataFrame method for CSV output
+            df = export.project(conn.get_dimension_hierarchy_df(dataset, dimension, datarun), _split_columns(columns))
 
             # Limit the output if specified
             if limit > 0 and len(df) > limit:
@@ -328,6 +398,122 @@ def discover_hierarchy(
         sys.exit(1)
 
 
+@cli.group()
+def cache() -> None:
+    """Manage the local metadata cache."""
+    pass
+
+
+@cache.command(name="warm")
+@click.option("--dataset", "datasets", multiple=True, required=True, help="Dataset to warm (repeatable)")
+@click.option("--datarun", required=True, help="Data version (e.g., 2025.3)")
+@click.option("--workers", default=8, help="Number of requests in flight at once (default: 8)")
+def cache_warm(datasets: tuple[str, ...], datarun: str, workers: int) -> None:
+    """Fetch definitions, dataset metadata and all dimension hierarchies into the cache."""
+    conn = get_connection()
+
+    try:
+        warmed = conn.warm(list(datasets), datarun, workers)
+    except Exception as e:
+        click.echo(f"Error warming cache: {e}", err=True)
+        sys.exit(1)
+
+    for dataset, dimensions in warmed.items():
+        click.echo(
+            f"{click.style(dataset, bold=True, fg='cyan')} ({datarun}): {', '.join(dimensions) or 'no dimensions'}"
+        )
+
+
+@cache.command(name="clear")
+def cache_clear() -> None:
+    """Remove all cached metadata from disk."""
+    from .cache import MetaCache
+
+    cache_dir = get_cache_dir()
+    MetaCache(directory=cache_dir).clear()
+    click.echo(f"Cleared {cache_dir}")
+
+
+@cache.command(name="snapshot")
+@click.option("--dataset", required=True, help="Dataset name (e.g., emsi.us.occupation)")
+@click.option("--dimension", required=True, help="Dimension name (e.g., Area)")
+@click.option("--datarun", required=True, help="Data version (e.g., 2025.3)")
+@click.option("--output", "-o", required=True, type=click.Path(dir_okay=False), help="Snapshot file to write")
+def cache_snapshot(dataset: str, dimension: str, datarun: str, output: str) -> None:
+    """Write a dimension hierarchy to a memory-mappable Arrow snapshot file."""
+    from .snapshot import save_hierarchy
+
+    conn = get_connection()
+
+    try:
+        save_hierarchy(conn, dataset, dimension, datarun, output)
+    except Exception as e:
+        click.echo(f"Error writing snapshot: {e}", err=True)
+        sys.exit(1)
+
+    click.echo(f"Wrote {dataset} {dimension} ({datarun}) to {output}")
+
+
+@cli.command(name="serve")
+@click.option("--socket", "socket_file", type=click.Path(dir_okay=False), help="Socket to listen on")
+@click.option("--detach", is_flag=True, help="Run in the background")
+@click.option("--stop", is_flag=True, help="Stop the running daemon")
+@click.option("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+def serve(socket_file: str | None, detach: bool, stop: bool, metrics_port: int | None) -> None:
+    """Keep a warm API connection in a local daemon.
+
+    While it runs, other pyghtcast commands send their requests through it and reuse its login,
+    HTTP connections, rate limiter and metadata cache.
+    """
+    path = socket_file or daemon.socket_path()
+
+    if stop:
+        client = daemon.connect(path)
+        if client is None:
+            click.echo(f"No daemon is running on {path}", err=True)
+            sys.exit(1)
+        client.call("shutdown")
+        click.echo(f"Stopped daemon on {path}")
+        return
+
+    if daemon.connect(path) is not None:
+        click.echo(f"A daemon is already running on {path}", err=True)
+        sys.exit(1)
+
+    # the daemon must own a real connection, never forward to another daemon
+    os.environ["PYGHTCAST_NO_DAEMON"] = "1"
+    # checked before forking, so a missing credential is reported to the terminal
+    _credentials()
+
+    if detach and os.fork() != 0:
+        click.echo(f"Daemon started on {path}")
+        return
+
+    if detach:
+        # leave the terminal's session, and its streams, which nothing reads once the command returns
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.close(devnull)
+    else:
+        click.echo(f"Serving on {path} (Ctrl+C to stop)", err=True)
+
+    # the connection (and its HTTP session) and the metrics thread belong to the process that serves,
+    # so they are created after the fork
+    conn = get_connection()
+
+    if metrics_port is not None:
+        from . import metrics
+
+        metrics.enable().serve(metrics_port)
+
+    try:
+        daemon.serve(conn, path)
+    except KeyboardInterrupt:
+        pass
+
+
 @cli.group()
 def query() -> None:
     """Build and execute queries."""
@@ -346,6 +532,124 @@ def query_build(dataset: str, datarun: str) -> None:
     click.echo("  - pyghtcast discover hierarchy --dataset <dataset> --dimension <dim> --datarun <version>")
 
 
+def _load_query_spec(path: str) -> tuple[str, dict, str]:
+    """Load a saved query spec file into (dataset, payload, datarun)."""
+    with open(path) as f:
+        try:
+            spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise click.BadParameter(f"{path}: not a valid JSON query spec ({e})") from e
+
+    if not isinstance(spec, dict) or "dataset" not in spec or "metrics" not in spec:
+        raise click.BadParameter(f"{path}: a query spec needs at least 'dataset' and 'metrics'")
+
+    # metrics may be given as plain column names, like build_query_corelmi takes them
+    metrics = [m if isinstance(m, dict) else {"name": m} for m in spec["metrics"]]
+    payload = {"metrics": metrics, "constraints": spec.get("constraints", [])}
+
+    return spec["dataset"], payload, str(spec.get("datarun", "2025.3"))
+
+
+def _output_paths(specs: tuple[str, ...], output_dir: str, output_format: str) -> list[str]:
+    """One output file per spec, named after it; specs sharing a file name get -2, -3, ... suffixes."""
+    used = set()
+    paths = []
+    for spec in specs:
+        stem = os.path.splitext(os.path.basename(spec))[0]
+        name, n = stem, 1
+        while name in used:
+            n += 1
+            name = f"{stem}-{n}"
+        used.add(name)
+        paths.append(os.path.join(output_dir, f"{name}.{output_format}"))
+
+    return paths
+
+
+def _write_result(df, path: str, output_format: str) -> None:
+    """Write a query result DataFrame to disk in the chosen format."""
+    if output_format == "csv":
+        df.to_csv(path, index=False)
+    elif output_format == "json":
+        df.to_json(path, orient="records", indent=2)
+    else:
+        export.write_df(df, path, to=output_format)
+
+
+@query.command(name="run")
+@click.argument("specs", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["csv", "json", "parquet", "feather", "arrow"]),
+    default="csv",
+    help="Output format for each result (default: csv)",
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    type=click.Path(file_okay=False),
+    default=".",
+    help="Directory to write results to (default: current directory)",
+)
+@click.option("--workers", default=4, help="Number of queries to run at once (default: 4)")
+@click.option("--validate", is_flag=True, help="Check every spec against the dataset metadata before running any")
+def query_run(specs: tuple[str, ...], output_format: str, output_dir: str, workers: int, validate: bool) -> None:
+    """Run saved query spec files concurrently and write each result to a file.
+
+    Each spec is a JSON file with "dataset", "datarun", "metrics" and "constraints" keys.
+    Results are written to OUTPUT_DIR, named after the spec file (with a -2, -3, ... suffix
+    when several specs share a file name).
+    """
+    queries = [_load_query_spec(spec) for spec in specs]
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = _output_paths(specs, output_dir, output_format)
+
+    conn = get_connection()
+
+    if validate:
+        from .validation import QueryValidationError, validate_query
+
+        invalid = 0
+        for spec, (dataset, payload, datarun) in zip(specs, queries, strict=True):
+            try:
+                validate_query(conn, dataset, payload, datarun)
+            except QueryValidationError as e:
+                invalid += 1
+                click.echo(f"{spec}: {e}", err=True)
+        if invalid:
+            click.echo(f"{invalid} of {len(queries)} query specs are invalid; nothing was run", err=True)
+            sys.exit(1)
+
+    failures = 0
+    written = []
+
+    with click.progressbar(length=len(queries), label="Running queries", file=sys.stderr) as bar:
+
+        def on_done(index: int, result) -> None:
+            nonlocal failures
+            if isinstance(result, Exception):
+                failures += 1
+                click.echo(f"\nError running {specs[index]}: {result}", err=True)
+            else:
+                try:
+                    _write_result(result, outputs[index], output_format)
+                    written.append(index)
+                except Exception as e:
+                    failures += 1
+                    click.echo(f"\nError writing {outputs[index]}: {e}", err=True)
+            bar.update(1)
+
+        conn.post_retrieve_many(queries, max_workers=workers, return_exceptions=True, callback=on_done)
+
+    for index in sorted(written):
+        click.echo(f"{specs[index]} -> {outputs[index]}")
+
+    if failures:
+        click.echo(f"{failures} of {len(queries)} queries failed", err=True)
+        sys.exit(1)
+
+
 @query.command(name="example")
 @click.option(
     "--dataset", type=click.Choice(["occupation", "industry"]), default="occupation", help="Example dataset type"
@@ -1,35 +1,106 @@
+import json
+import logging
+import multiprocessing
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 
 import pandas as pd
 import requests
 
-from .base import EmsiBaseConnection
+from . import diff, export, metrics, validation
+from .base import EmsiBaseConnection, share_json
+from .cache import MetaCache
+from .exceptions import LightcastError, check_response, is_success, truncate
+from .logs import log_failed_response
+
+logger = logging.getLogger(__name__)
+
+# Core LMI quota per client_id: REQUESTS_PER_WINDOW requests every 5 minutes
+REQUESTS_PER_WINDOW = 300
+
+# how long cached metadata is trusted before it is fetched again
+META_CACHE_MAX_AGE = 24 * 60 * 60
+
+# the dataset and datarun listings change as soon as a datarun is published, so they are refetched sooner
+META_LISTING_MAX_AGE = 15 * 60
+
+
+def dimension_names(dataset_info: dict) -> list[str]:
+    """The dimension names in a `get_meta_dataset` response (list or older dict format)"""
+    dimensions = dataset_info.get("dimensions", []) if isinstance(dataset_info, dict) else []
+    if isinstance(dimensions, dict):
+        return list(dimensions)
+
+    return [dim["name"] for dim in dimensions if isinstance(dim, dict) and "name" in dim]
+
+
+def response_df(response: dict, columns: list = None) -> pd.DataFrame:
+    """The DataFrame for a decoded Agnitio data response (`{"data": [{"name": ..., "rows": [...]}, ...]}`)"""
+    if not isinstance(response, dict) or not isinstance(response.get("data"), list):
+        raise LightcastError(f"Unexpected Agnitio data response: {truncate(json.dumps(response))}")
+
+    data_dict = {column["name"]: column["rows"] for column in response["data"]}
+    return export.project(pd.DataFrame(data_dict), columns)
+
+
+def parse_to_ipc(content: bytes) -> bytes:
+    """Decodes a raw Agnitio data response and returns its DataFrame as an Arrow IPC buffer (runs in worker processes)"""
+    return export.to_ipc_buffer(response_df(json.loads(content)))
 
 
 class Limiter:
     def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
         self.start = datetime.now()
         self.expiration = self.start + timedelta(minutes=5)
-        self.upper_limit = 300
+        self.upper_limit = REQUESTS_PER_WINDOW
+
+    def _refresh(self):
+        # callers hold self.lock
+        if self.seconds_left() <= 0:
+            self.reset()
 
     def smart_limit(self):
         """
         Gets the time left before the quota reset, then divides the time by the upper limit left
         this results in an even distribution of requests and ensures never returning a 429 response
         """
-        time_left = self.seconds_left()
+        with self.lock:
+            self._refresh()
+            time_left = self.seconds_left()
+
+            if self.upper_limit == 0:
+                return time_left
 
-        if time_left <= 0:
-            self.__init__()
+            return time_left / self.upper_limit
 
-        if self.upper_limit == 0:
-            return time_left
+    def acquire(self, sleep: Callable[[float], None] = time.sleep):
+        """
+        Counts one request against the quota, first sleeping until the window resets if it is used up.
+        The check and the count are one step under the lock, so threads sharing the connection can never
+        take more than the quota between them.
 
-        return time_left / self.upper_limit
+        Args:
+            sleep (Callable, optional): called with the seconds to wait while the quota is used up
+        """
+        while True:
+            with self.lock:
+                self._refresh()
+                if self.upper_limit > 0:
+                    self.upper_limit -= 1
+                    return
+                delay = self.seconds_left()
+            sleep(delay)
 
     def seconds_left(self):
-        return (self.expiration - datetime.now()).seconds
+        return max((self.expiration - datetime.now()).total_seconds(), 0)
 
 
 class CoreLMIConnection(EmsiBaseConnection):
@@ -43,18 +114,38 @@ class CoreLMIConnection(EmsiBaseConnection):
         token (str): token received back from the OAuth server
     """
 
-    def __init__(self, username, password) -> None:
-        """Summary"""
+    base_url = "https://agnitio.emsicloud.com/"
+
+    def __init__(self, username, password, cache_dir: str = None, authenticate: bool = True) -> None:
+        """Summary
+
+        Args:
+            username (str): the client_id for accessing the API
+            password (str): the client_secret for accessing the API
+            cache_dir (str, optional): persist metadata responses in this directory, so later connections reuse them
+            authenticate (bool, optional): request a token now; if False, the first request that needs one does
+        """
 
         super().__init__(username, password)
-        self.base_url = "https://agnitio.emsicloud.com/"
         self.scope = "agnitio"
 
-        self.get_new_token()
+        if authenticate:
+            self.get_new_token()
         self.limiter = Limiter()
+        self.meta_cache = MetaCache(
+            maxsize=512,
+            directory=cache_dir,
+            max_age=META_CACHE_MAX_AGE,
+            max_ages={"meta": META_LISTING_MAX_AGE, "meta/definitions": META_LISTING_MAX_AGE},
+        )
 
         self.name = "Core_LMI"
 
+        # the worker processes behind `post_retrieve_many(processes=...)`, started on first use and kept
+        self.parse_pool = None
+        self.parse_pool_size = None
+        self.parse_pool_lock = threading.Lock()
+
     def download_data(self, api_endpoint: str, payload: dict = None, smart_limit: bool = False) -> requests.Response:
         """Needs more work for downloading the data from Agnitio, since it does not automatically handle the rate liimit from the API
 
@@ -64,37 +155,74 @@ class CoreLMIConnection(EmsiBaseConnection):
 
         Returns:
             requests.Response: The response from the server
+
+        Raises:
+            APIError: if the API answers with an error status (AuthenticationError, RateLimitError or APIError)
         """
         # possible addition of adding smart_limit
         # for now, if smart_limit is true, then it will simply wait 1 second before returning data
         if smart_limit:
-            time.sleep(self.limiter.smart_limit())
+            self.wait(self.limiter.smart_limit())
 
-        if self.limiter.upper_limit == 0:
-            time.sleep(self.limiter.smart_limit())
+        self.ensure_token()
 
         url = self.base_url + api_endpoint
-        if payload is None:
-            response = self.get_data(url)
 
-        else:
-            response = self.post_data(url, payload)
+        def send() -> requests.Response:
+            # only requests that are actually sent (not coalesced) count against the quota
+            self.limiter.acquire(self.wait)
+            return share_json(self.get_data(url) if payload is None else self.post_data(url, payload))
+
+        # concurrent identical requests share one response, and .json() decodes it once for all of them
+        response = self.in_flight.do(self.request_key(url, payload), send)
+
+        if not is_success(response):
+            log_failed_response(logger, response, url, payload, endpoint=api_endpoint)
+
+        return check_response(response, url)
+
+    def wait(self, seconds: float) -> None:
+        """Sleeps for the rate limiter, recording the wait in `metrics`"""
+        time.sleep(seconds)
+        metrics.observe_limiter_wait(type(self).__name__, seconds)
+
+    def download_raw(
+        self,
+        api_endpoint: str,
+        payload: dict = None,
+        querystring: dict = None,
+        path: str = None,
+        decode_content: bool = True,
+    ) -> bytes | int:
+        """`EmsiBaseConnection.download_raw`, counted against (and waiting on) this connection's rate limiter"""
+        self.limiter.acquire(self.wait)
+        return super().download_raw(api_endpoint, payload, querystring, path, decode_content)
+
+    def get_meta_cached(self, api_endpoint: str) -> dict:
+        """
+        Metadata for a datarun does not change once published, so successful responses from the meta endpoints
+        are kept in `meta_cache` and shared by every later call on this connection.
+        Treat the returned dict as read-only.
 
-        self.limiter.upper_limit -= 1
+        Args:
+            api_endpoint (str): the meta endpoint to query (e.g. `meta/dataset/emsi.us.occupation/2025.3`)
 
-        if response.status_code != 200:
-            import json
+        Returns:
+            dict: json data response from the server
 
-            print(json.dumps(payload))
-            print(url)
-            print(response.text)
+        Raises:
+            APIError: if the API answers with an error status; errors are never cached
+        """
+        data = self.meta_cache.get(api_endpoint)
+        metrics.count_cache_lookup("meta", data is not None)
+        if data is None:
+            data = self.download_data(api_endpoint).json()
+            self.meta_cache.set(api_endpoint, data)
 
-        return response
+        return data
 
     def get_meta(self):
-        response = self.download_data("meta")
-
-        return response.json()
+        return self.get_meta_cached("meta")
 
     def get_meta_definitions(self) -> dict:
         """
@@ -103,9 +231,7 @@ class CoreLMIConnection(EmsiBaseConnection):
         Returns:
             dict: json data response from the server
         """
-        response = self.download_data("meta/definitions")
-
-        return response.json()
+        return self.get_meta_cached("meta/definitions")
 
     def get_meta_dataset(self, dataset: str, datarun: str) -> dict:
         """
@@ -118,9 +244,7 @@ class CoreLMIConnection(EmsiBaseConnection):
         Returns:
             dict: dataset metadata including dimensions and metrics
         """
-        response = self.download_data(f"meta/dataset/{dataset}/{datarun}")
-
-        return response.json()
+        return self.get_meta_cached(f"meta/dataset/{dataset}/{datarun}")
 
     def get_meta_dataset_dimension(self, dataset: str, dimension: str, datarun: str) -> dict:
         """
@@ -134,11 +258,9 @@ class CoreLMIConnection(EmsiBaseConnection):
         Returns:
             dict: hierarchichal representation of the dimension of data for the particular dataset
         """
-        response = self.download_data(f"meta/dataset/{dataset}/{datarun}/{dimension}")
-
-        return response.json()
+        return self.get_meta_cached(f"meta/dataset/{dataset}/{datarun}/{dimension}")
 
-    def post_retrieve_data(self, dataset: str, payload: dict, datarun: str) -> dict:
+    def post_retrieve_data(self, dataset: str, payload: dict, datarun: str, validate: bool = False) -> dict:
         """
         Agnitio data queries are performed by assembling a JSON description of the query and POSTing it to the specific dataset you wish to query.
 
@@ -146,14 +268,107 @@ class CoreLMIConnection(EmsiBaseConnection):
             dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
             payload (dict): the json data to be sent to the API
             datarun (str): the data version to use when querying the dataset (e.g. `2020.3`)
+            validate (bool, optional): check the query against the dataset's cached metadata before sending it
 
         Returns:
             dict: full data returned from the API
+
+        Raises:
+            QueryValidationError: if `validate` is set and the query does not match the metadata
+            APIError: if the API answers with an error status (AuthenticationError, RateLimitError or APIError)
         """
+        if validate:
+            validation.validate_query(self, dataset, payload, datarun)
+
         response = self.download_data(f"{dataset}/{datarun}", payload)
 
         return response.json()
 
+    def post_retrieve_raw(
+        self, dataset: str, payload: dict, datarun: str, path: str = None, decode_content: bool = True
+    ) -> bytes | int:
+        """
+        Runs an Agnitio data query and returns the response body undecoded, or streams it into a file.
+
+        Args:
+            dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+            payload (dict): the json data to be sent to the API
+            datarun (str): the data version to use when querying the dataset (e.g. `2020.3`)
+            path (str, optional): write the body to this file instead of returning it
+            decode_content (bool, optional): if False, keep the body as sent over the wire (e.g. gzipped)
+
+        Returns:
+            bytes | int: the JSON body, or the number of bytes written to `path`
+        """
+        return self.download_raw(f"{dataset}/{datarun}", payload, path=path, decode_content=decode_content)
+
+    def warm(self, datasets: list, datarun: str, max_workers: int = 8) -> dict:
+        """
+        Fetches definitions, dataset metadata and every dimension hierarchy for the datasets concurrently,
+        so that later metadata lookups (and queries that rely on them) are answered from `meta_cache`.
+
+        Args:
+            datasets (list): the datasets to warm (e.g. `["emsi.us.occupation", "emsi.us.industry"]`)
+            datarun (str): the data version to warm (e.g. `2025.3`)
+            max_workers (int, optional): the number of requests in flight at once
+
+        Returns:
+            dict: the dimensions cached for each dataset
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = [executor.submit(self.get_meta_definitions)]
+            metas = {dataset: executor.submit(self.get_meta_dataset, dataset, datarun) for dataset in datasets}
+
+            warmed = {}
+            for dataset, meta in metas.items():
+                warmed[dataset] = dimension_names(meta.result())
+                pending += [
+                    executor.submit(self.get_meta_dataset_dimension, dataset, dimension, datarun)
+                    for dimension in warmed[dataset]
+                ]
+
+            for future in pending:
+                future.result()
+
+        return warmed
+
+    def diff_dataruns(self, dataset: str, old: str, new: str, dimensions: list = None) -> diff.DatarunDiff:
+        """
+        Compares the metrics and dimension hierarchies of a dataset between two dataruns.
+
+        Args:
+            dataset (str): the dataset to compare (e.g. `emsi.us.occupation`)
+            old (str): the previous datarun (e.g. `2025.3`)
+            new (str): the new datarun (e.g. `2025.4`)
+            dimensions (list, optional): only compare these dimensions (defaults to every dimension)
+
+        Returns:
+            DatarunDiff: metrics added/removed and a DimensionDiff per dimension
+        """
+        return diff.diff_dataruns(self, dataset, old, new, dimensions)
+
+    def incremental_refresh(
+        self, dataset: str, payload: dict, previous: pd.DataFrame, old: str, new: str, shard_dimension: str
+    ) -> pd.DataFrame:
+        """
+        Brings a query result from an old datarun up to a new one, re-querying only the shards of
+        `shard_dimension` whose members changed. Rows of the other shards keep their `old` values.
+        See `diff.incremental_refresh`.
+
+        Args:
+            dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+            payload (dict): the query that produced `previous`
+            previous (pd.DataFrame): the result of `payload` at the old datarun
+            old (str): the datarun `previous` was queried at
+            new (str): the datarun to refresh to
+            shard_dimension (str): the constrained dimension whose predicate members are the shards (e.g. `Area`)
+
+        Returns:
+            pd.DataFrame: the result of `payload` at the new datarun, with the shards reused from `old` in
+            `df.attrs["reused_shards"]`
+        """
+        return diff.incremental_refresh(self, dataset, payload, previous, old, new, shard_dimension)
+
     def get_dimension_hierarchy_df(self, dataset: str, dimension: str, datarun: str) -> pd.DataFrame:
         """
         Finally, you can view the hierarchy of a particular dimension of a dataset by adding dataset/<name>/<version>/<dimension> to the path:
@@ -171,7 +386,16 @@ class CoreLMIConnection(EmsiBaseConnection):
 
         return df
 
-    def post_retrieve_df(self, dataset: str, payload: dict, datarun: str) -> pd.DataFrame:
+    def post_retrieve_df(
+        self,
+        dataset: str,
+        payload: dict,
+        datarun: str,
+        to: str = None,
+        path: str = None,
+        columns: list = None,
+        validate: bool = False,
+    ) -> pd.DataFrame:
         """
         Agnitio data queries are performed by assembling a JSON description of the query and POSTing it to the specific dataset you wish to query.
 
@@ -179,11 +403,158 @@ class CoreLMIConnection(EmsiBaseConnection):
             dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
             payload (dict): the json data to be sent to the API
             datarun (str): the data version to use when querying the dataset (e.g. `2020.3`)
+            to (str, optional): also write the data to `path` as "parquet", "feather" or "arrow"
+            path (str, optional): the file to write to when `to` is set
+            columns (list, optional): only keep these columns (e.g. `["Area", "Jobs.2023"]`)
+            validate (bool, optional): check the query against the dataset's cached metadata before sending it
 
         Returns:
             pd.DataFrame: Data from the API in a pd.DataFrame
         """
-        response = self.post_retrieve_data(dataset, payload, datarun)
-        data_dict = {column["name"]: column["rows"] for column in response["data"]}
-        df = pd.DataFrame(data_dict)
+        if to is not None and path is None:
+            raise ValueError("A path is required when exporting with `to`")
+
+        df = response_df(self.post_retrieve_data(dataset, payload, datarun, validate), columns)
+
+        if to is not None:
+            metric_names = (
+                {metric["name"] for metric in payload.get("metrics", [])} if isinstance(payload, dict) else set()
+            )
+            dimensions = [c for c in df.columns if c not in metric_names]
+            export.write_df(df, path, to=to, dimensions=dimensions)
+
         return df
+
+    def post_retrieve_many(
+        self,
+        queries: list,
+        max_workers: int = 4,
+        return_exceptions: bool = False,
+        callback: Callable = None,
+        processes: int = None,
+        validate: bool = False,
+    ) -> list:
+        """
+        Runs several Agnitio data queries concurrently over this connection, sharing its token and rate limiter.
+        Identical queries are only sent once.
+
+        With `processes`, requests are still sent from threads in this process, but decoding the JSON and
+        building each DataFrame happens in a pool of worker processes, so large results are parsed on
+        several cores at once. The workers are spawned rather than forked, since forking a process that is
+        running threads can deadlock the child, and the pool is kept on the connection for later calls (see `close`).
+        They hand their DataFrames back as Arrow IPC streams
+        (requires pyarrow), which cross the process boundary as one bytes object instead of pickled values;
+        the body bytes and the final DataFrame are still copies.
+
+        Args:
+            queries (list): (dataset, payload, datarun) tuples, as passed to `post_retrieve_df`
+            max_workers (int, optional): the number of queries in flight at once
+            return_exceptions (bool, optional): return a failed query's exception in its place instead of raising it
+            callback (callable, optional): called with (index, result) as each query finishes, e.g. to report progress
+            processes (int, optional): parse responses in this many worker processes
+            validate (bool, optional): check each query against the dataset's cached metadata before sending it
+
+        Returns:
+            list: a pd.DataFrame (or exception) per query, in the order of `queries`; an error status from the API
+            is an APIError and a body that is not a data response a LightcastError, with or without `processes`
+        """
+        keys = [(dataset, json.dumps(payload, sort_keys=True), datarun) for dataset, payload, datarun in queries]
+        positions: dict = {}
+        for index, key in enumerate(keys):
+            positions.setdefault(key, []).append(index)
+        unique = dict(zip(keys, queries, strict=True))
+
+        results: dict = {}
+
+        def finish(key: tuple, future) -> None:
+            try:
+                result = future.result()
+                results[key] = export.from_ipc_buffer(result) if processes else result
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[key] = e
+
+            if callback is not None:
+                for index in positions[key]:
+                    callback(index, results[key])
+
+        if not processes:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self.post_retrieve_df, *query, validate=validate): key
+                    for key, query in unique.items()
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future)
+
+            return [results[key] for key in keys]
+
+        export.require_pyarrow()
+
+        def fetch(dataset: str, payload: dict, datarun: str) -> bytes:
+            if validate:
+                validation.validate_query(self, dataset, payload, datarun)
+            # download_data raises an APIError for an error status, so only data bodies reach the workers
+            return self.download_data(f"{dataset}/{datarun}", payload).content
+
+        pool = self.get_parse_pool(processes)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as threads:
+                downloads = {threads.submit(fetch, *query): key for key, query in unique.items()}
+                parsing = {}
+                # each response is handed to the pool as soon as it arrives, while the other downloads continue
+                for download in as_completed(downloads):
+                    key = downloads[download]
+                    if download.exception() is not None:
+                        finish(key, download)
+                    else:
+                        parsing[pool.submit(parse_to_ipc, download.result())] = key
+
+                for future in as_completed(parsing):
+                    finish(parsing[future], future)
+        except BrokenProcessPool:
+            self.close(pool)
+            raise
+
+        if any(isinstance(result, BrokenProcessPool) for result in results.values()):
+            # a worker died, which breaks the whole pool, so the next call starts a new one
+            self.close(pool)
+
+        return [results[key] for key in keys]
+
+    def get_parse_pool(self, processes: int) -> ProcessPoolExecutor:
+        """
+        Returns the connection's pool of parsing processes for `post_retrieve_many`, starting it on first use.
+        Spawning a worker starts a new interpreter, so the pool is kept for later calls; asking for a different
+        number of processes replaces it.
+
+        Args:
+            processes (int): the number of worker processes
+
+        Returns:
+            ProcessPoolExecutor: the pool, shared by every call on this connection
+        """
+        with self.parse_pool_lock:
+            if self.parse_pool is not None and self.parse_pool_size != processes:
+                self.parse_pool.shutdown(wait=False)
+                self.parse_pool = None
+            if self.parse_pool is None:
+                spawn = multiprocessing.get_context("spawn")
+                self.parse_pool = ProcessPoolExecutor(max_workers=processes, mp_context=spawn)
+                self.parse_pool_size = processes
+            return self.parse_pool
+
+    def close(self, pool: ProcessPoolExecutor = None) -> None:
+        """
+        Stops the connection's parsing processes, if `post_retrieve_many` started any. The connection stays
+        usable: a later call with `processes` starts a new pool.
+
+        Args:
+            pool (ProcessPoolExecutor, optional): only stop the pool if it is still this one
+        """
+        with self.parse_pool_lock:
+            if self.parse_pool is None or (pool is not None and pool is not self.parse_pool):
+                return
+            pool, self.parse_pool = self.parse_pool, None
+        pool.shutdown(wait=False)
@@ -0,0 +1,254 @@
+"""Local daemon that keeps a warm CoreLMIConnection behind a Unix socket
+
+`pyghtcast serve` runs `serve()`, which holds one authenticated connection (token, HTTP session,
+rate limiter and metadata caches) for as long as it runs. CLI commands reach it through
+`DaemonClient`, which exposes the same methods as `CoreLMIConnection`, so a shell loop of
+`pyghtcast discover ...` calls reuses all of that instead of starting from scratch each time.
+
+The protocol is one JSON object per line in each direction:
+``{"method": "get_meta_dataset", "args": [...]}`` answered by ``{"result": ...}`` or ``{"error": "..."}``.
+An error from pyghtcast's own exceptions also carries its type and attributes (e.g. the status code of an
+`APIError`), so the client raises the same exception the connection did.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from .exceptions import APIError, AuthenticationError, LightcastError, RateLimitError
+from .validation import QueryValidationError
+
+if TYPE_CHECKING:
+    from .coreLmi import CoreLMIConnection
+
+# methods answered by the daemon's connection; their results are plain JSON
+REMOTE_METHODS = (
+    "get_meta",
+    "get_meta_definitions",
+    "get_meta_dataset",
+    "get_meta_dataset_dimension",
+    "post_retrieve_data",
+    "warm",
+)
+
+# methods run in the client process on top of the remote ones, because their results are DataFrames;
+# they may only use the remote methods and each other (`post_retrieve_many` is defined on the client)
+LOCAL_METHODS = (
+    "get_dimension_hierarchy_df",
+    "post_retrieve_df",
+)
+
+
+# exceptions the client re-raises as themselves, rebuilt from their message and attributes
+REMOTE_ERRORS = {cls.__name__: cls for cls in (LightcastError, APIError, AuthenticationError, RateLimitError)}
+
+
+class DaemonError(LightcastError):
+    """Raised in the client when the daemon reports an error that has no pyghtcast exception type"""
+
+
+def socket_path() -> str:
+    """The daemon's socket: $PYGHTCAST_SOCKET, else a per-user socket in the runtime or temp directory"""
+    path = os.getenv("PYGHTCAST_SOCKET")
+    if path:
+        return path
+
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"pyghtcast-{os.getuid()}.sock")
+
+
+def is_own_socket(path: str) -> bool:
+    """Whether `path` is a socket owned by the current user, so requests (and credentials) are not sent to another's"""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def error_reply(error: Exception) -> dict:
+    """The reply for a failed request"""
+    reply = {"error": f"{type(error).__name__}: {error}"}
+    if type(error) in (*REMOTE_ERRORS.values(), QueryValidationError):
+        attributes = {name: value for name, value in vars(error).items() if not name.startswith("_")}
+        reply.update(type=type(error).__name__, message=str(error), attributes=attributes)
+
+    return reply
+
+
+def remote_error(reply: dict) -> Exception:
+    """The exception to raise in the client for an error reply"""
+    kind, attributes = reply.get("type"), reply.get("attributes", {})
+    if kind == "QueryValidationError":
+        return QueryValidationError(**attributes)
+    if kind in REMOTE_ERRORS:
+        return REMOTE_ERRORS[kind](reply["message"], **attributes)
+
+    return DaemonError(reply["error"])
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                reply = {"result": self.server.dispatch(request["method"], request.get("args", []))}
+            except Exception as e:
+                reply = error_reply(e)
+
+            self.wfile.write(json.dumps(reply, default=str).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded Unix socket server answering requests from one shared connection
+
+    Attributes:
+        conn (CoreLMIConnection): the warm connection every request is served from
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, conn: CoreLMIConnection) -> None:
+        self.conn = conn
+        self.path = path
+
+        # only the current user may talk to the daemon, since it holds their credentials
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, method: str, args: list) -> Any:
+        if method == "ping":
+            return "pong"
+        if method == "shutdown":
+            # shutdown() blocks until serve_forever returns, so it has to happen off the handler thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return "bye"
+        if method not in REMOTE_METHODS:
+            raise ValueError(f"Unknown method {method!r}")
+
+        return getattr(self.conn, method)(*args)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def serve(conn: CoreLMIConnection, path: str | None = None) -> None:
+    """
+    Serves `conn` on a Unix socket until a shutdown request arrives.
+
+    Args:
+        conn (CoreLMIConnection): the connection to keep warm
+        path (str, optional): the socket to listen on (defaults to `socket_path()`)
+
+    Raises:
+        RuntimeError: if another daemon is already answering on the socket, or the path is taken by something
+            other than the current user's socket
+    """
+    path = path or socket_path()
+    if os.path.exists(path):
+        if not is_own_socket(path):
+            raise RuntimeError(f"{path} exists and is not a socket owned by the current user")
+        if connect(path) is not None:
+            raise RuntimeError(f"A pyghtcast daemon is already running on {path}")
+        # stale socket left behind by a daemon that did not shut down cleanly
+        os.unlink(path)
+
+    with DaemonServer(path, conn) as server:
+        server.serve_forever()
+
+
+class DaemonClient:
+    """Forwards CoreLMIConnection calls to a running daemon
+
+    Each call opens its own short-lived socket connection, so a client can be shared across threads.
+
+    Attributes:
+        path (str): the daemon's socket
+    """
+
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def call(self, method: str, *args: Any) -> Any:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps({"method": method, "args": list(args)}).encode() + b"\n")
+                stream.flush()
+                line = stream.readline()
+
+        if not line:
+            raise DaemonError("The daemon closed the connection without replying")
+
+        reply = json.loads(line)
+        if "error" in reply:
+            raise remote_error(reply)
+
+        return reply["result"]
+
+    def post_retrieve_many(
+        self,
+        queries: list,
+        max_workers: int = 4,
+        return_exceptions: bool = False,
+        callback: Callable | None = None,
+        processes: int | None = None,
+        validate: bool = False,
+    ) -> list:
+        """
+        `CoreLMIConnection.post_retrieve_many` over the daemon. The daemon's replies arrive as JSON that
+        is decoded as it is read, with no raw response body to hand to worker processes, so `processes` is ignored.
+        """
+        from .coreLmi import CoreLMIConnection
+
+        return CoreLMIConnection.post_retrieve_many(
+            self, queries, max_workers, return_exceptions, callback, processes=None, validate=validate
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        if name in REMOTE_METHODS:
+            return functools.partial(self.call, name)
+        if name in LOCAL_METHODS:
+            from .coreLmi import CoreLMIConnection
+
+            return functools.partial(getattr(CoreLMIConnection, name), self)
+
+        raise AttributeError(name)
+
+
+def connect(path: str | None = None) -> DaemonClient | None:
+    """
+    Returns a client for the daemon if one is answering on the socket, otherwise None. A path that is not a
+    socket owned by the current user is never connected to, since another user could be listening on it.
+    """
+    path = path or socket_path()
+    if not is_own_socket(path):
+        return None
+
+    client = DaemonClient(path, timeout=1)
+    try:
+        client.call("ping")
+    except (OSError, ValueError, LightcastError):
+        return None
+
+    # the ping only needs to be quick; real requests can take as long as the API does
+    client.timeout = None
+    return client
@@ -0,0 +1,235 @@
+"""Datarun diffing and incremental refresh of Agnitio query results
+
+When a new datarun is published, `diff_dataruns` compares the dataset metadata and dimension
+hierarchies of the two versions (all of which come from the metadata cache), and
+`incremental_refresh` uses that diff to re-query only the shards of a previous result whose
+members changed, keeping the previous rows for every other shard.
+
+The kept rows still hold the old datarun's values: a new datarun usually revises the figures of
+every member, not just the ones whose hierarchy changed. An incremental refresh keeps a result's
+structure current (new, removed and re-parented members) cheaply; re-run the whole query when
+the values themselves must come from the new datarun.
+
+A shard is one member in the `mapLevel` predicate of the query's shard dimension, e.g. one county
+of an Area constraint, together with every row below it.
+"""
+
+from __future__ import annotations
+
+import copy
+
+import pandas as pd
+
+
+class DimensionDiff:
+    """Members of one dimension that differ between two dataruns
+
+    Attributes:
+        added (set): member ids only in the new datarun
+        removed (set): member ids only in the old datarun
+        changed (set): member ids in both whose name or parent differs
+    """
+
+    def __init__(self, added: set, removed: set, changed: set) -> None:
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    @property
+    def members(self) -> set:
+        """Every member id that was added, removed or changed"""
+        return self.added | self.removed | self.changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return f"DimensionDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+class DatarunDiff:
+    """Differences in a dataset's metadata between two dataruns
+
+    Attributes:
+        dataset (str): the dataset compared
+        old (str): the previous datarun
+        new (str): the new datarun
+        metrics_added (set): metric names only in the new datarun
+        metrics_removed (set): metric names only in the old datarun
+        dimensions (dict): a DimensionDiff per dimension compared
+        hierarchies (dict): (old, new) hierarchy records per dimension compared
+    """
+
+    def __init__(self, dataset: str, old: str, new: str) -> None:
+        self.dataset = dataset
+        self.old = old
+        self.new = new
+        self.metrics_added: set = set()
+        self.metrics_removed: set = set()
+        self.dimensions: dict = {}
+        self.hierarchies: dict = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"DatarunDiff({self.dataset}: {self.old} -> {self.new}, metrics +{len(self.metrics_added)}"
+            f"/-{len(self.metrics_removed)}, dimensions={self.dimensions})"
+        )
+
+
+def _metric_names(dataset_info: dict) -> set:
+    metrics = dataset_info.get("metrics", [])
+    if isinstance(metrics, dict):
+        return set(metrics)
+
+    return {metric["name"] for metric in metrics if isinstance(metric, dict) and "name" in metric}
+
+
+def _members(hierarchy: dict) -> dict:
+    """member id -> (name, parent) for every member of a hierarchy response"""
+    return {str(r["child"]): (r.get("name"), str(r.get("parent"))) for r in hierarchy.get("hierarchy", [])}
+
+
+def diff_dataruns(conn, dataset: str, old: str, new: str, dimensions: list = None) -> DatarunDiff:
+    """
+    Compares the metrics and dimension hierarchies of a dataset between two dataruns.
+
+    Args:
+        conn (CoreLMIConnection): the connection to read (cached) metadata from
+        dataset (str): the dataset to compare (e.g. `emsi.us.occupation`)
+        old (str): the previous datarun (e.g. `2025.3`)
+        new (str): the new datarun (e.g. `2025.4`)
+        dimensions (list, optional): only compare these dimensions (defaults to every dimension of the new datarun)
+
+    Returns:
+        DatarunDiff: the differences found
+    """
+    from .coreLmi import dimension_names
+
+    old_info = conn.get_meta_dataset(dataset, old)
+    new_info = conn.get_meta_dataset(dataset, new)
+
+    diff = DatarunDiff(dataset, old, new)
+    diff.metrics_added = _metric_names(new_info) - _metric_names(old_info)
+    diff.metrics_removed = _metric_names(old_info) - _metric_names(new_info)
+
+    old_dimensions = set(dimension_names(old_info))
+    for dimension in dimensions or dimension_names(new_info):
+        new_members = _members(conn.get_meta_dataset_dimension(dataset, dimension, new))
+        old_members = {}
+        if dimension in old_dimensions:
+            old_members = _members(conn.get_meta_dataset_dimension(dataset, dimension, old))
+
+        diff.hierarchies[dimension] = (old_members, new_members)
+        diff.dimensions[dimension] = DimensionDiff(
+            added=new_members.keys() - old_members.keys(),
+            removed=old_members.keys() - new_members.keys(),
+            changed={m for m in new_members.keys() & old_members.keys() if new_members[m] != old_members[m]},
+        )
+
+    return diff
+
+
+def _shard_of(member: str, shards: set, *parent_maps: dict) -> str | None:
+    """The shard `member` belongs to, found by walking up its parents in either hierarchy"""
+    for members in parent_maps:
+        seen = set()
+        while member in members and member not in seen:
+            if member in shards:
+                return member
+            seen.add(member)
+            member = members[member][1]
+        if member in shards:
+            return member
+
+    return None
+
+
+def _affected_shards(diff: DimensionDiff, shards: set, old_members: dict, new_members: dict) -> set:
+    """The shards containing an added, removed or changed member"""
+    affected = set()
+    for member in diff.members:
+        shard = _shard_of(member, shards, new_members, old_members)
+        if shard is not None:
+            affected.add(shard)
+
+    return affected
+
+
+def incremental_refresh(
+    conn,
+    dataset: str,
+    payload: dict,
+    previous: pd.DataFrame,
+    old: str,
+    new: str,
+    shard_dimension: str,
+) -> pd.DataFrame:
+    """
+    Brings a query result from an old datarun up to a new one, re-querying only the shards of
+    `shard_dimension` whose members changed and reusing `previous` rows for the rest.
+
+    The reused rows are not refetched, so their values are still those of `old` even though the result
+    describes `new`; they are listed in `df.attrs["reused_shards"]`. Use `conn.post_retrieve_df` at `new`
+    when every value has to be current.
+
+    Falls back to re-running the whole query when the change cannot be confined to shards: a requested
+    metric is new, another constrained dimension changed, or a previous row cannot be placed in a shard.
+
+    Args:
+        conn (CoreLMIConnection): the connection to query with
+        dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+        payload (dict): the query that produced `previous`; the shard dimension must use a `mapLevel` constraint
+        previous (pd.DataFrame): the result of `payload` at the old datarun
+        old (str): the datarun `previous` was queried at
+        new (str): the datarun to refresh to
+        shard_dimension (str): the constrained dimension whose predicate members are the shards (e.g. `Area`)
+
+    Returns:
+        pd.DataFrame: the result of `payload` at the new datarun; `df.attrs["refreshed_shards"]` lists the shards
+        that were re-queried (every shard after a full re-query) and `df.attrs["reused_shards"]` those whose rows,
+        and values, were kept from `old`
+    """
+    constraints = {c.get("dimensionName"): c for c in payload.get("constraints", [])}
+    shard_constraint = constraints.get(shard_dimension)
+    if shard_constraint is None or "mapLevel" not in shard_constraint:
+        raise ValueError(f"The query needs a mapLevel constraint on {shard_dimension!r} to be refreshed by shard")
+
+    # predicates may be given as numbers, while hierarchy ids are strings
+    predicate = {str(s): s for s in shard_constraint["mapLevel"].get("predicate", [])}
+    shards = list(predicate)
+    diff = diff_dataruns(conn, dataset, old, new, dimensions=list(constraints))
+
+    def full() -> pd.DataFrame:
+        df = conn.post_retrieve_df(dataset, payload, new)
+        df.attrs["refreshed_shards"] = shards
+        df.attrs["reused_shards"] = []
+        return df
+
+    metrics = {m["name"] if isinstance(m, dict) else m for m in payload.get("metrics", [])}
+    if metrics & diff.metrics_added or not metrics <= set(previous.columns):
+        return full()
+    if any(diff.dimensions[d] for d in constraints if d != shard_dimension):
+        return full()
+
+    old_members, new_members = diff.hierarchies[shard_dimension]
+    affected = _affected_shards(diff.dimensions[shard_dimension], set(shards), old_members, new_members)
+
+    rows = previous[shard_dimension].astype(str)
+    row_shards = rows.map({m: _shard_of(m, set(shards), old_members) for m in rows.unique()})
+    if row_shards.isna().any():
+        return full()
+
+    kept = previous[~row_shards.isin(affected)]
+    refreshed = [s for s in shards if s in affected]
+    if refreshed:
+        shard_payload = copy.deepcopy(payload)
+        for constraint in shard_payload["constraints"]:
+            if constraint.get("dimensionName") == shard_dimension:
+                constraint["mapLevel"]["predicate"] = [predicate[s] for s in refreshed]
+        kept = pd.concat([kept, conn.post_retrieve_df(dataset, shard_payload, new)], ignore_index=True)
+    else:
+        kept = kept.reset_index(drop=True)
+
+    kept.attrs["refreshed_shards"] = refreshed
+    kept.attrs["reused_shards"] = [s for s in shards if s not in affected]
+    return kept
@@ -0,0 +1,111 @@
+"""Exceptions raised by pyghtcast
+
+Every error pyghtcast raises on purpose derives from `LightcastError`, so callers can catch them
+all at once or pick out the ones they handle:
+
+    LightcastError
+    ├── APIError                 a request the API answered with an error status
+    │   ├── AuthenticationError  rejected credentials or token (also a ValueError)
+    │   └── RateLimitError       429 Too Many Requests
+    ├── QueryValidationError     a query that does not match the dataset metadata (also a ValueError)
+    └── DaemonError              an error reported by the `pyghtcast serve` daemon
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+# the most of a response body kept on an exception or written to the log
+MAX_BODY = 500
+
+
+def truncate(text: str, limit: int = MAX_BODY) -> str:
+    """`text` cut to `limit` characters, noting how much was left out"""
+    text = text or ""
+    if len(text) <= limit:
+        return text
+
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+class LightcastError(Exception):
+    """Base class of the errors raised by pyghtcast"""
+
+
+class APIError(LightcastError):
+    """Raised when the API answers a request with an error status
+
+    Attributes:
+        status_code (int): the HTTP status of the response
+        url (str): the url requested
+        body (str): the start of the response body
+    """
+
+    def __init__(self, message: str, status_code: int = None, url: str = None, body: str = None) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.body = truncate(body) if body is not None else None
+        super().__init__(message)
+
+
+class AuthenticationError(APIError, ValueError):
+    """Raised when the auth server rejects the credentials, or the API rejects the token"""
+
+
+class RateLimitError(APIError):
+    """Raised when the API reports that the client's quota is used up
+
+    Attributes:
+        retry_after (float): seconds until the API accepts requests again, if it said so
+    """
+
+    def __init__(self, message: str, retry_after: float = None, **kwargs) -> None:
+        self.retry_after = retry_after
+        super().__init__(message, **kwargs)
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_success(response: requests.Response) -> bool:
+    """Whether the response has a 2xx status, the test `check_response` applies"""
+    return 200 <= response.status_code < 300
+
+
+def check_response(response: requests.Response, url: str = None) -> requests.Response:
+    """
+    Raises the matching APIError for an unsuccessful response.
+
+    Args:
+        response (requests.Response): the response to check
+        url (str, optional): the url requested (defaults to the response's own)
+
+    Returns:
+        requests.Response: the response, if it was successful
+
+    Raises:
+        AuthenticationError: on a 401 or 403
+        RateLimitError: on a 429
+        APIError: on any other status outside 2xx
+    """
+    if is_success(response):
+        return response
+
+    status = response.status_code
+    url = url or response.url
+    body = response.text
+    message = f"{status} error from {url}: {truncate(body, 200)}"
+    if status in (401, 403):
+        raise AuthenticationError(message, status_code=status, url=url, body=body)
+    if status == 429:
+        raise RateLimitError(message, retry_after=_retry_after(response), status_code=status, url=url, body=body)
+
+    raise APIError(message, status_code=status, url=url, body=body)
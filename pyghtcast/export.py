@@ -0,0 +1,135 @@
+"""Columnar (Parquet / Feather / Arrow IPC) export of DataFrames returned by the API"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FORMATS = ("parquet", "feather", "arrow")
+
+
+def require_pyarrow():
+    """Imports pyarrow, the optional dependency of columnar export, with install instructions if it is missing"""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Columnar export requires pyarrow. Install it with `pip install pyghtcast[arrow]`") from e
+
+    return pyarrow
+
+
+def publish(tmp: str, path: str) -> None:
+    """
+    Moves a finished temporary file over `path`, first giving it the permissions open() would have
+    (mkstemp creates files that only their owner can read).
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp, 0o666 & ~umask)
+    os.replace(tmp, path)
+
+
+def project(df: pd.DataFrame, columns: list[str] | None = None) -> pd.DataFrame:
+    """Keeps only the requested columns, in the requested order
+
+    Raises:
+        KeyError: if a requested column is not in the DataFrame
+    """
+    if not columns:
+        return df
+
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not found: {', '.join(missing)}")
+
+    return df[list(columns)]
+
+
+def write_df(
+    df: pd.DataFrame,
+    path: str,
+    to: str = "parquet",
+    columns: list[str] | None = None,
+    dimensions: list[str] | None = None,
+    shard_size: int = 100_000,
+) -> None:
+    """
+    Writes a DataFrame to a columnar file, one shard of rows at a time.
+    Dimension columns are dictionary-encoded with a single dictionary shared by every shard.
+
+    Args:
+        df (pd.DataFrame): the data to write
+        path (str): the file to write to
+        to (str, optional): one of "parquet", "feather" (Arrow IPC file) or "arrow" (Arrow IPC stream)
+        columns (list, optional): the columns to keep (all columns if omitted)
+        dimensions (list, optional): the columns to dictionary-encode (every text column if omitted)
+        shard_size (int, optional): the number of rows converted and written at a time
+
+    Raises:
+        ValueError: if `to` is not a supported format
+        ImportError: if pyarrow is not installed
+    """
+    if to not in FORMATS:
+        raise ValueError(f"Unsupported format {to!r}, expected one of: {', '.join(FORMATS)}")
+
+    pa = require_pyarrow()
+    import pandas as pd
+    import pyarrow.ipc
+    import pyarrow.parquet
+    from pandas.api.types import is_string_dtype
+
+    df = project(df, columns)
+
+    if dimensions is None:
+        dimensions = [c for c in df.columns if is_string_dtype(df[c])]
+    dimensions = [c for c in dimensions if c in df.columns]
+    # categories computed over the whole column, so that every shard carries the same dictionary
+    categories = {c: pd.Index(df[c].dropna().unique()) for c in dimensions}
+
+    def encode(shard: pd.DataFrame) -> pd.DataFrame:
+        return shard.assign(**{c: pd.Categorical(shard[c], categories=categories[c]) for c in dimensions})
+
+    # the schema describes the whole frame, so a column that is empty in the first shard keeps its type
+    others = pa.Schema.from_pandas(df.drop(columns=dimensions), preserve_index=False)
+    dictionaries = pa.Schema.from_pandas(encode(df.iloc[:0]), preserve_index=False)
+    schema = pa.schema(
+        [dictionaries.field(c) if c in categories else others.field(c) for c in df.columns],
+        metadata=dictionaries.metadata,
+    )
+
+    if to == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    elif to == "feather":
+        writer = pyarrow.ipc.new_file(path, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(path, schema)
+
+    shard_size = max(shard_size, 1)
+    with writer:
+        for start in range(0, max(len(df), 1), shard_size):
+            shard = encode(df.iloc[start : start + shard_size])
+            writer.write_table(pa.Table.from_pandas(shard, schema=schema, preserve_index=False))
+
+
+def to_ipc_buffer(df: pd.DataFrame) -> bytes:
+    """A DataFrame as an Arrow IPC stream in memory, e.g. to hand it to another process without pickling each value"""
+    pa = require_pyarrow()
+    import pyarrow.ipc
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc_buffer(buffer: bytes) -> pd.DataFrame:
+    """The DataFrame in an Arrow IPC stream written by `to_ipc_buffer` (converting it to pandas copies the columns)"""
+    pa = require_pyarrow()
+    import pyarrow.ipc
+
+    return pyarrow.ipc.open_stream(pa.py_buffer(buffer)).read_all().to_pandas()
@@ -0,0 +1,103 @@
+"""Related-skills graph built from the skills `related` endpoint
+
+`RelatedSkillsGraph` caches each skill's related skills per (version, skill ID, limit), so a graph
+over overlapping seed sets costs one request per distinct skill rather than one per call. Breadth
+first expansion fetches each frontier concurrently.
+
+The endpoint ranks skills related to the *combined* set of IDs it is sent, so a multi-ID request
+cannot be split back into each skill's own neighbours; every uncached skill is fetched on its own,
+with identical in-flight requests shared by the connection.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import LRUCache
+
+
+class RelatedSkillsGraph:
+    """Adjacency cache and BFS expansion over related skills
+
+    Attributes:
+        conn (SkillsClassificationConnection): the connection to fetch related skills with
+        version (str): the skills version the graph is built on
+        limit (int): the number of related skills fetched per skill
+        max_workers (int): the number of requests in flight while fetching a frontier
+    """
+
+    def __init__(self, conn, version: str = "latest", limit: int = 10, max_workers: int = 8, maxsize: int = 100_000):
+        self.conn = conn
+        self.version = version
+        self.limit = limit
+        self.max_workers = max_workers
+        self.adjacency = LRUCache(maxsize=maxsize)
+
+    def _key(self, skill_id: str) -> tuple:
+        return self.version, skill_id, self.limit
+
+    def _fetch_one(self, skill_id: str) -> list:
+        data = self.conn.post_find_related_skills([skill_id], limit=self.limit, version=self.version)["data"]
+        self.adjacency.set(self._key(skill_id), data)
+        return data
+
+    def related(self, skill_ids: list) -> dict:
+        """
+        The related skills of each ID, fetching the uncached ones concurrently.
+
+        Args:
+            skill_ids (list): the skill IDs to look up
+
+        Returns:
+            dict: skill ID -> list of related skill records (id, name, type, infoUrl)
+        """
+        found = {}
+        missing = []
+        for skill_id in dict.fromkeys(skill_ids):
+            cached = self.adjacency.get(self._key(skill_id))
+            if cached is None:
+                missing.append(skill_id)
+            else:
+                found[skill_id] = cached
+
+        if len(missing) == 1:
+            found[missing[0]] = self._fetch_one(missing[0])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                found.update(zip(missing, executor.map(self._fetch_one, missing), strict=True))
+
+        return {skill_id: found[skill_id] for skill_id in dict.fromkeys(skill_ids)}
+
+    def neighbors(self, skill_id: str) -> list:
+        """The IDs of the skills related to `skill_id`"""
+        return [record["id"] for record in self.related([skill_id])[skill_id]]
+
+    def expand(self, seeds: list, depth: int = 1) -> dict:
+        """
+        Breadth-first expansion from the seeds, fetching each level's frontier concurrently.
+
+        Args:
+            seeds (list): the skill IDs to start from
+            depth (int, optional): how many hops to expand (1 returns the seeds' neighbours)
+
+        Returns:
+            dict: adjacency of every skill within `depth - 1` hops of a seed: skill ID -> related skill IDs
+        """
+        graph: dict = {}
+        visited = set(seeds)
+        frontier = list(dict.fromkeys(seeds))
+
+        for _ in range(depth):
+            if not frontier:
+                break
+
+            next_frontier = []
+            for skill_id, records in self.related(frontier).items():
+                graph[skill_id] = [record["id"] for record in records]
+                for neighbor in graph[skill_id]:
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return graph
@@ -1,19 +1,40 @@
+from collections.abc import Iterable
+
 import pandas as pd
 
-from . import coreLmi, openSkills
+from . import coreLmi, export, openSkills, planner, pool, rollup, store, timeseries
 
 
 class Lightcast:
     conn: coreLmi.CoreLMIConnection | None = None
 
-    def __init__(self, username: str, password: str):
-        self.conn = coreLmi.CoreLMIConnection(username, password)
+    def __init__(
+        self,
+        username: str | None = None,
+        password: str | None = None,
+        credentials: list[tuple[str, str]] | None = None,
+        store_dir: str | None = None,
+    ):
+        # several (username, password) credentials spread requests across each client's quota
+        if credentials:
+            self.conn = pool.ConnectionPool(credentials)
+        else:
+            self.conn = coreLmi.CoreLMIConnection(username, password)
+
+        # with a store, every query result is kept as Parquet and repeated queries are answered from disk
+        self.store = store.ResultStore(store_dir) if store_dir else None
 
-    def build_query_corelmi(self, cols: list, constraints: list[dict] | None = None) -> dict:
+    def build_query_corelmi(
+        self, cols: list, constraints: list[dict] | None = None, years: Iterable[int] | None = None
+    ) -> dict:
         if constraints is None:
             constraints = []
         query: dict = {"metrics": [], "constraints": constraints}
 
+        # with years, cols are metric names to request for each year (e.g. ["Jobs"] -> Jobs.2013, Jobs.2014, ...)
+        if years is not None:
+            cols = timeseries.expand_metrics(cols, years)
+
         # take as list of column names just to make the syntax easier
         # convert it to expected syntax for the API
         for c in cols:
@@ -21,8 +42,91 @@ class Lightcast:
 
         return query
 
-    def query_corelmi(self, dataset: str, query: dict, datarun: str = "2025.3") -> pd.DataFrame:
-        return self.conn.post_retrieve_df(dataset, query, datarun)
+    def to_long(self, df: pd.DataFrame) -> pd.DataFrame:
+        return timeseries.to_long(df)
+
+    def growth(self, df: pd.DataFrame, metric: str, start: int, end: int) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "change": timeseries.change(df, metric, start, end),
+                "pct_change": timeseries.pct_change(df, metric, start, end),
+                "cagr": timeseries.cagr(df, metric, start, end),
+            }
+        )
+
+    def warm(self, datasets: list[str], datarun: str = "2025.3") -> dict:
+        return self.conn.warm(datasets, datarun)
+
+    def query_corelmi(
+        self,
+        dataset: str,
+        query: dict,
+        datarun: str = "2025.3",
+        to: str | None = None,
+        path: str | None = None,
+        columns: list[str] | None = None,
+        validate: bool = False,
+    ) -> pd.DataFrame:
+        if self.store is None:
+            return self.conn.post_retrieve_df(
+                dataset, query, datarun, to=to, path=path, columns=columns, validate=validate
+            )
+
+        if to is not None and path is None:
+            raise ValueError("A path is required when exporting with `to`")
+
+        df = self.store.get(dataset, datarun, query)
+        if df is None:
+            self.store.put(
+                dataset, datarun, query, self.conn.post_retrieve_df(dataset, query, datarun, validate=validate)
+            )
+            # read back, so the first answer has the same row order and dtypes as every later one from disk
+            df = self.store.get(dataset, datarun, query)
+        df = export.project(df, columns)
+
+        if to is not None:
+            metrics = {metric["name"] for metric in query.get("metrics", [])}
+            export.write_df(df, path, to=to, dimensions=[c for c in df.columns if c not in metrics])
+
+        return df
+
+    def local_query(
+        self,
+        columns: list[str] | None = None,
+        filters=None,
+        dataset: str | None = None,
+        datarun: str | None = None,
+    ) -> pd.DataFrame:
+        if self.store is None:
+            raise ValueError("local_query needs a result store: create Lightcast with store_dir=...")
+
+        return self.store.query(columns=columns, filters=filters, dataset=dataset, datarun=datarun)
+
+    def query_corelmi_levels(
+        self,
+        dataset: str,
+        query: dict,
+        dimension: str,
+        levels: list[int],
+        datarun: str = "2025.3",
+    ) -> dict[int, pd.DataFrame]:
+        # one pull at the query's own level; additive metrics are summed locally for each coarser level
+        return rollup.query_levels(self.conn, dataset, query, datarun, dimension, levels)
+
+    def batch(self, window: float | None = None) -> planner.QueryBatch:
+        # queries added to the batch are merged into as few requests as possible when it is flushed
+        return planner.QueryBatch(self.conn, window=window)
+
+    def refresh_corelmi(
+        self,
+        dataset: str,
+        query: dict,
+        previous: pd.DataFrame,
+        old_datarun: str,
+        new_datarun: str,
+        shard_dimension: str = "Area",
+    ) -> pd.DataFrame:
+        return self.conn.incremental_refresh(dataset, query, previous, old_datarun, new_datarun, shard_dimension)
 
 
 class Skills:
@@ -30,3 +134,9 @@ class Skills:
 
     def __init__(self, username: str, password: str):
         self.conn = openSkills.SkillsClassificationConnection(username, password)
+
+    def remap_skill_ids(self, ids, from_version: str, to_version: str = "latest"):
+        return self.conn.remap_skill_ids(ids, from_version, to_version)
+
+    def related_skills_graph(self, seeds: list[str], depth: int = 1, limit: int = 10, version: str = "latest") -> dict:
+        return self.conn.get_related_graph(version, limit).expand(seeds, depth)
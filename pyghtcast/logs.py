@@ -0,0 +1,96 @@
+"""Sampled logging of failed API responses
+
+Under load the same failure (an expired token, a quota hit, an outage) can come back from
+hundreds of requests at once. `log_failed_response` writes the first few of each kind per time
+window and only counts the rest, so an error storm costs a dictionary lookup per request instead
+of a blocking write, and the count of what was skipped is reported with the next message let through.
+
+pyghtcast never configures logging itself; attach handlers to the `pyghtcast` logger to see the events.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .exceptions import truncate
+
+if TYPE_CHECKING:
+    import requests
+
+
+class ErrorSampler:
+    """Lets `burst` events of each kind through per `window` seconds and counts the others
+
+    Attributes:
+        burst (int): events of one kind logged per window
+        window (float): the length of a window, in seconds
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0) -> None:
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        # kind -> [window start, events seen in the window, events suppressed since the last logged one]
+        self.kinds: dict = {}
+
+    def allow(self, kind) -> tuple[bool, int]:
+        """
+        Whether to log this event, and how many of its kind were suppressed since the last one logged.
+
+        Args:
+            kind (hashable): what makes events "the same", e.g. (status code, endpoint)
+
+        Returns:
+            tuple: (log it, number suppressed before it)
+        """
+        now = time.monotonic()
+        with self.lock:
+            state = self.kinds.setdefault(kind, [now, 0, 0])
+            if now - state[0] >= self.window:
+                state[0], state[1] = now, 0
+            state[1] += 1
+            if state[1] > self.burst:
+                state[2] += 1
+                return False, 0
+
+            suppressed, state[2] = state[2], 0
+            return True, suppressed
+
+
+sampler = ErrorSampler()
+
+
+def log_failed_response(
+    logger: logging.Logger,
+    response: requests.Response,
+    url: str,
+    payload=None,
+    endpoint: str = None,
+) -> None:
+    """
+    Logs an unsuccessful response, subject to `sampler`: a WARNING with the status and the start of the
+    body, and the request payload at DEBUG.
+
+    Args:
+        logger (logging.Logger): the logger to write to
+        response (requests.Response): the failed response
+        url (str): the url requested
+        payload (dict or str, optional): the request body sent
+        endpoint (str, optional): groups failures for sampling (defaults to `url`)
+    """
+    status = response.status_code
+    allowed, suppressed = sampler.allow((status, endpoint or url))
+    if not allowed:
+        return
+
+    extra = {"status_code": status, "url": url, "suppressed": suppressed}
+    note = f" ({suppressed} similar errors suppressed)" if suppressed else ""
+    logger.warning("%s error from %s: %s%s", status, url, truncate(response.text), note, extra=extra)
+
+    if payload is not None and logger.isEnabledFor(logging.DEBUG):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        logger.debug("Request payload for %s: %s", url, truncate(body), extra=extra)
@@ -0,0 +1,268 @@
+"""In-process metrics for the API connections, in the Prometheus text exposition format
+
+Metrics are off by default, and every recording function below returns immediately while they
+are. `enable()` installs a `Registry` that every connection records into:
+
+- `pyghtcast_requests_total{connection,endpoint,status}` and
+  `pyghtcast_request_duration_seconds{connection,endpoint}`: each HTTP request and its latency
+- `pyghtcast_limiter_wait_seconds{connection}`: time spent waiting on the Core LMI rate limiter
+- `pyghtcast_token_refreshes_total{connection,outcome}`: token requests
+- `pyghtcast_cache_lookups_total{cache,result}`: metadata and taxonomy cache hits and misses
+- `pyghtcast_transfer_bytes_total{connection,kind}`: response bytes on the wire and decoded
+
+The registry can be scraped from a local HTTP endpoint (`Registry.serve`) or written to a file
+for a node exporter's textfile collector (`Registry.write`).
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+
+from .export import publish
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# request latencies, in seconds; Core LMI queries can take most of a minute
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: dict = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self.lock:
+            return self.values.get(labels, 0)
+
+    def samples(self) -> list:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.values: dict = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, *labels) -> int:
+        with self.lock:
+            state = self.values.get(labels)
+            return sum(state[0]) if state else 0
+
+    def samples(self) -> list:
+        with self.lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self.values.items())
+
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts, strict=True):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics recorded by every connection while metrics are enabled
+
+    Attributes:
+        requests (Counter): requests by connection, endpoint and status
+        request_duration (Histogram): request latency by connection and endpoint
+        limiter_wait (Histogram): seconds slept on the rate limiter, by connection
+        token_refreshes (Counter): token requests by connection and outcome
+        cache_lookups (Counter): cache lookups by cache and result (hit or miss)
+        transfer_bytes (Counter): response body bytes by connection and kind (wire or decoded)
+    """
+
+    def __init__(self) -> None:
+        self.requests = Counter(
+            "pyghtcast_requests_total", "HTTP requests sent to the API", ("connection", "endpoint", "status")
+        )
+        self.request_duration = Histogram(
+            "pyghtcast_request_duration_seconds", "Time until the API's response arrived", ("connection", "endpoint")
+        )
+        self.limiter_wait = Histogram(
+            "pyghtcast_limiter_wait_seconds", "Time spent waiting on the rate limiter", ("connection",)
+        )
+        self.token_refreshes = Counter(
+            "pyghtcast_token_refreshes_total", "Access tokens requested", ("connection", "outcome")
+        )
+        self.cache_lookups = Counter("pyghtcast_cache_lookups_total", "Cache lookups", ("cache", "result"))
+        self.transfer_bytes = Counter(
+            "pyghtcast_transfer_bytes_total", "Response body bytes, on the wire and decoded", ("connection", "kind")
+        )
+        self.metrics = [
+            self.requests,
+            self.request_duration,
+            self.limiter_wait,
+            self.token_refreshes,
+            self.cache_lookups,
+            self.transfer_bytes,
+        ]
+
+    def exposition(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes the exposition to a file atomically, e.g. for node_exporter's textfile collector"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".metrics-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.exposition())
+        # the collector usually runs as another user
+        publish(tmp, path)
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves the exposition over HTTP from a background thread.
+
+        Args:
+            port (int, optional): the port to listen on (0 picks a free one)
+            host (str, optional): the address to listen on (local only by default)
+
+        Returns:
+            ThreadingHTTPServer: the running server; call `.shutdown()` to stop it
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = registry.exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="pyghtcast-metrics", daemon=True).start()
+        return server
+
+
+_registry: Registry | None = None
+
+
+def enable(registry: Registry = None) -> Registry:
+    """Starts recording metrics into `registry` (a new one if omitted) and returns it"""
+    global _registry
+    _registry = registry or Registry()
+    return _registry
+
+
+def disable() -> None:
+    """Stops recording metrics"""
+    global _registry
+    _registry = None
+
+
+def registry() -> Registry | None:
+    """The registry metrics are recorded into, or None while they are disabled"""
+    return _registry
+
+
+def endpoint_label(api_endpoint: str) -> str:
+    """
+    A bounded label for an endpoint: its first three path segments, with segments containing digits
+    (dataruns, versions, ids) replaced by `:id`, e.g. `emsi.us.occupation/2025.3` -> `emsi.us.occupation/:id`.
+    """
+    segments = api_endpoint.split("?", 1)[0].strip("/").split("/")[:3]
+    return "/".join(":id" if any(c.isdigit() for c in segment) else segment for segment in segments)
+
+
+def observe_request(connection: str, api_endpoint: str, status: int, seconds: float) -> None:
+    if _registry is None:
+        return
+    endpoint = endpoint_label(api_endpoint)
+    _registry.requests.inc(connection, endpoint, str(status))
+    _registry.request_duration.observe(seconds, connection, endpoint)
+
+
+def observe_limiter_wait(connection: str, seconds: float) -> None:
+    if _registry is not None:
+        _registry.limiter_wait.observe(seconds, connection)
+
+
+def count_token_refresh(connection: str, outcome: str) -> None:
+    if _registry is not None:
+        _registry.token_refreshes.inc(connection, outcome)
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    if _registry is not None:
+        _registry.cache_lookups.inc(cache, "hit" if hit else "miss")
+
+
+def count_transfer(connection: str, wire_bytes: int, decoded_bytes: int) -> None:
+    if _registry is not None:
+        _registry.transfer_bytes.inc(connection, "wire", amount=wire_bytes)
+        _registry.transfer_bytes.inc(connection, "decoded", amount=decoded_bytes)
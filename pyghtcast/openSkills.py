@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+
 from .base import EmsiBaseConnection
+from .cache import LRUCache
+from .changes import SkillChangeIndex, version_key
+from .graph import RelatedSkillsGraph
+from .records import check_format, convert_extraction, convert_skills
 
 
 class SkillsClassificationConnection(EmsiBaseConnection):
@@ -14,13 +20,16 @@ class SkillsClassificationConnection(EmsiBaseConnection):
         token (TYPE): Description
     """
 
+    base_url = "https://emsiservices.com/skills/"
+
     def __init__(self, username: str, password: str) -> None:
         """Summary"""
         super().__init__(username, password)
-        self.base_url = "https://emsiservices.com/skills/"
         self.scope = "emsi_open"
 
         self.get_new_token()
+        self.change_indexes = LRUCache(maxsize=32)
+        self.related_graphs: dict = {}
 
         self.name = "Skills"
 
@@ -60,13 +69,62 @@ class SkillsClassificationConnection(EmsiBaseConnection):
 
         return data
 
+    def get_change_index(self, from_version: str, to_version: str = "latest") -> SkillChangeIndex:
+        """
+        The changes between two versions composed into one index, built from the changes of every version in between.
+        Indexes are cached per version pair on the connection.
+
+        Args:
+            from_version (str): the version the stored IDs come from (e.g. `8.0`)
+            to_version (str, optional): the version to migrate to (default: "latest")
+
+        Returns:
+            SkillChangeIndex: replacements, removals, renames and additions between the versions
+        """
+        # an explicit version pair is answered from the cache without listing the versions
+        index = self.change_indexes.get((from_version, to_version)) if to_version != "latest" else None
+        if index is not None:
+            return index
+
+        versions = self.get_versions()
+        if isinstance(versions, dict):
+            versions = versions["data"]
+        versions = sorted(versions, key=version_key)
+        if to_version == "latest":
+            to_version = versions[-1]
+
+        key = (from_version, to_version)
+        index = self.change_indexes.get(key)
+        if index is None:
+            between = [v for v in versions if version_key(from_version) < version_key(v) <= version_key(to_version)]
+            changes = [(version, self.get_version_changes(version)) for version in between]
+            index = SkillChangeIndex.from_changes(from_version, to_version, changes)
+            self.change_indexes.set(key, index)
+
+        return index
+
+    def remap_skill_ids(self, ids, from_version: str, to_version: str = "latest"):
+        """
+        Migrates stored skill IDs from one version to another in a single vectorized pass.
+
+        Args:
+            ids (pd.Series, np.ndarray or list): skill IDs from `from_version`
+            from_version (str): the version the IDs come from (e.g. `8.0`)
+            to_version (str, optional): the version to migrate to (default: "latest")
+
+        Returns:
+            pd.Series or np.ndarray: the IDs in `to_version`; None where a skill was removed without a replacement
+        """
+        return self.get_change_index(from_version, to_version).remap(ids)
+
     def get_list_all_skills(
         self,
         version: str = "latest",
         q: str | None = None,
         typeIds: str | None = None,
         fields: str | None = None,
-    ) -> dict:
+        return_format: str = "json",
+    ):
         """Summary
 
         Args:
@@ -74,10 +132,13 @@ class SkillsClassificationConnection(EmsiBaseConnection):
             q (str, optional): A query string of skill names to search for.
             typeIds (str, optional): Description
             fields (str, optional): Description
+            return_format (str, optional): "json" for the raw response, or "records" (list of Skill) or
+                "table" (SkillTable) for compact forms of its data
 
         Returns:
-            list: Description
+            dict, list or SkillTable: the skills, in `return_format`
         """
+        check_format(return_format)
 
         base_querystring = {
             "q": q,
@@ -92,13 +153,18 @@ class SkillsClassificationConnection(EmsiBaseConnection):
                 querystring[key] = value
 
         if len(querystring) > 0:
-            return self.download_data(
+            data = self.download_data(
                 f"versions/{version}/skills",
                 querystring=querystring,
             ).json()
 
         else:
-            return self.download_data(f"versions/{version}/skills").json()
+            data = self.download_data(f"versions/{version}/skills").json()
+
+        if return_format == "json":
+            return data
+
+        return convert_skills(data["data"], return_format)
 
     def post_list_requested_skills(
         self,
@@ -106,19 +172,34 @@ class SkillsClassificationConnection(EmsiBaseConnection):
         version: str = "latest",
         typeIds=None,
         fields=None,
+        chunk_size: int = 500,
+        max_workers: int = 4,
     ) -> dict:
-        """Summary
+        """
+        Looks up the skills with the given IDs. Long ID lists are split into chunks of `chunk_size` that are
+        requested concurrently, and the skills are returned in the order of the requested IDs.
 
         Args:
-            payload (dict): Description
-            version (str, optional): Description
-            typeIds (None, optional): Description
-            fields (None, optional): Description
+            payload (dict): {"ids": [...]} with the skill IDs to look up
+            version (str, optional): version of dataset (default: "latest")
+            typeIds (str or list, optional): only return skills of these types (e.g. "ST1,ST2")
+            fields (str or list, optional): only return these fields (e.g. ["id", "name"]), to keep responses small
+            chunk_size (int, optional): the maximum number of IDs sent per request
+            max_workers (int, optional): the number of chunk requests in flight at once
 
         Returns:
-            dict: Description
+            dict: the response, with the skills of every chunk in its "data"
         """
 
+        ids = payload.get("ids") if isinstance(payload, dict) else None
+        chunked = ids is not None and len(ids) > chunk_size
+
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        if chunked and fields is not None and "id" not in fields:
+            # chunks are merged back into request order by id
+            fields = ["id", *fields]
+
         base_querystring = {
             "typeIds": typeIds,
             "fields": fields,
@@ -126,21 +207,28 @@ class SkillsClassificationConnection(EmsiBaseConnection):
 
         querystring: dict = {}
         for key, value in base_querystring.items():
-            if value is None:
-                querystring[key] = value
+            if value is not None:
+                querystring[key] = value if isinstance(value, str) else ",".join(value)
 
-        if len(querystring) > 0:
+        def fetch(chunk_payload) -> dict:
             return self.download_data(
                 f"versions/{version}/skills",
-                payload=payload,
-                querystring=querystring,
+                payload=chunk_payload,
+                querystring=querystring or None,
             ).json()
 
-        else:
-            return self.download_data(
-                f"versions/{version}/skills",
-                payload=payload,
-            ).json()
+        if not chunked:
+            return fetch(payload)
+
+        chunks = [{**payload, "ids": ids[i : i + chunk_size]} for i in range(0, len(ids), chunk_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(fetch, chunks))
+
+        by_id = {skill["id"]: skill for response in responses for skill in response.get("data", [])}
+        merged = dict(responses[0])
+        merged["data"] = [by_id[skill_id] for skill_id in dict.fromkeys(ids) if skill_id in by_id]
+
+        return merged
 
     def get_skill_by_id(self, skill_id: str, version: str = "latest") -> dict:
         """Summary
@@ -186,28 +274,52 @@ class SkillsClassificationConnection(EmsiBaseConnection):
             payload=payload,
         ).json()
 
+    def get_related_graph(self, version: str = "latest", limit: int = 10) -> RelatedSkillsGraph:
+        """
+        The related-skills graph for a version and neighbour limit, shared by every caller on this connection
+        so that adjacency fetched once is reused.
+
+        Args:
+            version (str, optional): the skills version (default: "latest")
+            limit (int, optional): the number of related skills per skill
+
+        Returns:
+            RelatedSkillsGraph: the cached graph
+        """
+        return self.related_graphs.setdefault((version, limit), RelatedSkillsGraph(self, version, limit))
+
     def post_extract(
         self,
         description: str,
         version: str = "latest",
         confidenceThreshold: float = 0.5,
-    ) -> dict:
+        return_format: str = "json",
+    ):
         """Summary
 
         Args:
             description (str): Description
             version (str, optional): Description
             confidenceThreshold (float, optional): Description
+            return_format (str, optional): "json" for the raw response, or "records" (list of ExtractedSkill) or
+                "table" (SkillTable with confidences) for compact forms of its data
 
         Returns:
-            dict: Description
+            dict, list or SkillTable: the extracted skills, in `return_format`
         """
-        return self.download_data(
+        check_format(return_format)
+
+        data = self.download_data(
             f"versions/{version}/extract",
             payload={"text": description},
             querystring={"confidenceThreshold": confidenceThreshold},
         ).json()
 
+        if return_format == "json":
+            return data
+
+        return convert_extraction(data["data"], return_format)
+
     def post_extract_with_source(
         self,
         description: str,
@@ -0,0 +1,323 @@
+"""Batching of small Agnitio queries into fewer requests
+
+Queries added to a `QueryBatch` are planned together when the batch is flushed (at the end of a
+`with` block, after an optional time window, or when a result is first needed):
+
+- queries on the same dataset, datarun and constraints are sent once, with the union of their metrics
+- queries that differ only in the predicate of one `mapLevel` constraint are sent once, with the
+  union of the predicates; each query's rows are picked back out through the dimension hierarchy
+
+Each query's `PendingQuery.result()` is the DataFrame it would have got on its own.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import threading
+
+import pandas as pd
+
+
+def _canonical(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _metric_names(payload: dict) -> list:
+    return [m["name"] if isinstance(m, dict) else m for m in payload.get("metrics", [])]
+
+
+class PendingQuery:
+    """A query waiting in a QueryBatch
+
+    Attributes:
+        dataset (str): the dataset to query
+        payload (dict): the query
+        datarun (str): the data version to query
+    """
+
+    def __init__(self, batch: QueryBatch, dataset: str, payload: dict, datarun: str) -> None:
+        self.batch = batch
+        self.dataset = dataset
+        self.payload = payload
+        self.datarun = datarun
+        self._done = threading.Event()
+        self._df: pd.DataFrame | None = None
+        self._error: BaseException | None = None
+
+    def set_result(self, df: pd.DataFrame) -> None:
+        self._df = df
+        self._done.set()
+
+    def set_exception(self, error: BaseException) -> None:
+        self._error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: float = None) -> pd.DataFrame:
+        """The query's DataFrame, flushing the batch first if it has not been sent yet"""
+        if not self.done():
+            self.batch.flush()
+        if not self._done.wait(timeout):
+            raise TimeoutError("The batched query did not finish in time")
+        if self._error is not None:
+            raise self._error
+
+        return self._df
+
+
+class _Bucket:
+    """Queries that can be answered by one merged request"""
+
+    def __init__(self, dataset: str, datarun: str, constraints: list) -> None:
+        self.dataset = dataset
+        self.datarun = datarun
+        self.constraints = copy.deepcopy(constraints)
+        self.queries: list = []
+        # the dimension whose mapLevel predicates were merged, once two different predicates are combined
+        self.dimension: str | None = None
+
+    @property
+    def metrics(self) -> list:
+        return list(dict.fromkeys(name for query in self.queries for name in _metric_names(query.payload)))
+
+    def payload(self) -> dict:
+        return {"metrics": [{"name": name} for name in self.metrics], "constraints": self.constraints}
+
+    def merge_predicate(self, query: PendingQuery, dimension: str) -> None:
+        for constraint in self.constraints:
+            if constraint.get("dimensionName") == dimension:
+                predicate = constraint["mapLevel"]["predicate"]
+                new = _predicate(query.payload, dimension)
+                constraint["mapLevel"]["predicate"] = list(dict.fromkeys(predicate + new))
+        self.dimension = dimension
+        self.queries.append(query)
+
+
+def _predicate(payload: dict, dimension: str) -> list:
+    for constraint in payload.get("constraints", []):
+        if constraint.get("dimensionName") == dimension:
+            return list(constraint["mapLevel"].get("predicate", []))
+
+    return []
+
+
+def _wildcard_keys(query: PendingQuery) -> dict:
+    """dimension -> a key equal for queries that match except for that dimension's mapLevel predicate"""
+    constraints = query.payload.get("constraints", [])
+    keys = {}
+    for i, constraint in enumerate(constraints):
+        # without a predicate the constraint covers every member at its level, so there is nothing to merge
+        if "predicate" not in constraint.get("mapLevel", {}):
+            continue
+        others = sorted(_canonical(c) for j, c in enumerate(constraints) if j != i)
+        shape = {k: v for k, v in constraint.items() if k != "mapLevel"}
+        shape["level"] = constraint["mapLevel"].get("level")
+        keys[constraint.get("dimensionName")] = (query.dataset, query.datarun, _canonical(shape), tuple(others))
+
+    return keys
+
+
+def plan(queries: list) -> list:
+    """
+    Groups queries into as few requests as possible.
+
+    Args:
+        queries (list): PendingQuery objects
+
+    Returns:
+        list: buckets, each answered by a single request
+    """
+    buckets: list = []
+    exact: dict = {}
+    by_wildcard: dict = {}
+
+    for query in queries:
+        key = (query.dataset, query.datarun, tuple(sorted(_canonical(c) for c in query.payload.get("constraints", []))))
+        if key in exact:
+            exact[key].queries.append(query)
+            continue
+
+        wildcards = _wildcard_keys(query)
+        for dimension, wildcard in wildcards.items():
+            bucket = by_wildcard.get((dimension, wildcard))
+            if bucket is not None and bucket.dimension in (None, dimension):
+                bucket.merge_predicate(query, dimension)
+                exact[key] = bucket
+                break
+        else:
+            bucket = _Bucket(query.dataset, query.datarun, query.payload.get("constraints", []))
+            bucket.queries.append(query)
+            buckets.append(bucket)
+            exact[key] = bucket
+            for dimension, wildcard in wildcards.items():
+                by_wildcard.setdefault((dimension, wildcard), bucket)
+
+    return buckets
+
+
+def _ancestors(conn, bucket: _Bucket, members) -> dict:
+    """member id -> the member and all its ancestors in the bucket's merged dimension, for the given members"""
+    hierarchy = conn.get_meta_dataset_dimension(bucket.dataset, bucket.dimension, bucket.datarun)
+    parents = {str(r["child"]): str(r.get("parent")) for r in hierarchy.get("hierarchy", [])}
+    for record in hierarchy.get("hierarchy", []):
+        if record.get("display_id") is not None:
+            parents.setdefault(str(record["display_id"]), str(record.get("parent")))
+
+    chains = {}
+    for member in members:
+        if member not in parents:
+            continue
+        chain = set()
+        current = member
+        while current in parents and current not in chain:
+            chain.add(current)
+            current = parents[current]
+        chains[member] = frozenset(chain | {current})
+
+    return chains
+
+
+def split(conn, bucket: _Bucket, df: pd.DataFrame) -> list | None:
+    """
+    Each query's part of the merged result, in the order of `bucket.queries`.
+
+    Returns:
+        list: one DataFrame per query, or None if a row cannot be placed under any query's predicate
+    """
+    if len(bucket.queries) == 1:
+        return [df]
+
+    metrics = set(bucket.metrics)
+    dimensions = [c for c in df.columns if c not in metrics]
+
+    membership = None
+    if bucket.dimension is not None:
+        values = df[bucket.dimension].astype(str)
+        unique = values.unique()
+        ancestors = _ancestors(conn, bucket, unique)
+        merged = {str(p) for p in _predicate(bucket.payload(), bucket.dimension)}
+        if any(value not in ancestors or merged.isdisjoint(ancestors[value]) for value in unique):
+            return None
+        membership = values.map(ancestors)
+
+    parts = []
+    for query in bucket.queries:
+        columns = dimensions + [m for m in dict.fromkeys(_metric_names(query.payload)) if m in df.columns]
+        part = df
+        if membership is not None:
+            predicate = {str(p) for p in _predicate(query.payload, bucket.dimension)}
+            part = df[membership.map(lambda chain, predicate=predicate: not predicate.isdisjoint(chain))]
+        parts.append(part[columns].reset_index(drop=True))
+
+    return parts
+
+
+class QueryBatch:
+    """Collects Agnitio queries and sends them as few merged requests as possible
+
+    Usage:
+
+        with QueryBatch(conn) as batch:
+            jobs = batch.add("emsi.us.occupation", jobs_query, "2025.3")
+            earnings = batch.add("emsi.us.occupation", earnings_query, "2025.3")
+        jobs.result(), earnings.result()
+
+    Attributes:
+        conn (CoreLMIConnection): the connection queries are sent with
+        window (float): if set, the batch flushes itself this many seconds after the first query is added
+        max_workers (int): the number of merged requests in flight at once
+    """
+
+    def __init__(self, conn, window: float = None, max_workers: int = 4) -> None:
+        self.conn = conn
+        self.window = window
+        self.max_workers = max_workers
+        self.pending: list = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.timer: threading.Timer | None = None
+
+    def add(self, dataset: str, payload: dict, datarun: str) -> PendingQuery:
+        """
+        Queues a query for the next flush.
+
+        Args:
+            dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+            payload (dict): the query, as built by `build_query_corelmi`
+            datarun (str): the data version to query (e.g. `2025.3`)
+
+        Returns:
+            PendingQuery: call `.result()` for the query's DataFrame
+        """
+        query = PendingQuery(self, dataset, payload, datarun)
+        with self.lock:
+            self.pending.append(query)
+            if self.window is not None and self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        return query
+
+    def flush(self) -> None:
+        """Plans and sends every pending query"""
+        with self.flush_lock:
+            with self.lock:
+                queries, self.pending = self.pending, []
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+            if not queries:
+                return
+
+            try:
+                buckets = plan(queries)
+                results = self.conn.post_retrieve_many(
+                    [(bucket.dataset, bucket.payload(), bucket.datarun) for bucket in buckets],
+                    max_workers=self.max_workers,
+                    return_exceptions=True,
+                )
+            except Exception as e:
+                # the queries have left `pending`, so they must be resolved here or their result() never returns
+                for query in queries:
+                    query.set_exception(e)
+                return
+
+            for bucket, result in zip(buckets, results, strict=True):
+                self._resolve(bucket, result)
+
+    def _resolve(self, bucket: _Bucket, result) -> None:
+        try:
+            if isinstance(result, BaseException):
+                raise result
+            parts = split(self.conn, bucket, result)
+        except Exception as e:
+            for query in bucket.queries:
+                query.set_exception(e)
+            return
+
+        if parts is None:
+            # the merged rows could not be attributed to each query, so send them separately after all
+            separate = self.conn.post_retrieve_many(
+                [(q.dataset, q.payload, q.datarun) for q in bucket.queries],
+                max_workers=self.max_workers,
+                return_exceptions=True,
+            )
+            for query, df in zip(bucket.queries, separate, strict=True):
+                if isinstance(df, BaseException):
+                    query.set_exception(df)
+                else:
+                    query.set_result(df)
+            return
+
+        for query, df in zip(bucket.queries, parts, strict=True):
+            query.set_result(df)
+
+    def __enter__(self) -> QueryBatch:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
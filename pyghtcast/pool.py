@@ -0,0 +1,130 @@
+"""Core LMI connection pool spread over several API credentials
+
+Each Core LMI client_id gets its own quota (see `Limiter`). `ConnectionPool` holds one
+`CoreLMIConnection` per credential, each with its own token, session and limiter, and sends every
+request through the member with the most quota left. A 401 or 429 from one member is retried on
+the next, so aggregate throughput grows with the number of credentials.
+
+The pool is itself a `CoreLMIConnection`, so every query and metadata method works unchanged on it.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import requests
+
+from .coreLmi import REQUESTS_PER_WINDOW, CoreLMIConnection
+from .exceptions import APIError
+
+# statuses after which a request is retried with another credential
+FAILOVER_STATUSES = (401, 429)
+
+
+class ConnectionPool(CoreLMIConnection):
+    """A CoreLMIConnection that routes requests across several credentials
+
+    Attributes:
+        members (list): one CoreLMIConnection per credential
+    """
+
+    def __init__(self, credentials: list, cache_dir: str = None, authenticate: bool = True) -> None:
+        """
+        Args:
+            credentials (list): (username, password) pairs, one per API client
+            cache_dir (str, optional): persist metadata responses in this directory, shared by every member
+            authenticate (bool, optional): request every member's token now; if False, each member's first request does
+        """
+        if not credentials:
+            raise ValueError("A ConnectionPool needs at least one (username, password) credential")
+
+        super().__init__(None, None, cache_dir=cache_dir, authenticate=False)
+        self.members = [CoreLMIConnection(username, password, authenticate=False) for username, password in credentials]
+        for member in self.members:
+            # members talk to the same endpoints as the pool (which may point somewhere other than the defaults)
+            member.base_url, member.auth_url = self.base_url, self.auth_url
+            member.transfer_stats = self.transfer_stats
+            if authenticate:
+                member.get_new_token()
+        self.pending = [0] * len(self.members)
+        self.lock = threading.Lock()
+
+        self.name = "Core_LMI_Pool"
+
+    def get_new_token(self) -> None:
+        """Refreshes the token of every member"""
+        for member in self.members:
+            member.get_new_token()
+
+    def remaining(self, index: int) -> int:
+        """The quota a member has left in its current window, less the requests it is already sending"""
+        limiter = self.members[index].limiter
+        budget = limiter.upper_limit if limiter.seconds_left() > 0 else REQUESTS_PER_WINDOW
+
+        return budget - self.pending[index]
+
+    def _acquire(self, exclude: set) -> int:
+        with self.lock:
+            index = max((i for i in range(len(self.members)) if i not in exclude), key=self.remaining)
+            self.pending[index] += 1
+
+        return index
+
+    def _release(self, index: int) -> None:
+        with self.lock:
+            self.pending[index] -= 1
+
+    def _route(self, send: Callable[[CoreLMIConnection], Any]) -> Any:
+        """Calls `send` with the member with the most quota left, retrying on the others after a 401 or 429"""
+        tried: set = set()
+        while True:
+            index = self._acquire(tried)
+            member = self.members[index]
+            try:
+                return send(member)
+            except APIError as e:
+                tried.add(index)
+                if e.status_code not in FAILOVER_STATUSES or len(tried) == len(self.members):
+                    raise
+                if e.status_code == 429:
+                    # the API disagrees with the limiter: stop routing here until the window resets
+                    member.limiter.upper_limit = 0
+                else:
+                    member.token = None
+            finally:
+                self._release(index)
+
+    def download_data(self, api_endpoint: str, payload: dict = None, smart_limit: bool = False) -> requests.Response:
+        """
+        Sends the request through the member with the most quota left, failing over to the others on a 401 or 429.
+
+        Args:
+            api_endpoint (str): the url endpoint to query
+            payload (dict, optional): the payload to pass to the API. if no payload, then a GET request will be made.
+            smart_limit (bool, optional): pace requests to spread the chosen member's quota over its window
+
+        Returns:
+            requests.Response: The response from the server
+
+        Raises:
+            APIError: the last member's error, if every member failed (or the first error that is not a 401 or 429)
+        """
+
+        def send() -> requests.Response:
+            return self._route(lambda member: member.download_data(api_endpoint, payload, smart_limit))
+
+        # identical requests share one response, whichever member ends up sending it
+        return self.in_flight.do(self.request_key(self.base_url + api_endpoint, payload), send)
+
+    def download_raw(
+        self,
+        api_endpoint: str,
+        payload: dict = None,
+        querystring: dict = None,
+        path: str = None,
+        decode_content: bool = True,
+    ) -> bytes | int:
+        """Sends a raw request through the member with the most quota left, failing over to the others on a 401 or 429"""
+        return self._route(lambda member: member.download_raw(api_endpoint, payload, querystring, path, decode_content))
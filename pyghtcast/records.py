@@ -0,0 +1,172 @@
+"""Compact in-memory forms of skills API responses
+
+The JSON responses keep every skill as a dict with a nested type dict, and repeat each type's
+strings once per skill. For a long-running process holding a whole taxonomy, these forms take a
+fraction of the memory:
+
+- `Skill` / `ExtractedSkill`: slotted, immutable records, with type IDs and names interned
+- `SkillTable`: one list or array per field, with each skill's type stored as a small integer code
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+# the return formats accepted by the skills connection methods that support them
+FORMATS = ("json", "records", "table")
+
+
+def check_format(return_format: str) -> None:
+    """Raises ValueError for a return format other than FORMATS, before any request is made"""
+    if return_format not in FORMATS:
+        raise ValueError(f"Unknown return_format {return_format!r}; expected one of {', '.join(FORMATS)}")
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class Skill:
+    """One skill from the skills API"""
+
+    id: str
+    name: str
+    type_id: str | None = None
+    type_name: str | None = None
+    info_url: str | None = None
+
+    @classmethod
+    def from_json(cls, data: dict) -> Skill:
+        skill_type = data.get("type") or {}
+        return cls(
+            data["id"],
+            data.get("name"),
+            _intern(skill_type.get("id")),
+            _intern(skill_type.get("name")),
+            data.get("infoUrl"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractedSkill:
+    """A skill found in a document by `post_extract`, with the extractor's confidence"""
+
+    skill: Skill
+    confidence: float
+
+
+class SkillTable:
+    """Skills stored column by column
+
+    Attributes:
+        ids (list): skill IDs
+        names (list): skill names
+        info_urls (list): info URLs (None where not requested)
+        type_codes (array): per skill, the position of its type in `types`
+        types (list): the distinct (type ID, type name) pairs
+        confidences (array): extraction confidence per skill, NaN where missing (None unless built from `post_extract`)
+    """
+
+    def __init__(self) -> None:
+        self.ids: list = []
+        self.names: list = []
+        self.info_urls: list = []
+        self.type_codes = array("H")
+        self.types: list = []
+        self.confidences: array | None = None
+        self._type_index: dict = {}
+
+    def append(self, data: dict, confidence: float | None = None) -> None:
+        """Adds one skill from its JSON form"""
+        skill_type = data.get("type") or {}
+        type_key = (skill_type.get("id"), skill_type.get("name"))
+        code = self._type_index.get(type_key)
+        if code is None:
+            code = self._type_index[type_key] = len(self.types)
+            self.types.append(type_key)
+
+        self.ids.append(data["id"])
+        self.names.append(data.get("name"))
+        self.info_urls.append(data.get("infoUrl"))
+        self.type_codes.append(code)
+        if confidence is not None and self.confidences is None:
+            # the skills added so far had no confidence
+            self.confidences = array("d", [math.nan] * (len(self.ids) - 1))
+        if self.confidences is not None:
+            self.confidences.append(math.nan if confidence is None else confidence)
+
+    @classmethod
+    def from_json(cls, skills: list) -> SkillTable:
+        """Builds a table from a list of skill dicts (the `data` of `get_list_all_skills`)"""
+        table = cls()
+        for data in skills:
+            table.append(data)
+
+        return table
+
+    @classmethod
+    def from_extraction(cls, extracted: list) -> SkillTable:
+        """Builds a table from `post_extract` data: [{"skill": {...}, "confidence": ...}, ...]"""
+        table = cls()
+        for item in extracted:
+            table.append(item["skill"], item.get("confidence"))
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> Skill:
+        type_id, type_name = self.types[self.type_codes[i]]
+        return Skill(self.ids[i], self.names[i], type_id, type_name, self.info_urls[i])
+
+    def __iter__(self) -> Iterator[Skill]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_df(self):
+        """
+        The table as a DataFrame, with the type columns categorical.
+
+        Returns:
+            pd.DataFrame: id, name, type_id, type_name, info_url (and confidence) columns
+        """
+        import pandas as pd
+
+        types = [self.types[code] for code in self.type_codes]
+        columns = {
+            "id": self.ids,
+            "name": self.names,
+            "type_id": pd.Categorical([t[0] for t in types]),
+            "type_name": pd.Categorical([t[1] for t in types]),
+            "info_url": self.info_urls,
+        }
+        if self.confidences is not None:
+            columns["confidence"] = list(self.confidences)
+
+        return pd.DataFrame(columns)
+
+
+def convert_skills(skills: list, return_format: str):
+    """Converts the `data` list of a skills listing into `return_format` ("records" or "table")"""
+    if return_format == "records":
+        return [Skill.from_json(data) for data in skills]
+    if return_format == "table":
+        return SkillTable.from_json(skills)
+
+    raise ValueError(f"Unknown return_format {return_format!r}; expected one of {', '.join(FORMATS)}")
+
+
+def convert_extraction(extracted: list, return_format: str):
+    """Converts the `data` list of `post_extract` into `return_format` ("records" or "table")"""
+    if return_format == "records":
+        return [ExtractedSkill(Skill.from_json(item["skill"]), item.get("confidence")) for item in extracted]
+    if return_format == "table":
+        return SkillTable.from_extraction(extracted)
+
+    raise ValueError(f"Unknown return_format {return_format!r}; expected one of {', '.join(FORMATS)}")
@@ -0,0 +1,263 @@
+"""Local aggregation of fine-grained Core LMI results up a dimension hierarchy
+
+A result pulled at a fine level (ZIP codes, 6-digit SOC codes) already holds everything needed for
+the coarser levels of an additive metric: county jobs are the sum of their ZIP codes' jobs.
+`HierarchyRollup` precomputes each hierarchy member's parent as an array index, finds every
+member's ancestor at a level by pointer chasing over those arrays, and sums with one groupby.
+`query_levels` serves several levels of the same query from a single fine-grained pull.
+"""
+
+from __future__ import annotations
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .timeseries import split_column
+from .validation import level_numbers
+
+# metrics that are counts, so a parent's value is the sum of its children's
+ADDITIVE_METRICS = frozenset(
+    {
+        "Jobs",
+        "ResidenceJobs",
+        "Openings",
+        "Replacements",
+        "Separations",
+        "Hires",
+        "Exits",
+        "Transfers",
+        "Establishments",
+        "Payrolled Business Locations",
+        "Completions",
+        "Population",
+    }
+)
+
+
+def is_additive(metric: str, additive: frozenset = ADDITIVE_METRICS) -> bool:
+    """Whether a metric column (e.g. `Jobs.2023`) can be summed up a hierarchy"""
+    parts = split_column(metric)
+    return (parts[0] if parts else metric) in additive
+
+
+class HierarchyRollup:
+    """Parent and level arrays for one dimension hierarchy
+
+    Attributes:
+        ids (pd.Index): member ids, in hierarchy order
+        parents (np.ndarray): position of each member's parent in `ids` (the root points to itself)
+        levels (np.ndarray): each member's level, as used by `mapLevel`
+    """
+
+    def __init__(self, hierarchy: pd.DataFrame, key: str = "child") -> None:
+        """
+        Args:
+            hierarchy (pd.DataFrame): as returned by `get_dimension_hierarchy_df`
+            key (str, optional): the column identifying members in query results ("child" or "display_id")
+        """
+        self.ids = pd.Index(hierarchy[key].astype(str))
+        child_position = pd.Index(hierarchy["child"].astype(str))
+        parents = child_position.get_indexer(hierarchy["parent"].astype(str))
+        # members whose parent is not in the hierarchy are roots
+        self.parents = np.where(parents < 0, np.arange(len(parents)), parents)
+
+        levels = level_numbers(hierarchy["level_name"]) if "level_name" in hierarchy else None
+        if levels is not None:
+            self.levels = np.array(levels, dtype=np.int64)
+        else:
+            self.levels = self._depths() + 1
+        self._ancestors: dict = {}
+
+    def _depths(self) -> np.ndarray:
+        depths = np.zeros(len(self.parents), dtype=np.int64)
+        current = np.arange(len(self.parents))
+        while True:
+            up = self.parents[current]
+            moving = up != current
+            if not moving.any():
+                return depths
+            depths += moving
+            current = up
+
+    def ancestors_at(self, level: int) -> np.ndarray:
+        """For every member, the position of its ancestor at `level` (or -1 if the member is above that level)"""
+        if level not in self._ancestors:
+            current = np.arange(len(self.parents))
+            while True:
+                deeper = self.levels[current] > level
+                up = np.where(deeper, self.parents[current], current)
+                if np.array_equal(up, current):
+                    break
+                current = up
+            self._ancestors[level] = np.where(self.levels[current] == level, current, -1)
+
+        return self._ancestors[level]
+
+    def within(self, members: list) -> np.ndarray:
+        """Whether each member is one of `members` or a descendant of one"""
+        marked = np.zeros(len(self.parents), dtype=bool)
+        positions = self.ids.get_indexer([str(member) for member in members])
+        marked[positions[positions >= 0]] = True
+
+        inside = marked.copy()
+        current = np.arange(len(self.parents))
+        while True:
+            up = self.parents[current]
+            if np.array_equal(up, current):
+                return inside
+            current = up
+            inside |= marked[current]
+
+    def covered(self, members: list, fine_level: int, level: int) -> pd.Index:
+        """
+        The members at `level` whose descendants at `fine_level` are all within `members`, i.e. those a
+        `mapLevel` pull of `members` at `fine_level` holds completely.
+
+        Args:
+            members (list): the pull's predicate
+            fine_level (int): the pull's level
+            level (int): the coarser level
+
+        Returns:
+            pd.Index: ids of the fully covered members at `level`
+        """
+        fine = self.levels == fine_level
+        ancestors = self.ancestors_at(level)[fine]
+        inside = self.within(members)[fine]
+        known = ancestors >= 0
+
+        partial = np.unique(ancestors[known & ~inside])
+        return self.ids[np.setdiff1d(ancestors[known], partial)]
+
+    def rollup(self, df: pd.DataFrame, dimension: str, level: int, metrics: list = None) -> pd.DataFrame:
+        """
+        Sums a result's metrics up to `level` of the dimension, keeping every other dimension column.
+
+        Args:
+            df (pd.DataFrame): a result with `dimension` at a finer level than `level`
+            dimension (str): the dimension column to roll up (e.g. `Area`)
+            level (int): the hierarchy level to aggregate to
+            metrics (list, optional): the metric columns to sum (defaults to every `Metric.Year` column)
+
+        Returns:
+            pd.DataFrame: one row per ancestor at `level` and combination of the other dimensions
+
+        Raises:
+            KeyError: if a value in `dimension` is not in the hierarchy
+            ValueError: if a value is above `level`
+        """
+        if metrics is None:
+            metrics = [c for c in df.columns if split_column(c) is not None]
+        others = [c for c in df.columns if c != dimension and c not in metrics and split_column(c) is None]
+
+        positions = self.ids.get_indexer(df[dimension].astype(str))
+        if (positions < 0).any():
+            missing = df[dimension][positions < 0].unique()[:5]
+            raise KeyError(f"{dimension} values not in the hierarchy: {', '.join(map(str, missing))}")
+
+        ancestors = self.ancestors_at(level)[positions]
+        if (ancestors < 0).any():
+            raise ValueError(f"Some {dimension} values are above level {level}, so they cannot be rolled up to it")
+
+        codes, uniques = pd.factorize(ancestors)
+        keys = [df[c] for c in others] + [pd.Series(codes, index=df.index, name=dimension)]
+        summed = df[metrics].groupby(keys, sort=False, observed=True).sum().reset_index()
+        summed[dimension] = self.ids[uniques[summed[dimension].to_numpy()]]
+
+        return summed[[c for c in df.columns if c in summed.columns]]
+
+
+def _map_level(payload: dict, dimension: str) -> dict | None:
+    for constraint in payload.get("constraints", []):
+        if constraint.get("dimensionName") == dimension and "mapLevel" in constraint:
+            return constraint["mapLevel"]
+
+    return None
+
+
+def _at_level(payload: dict, dimension: str, metrics: list, level: int, predicate: list = None) -> dict:
+    coarse = copy.deepcopy(payload)
+    coarse["metrics"] = [{"name": metric} for metric in metrics]
+    for constraint in coarse["constraints"]:
+        if constraint.get("dimensionName") == dimension:
+            constraint["mapLevel"]["level"] = level
+            if predicate is not None:
+                constraint["mapLevel"]["predicate"] = predicate
+
+    return coarse
+
+
+def query_levels(
+    conn,
+    dataset: str,
+    payload: dict,
+    datarun: str,
+    dimension: str,
+    levels: list,
+    additive: frozenset = ADDITIVE_METRICS,
+) -> dict:
+    """
+    Answers the same query at several levels of one dimension with one fine-grained pull: the query is
+    run at its own `mapLevel` level and the additive metrics are rolled up locally to each coarser level.
+    Non-additive metrics (e.g. earnings, location quotients) are queried from the API at the coarser levels.
+
+    A coarser member is only rolled up when the pull holds all of its children, e.g. a pull of the ZIP codes
+    of Dallas County sums to Dallas County, but not to Texas. Additive metrics of partially covered members
+    like Texas are queried from the API too, so every row describes the whole member it is labelled with.
+
+    Args:
+        conn (CoreLMIConnection): the connection to query with
+        dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+        payload (dict): the query at the finest level wanted (e.g. Area mapped to ZIP codes)
+        datarun (str): the data version to query (e.g. `2025.3`)
+        dimension (str): the mapped dimension to roll up (e.g. `Area`)
+        levels (list): the coarser levels wanted (e.g. `[2, 3]` for states and counties)
+        additive (frozenset, optional): the metric names that may be summed
+
+    Returns:
+        dict: level -> pd.DataFrame, including the query's own level
+    """
+    map_level = _map_level(payload, dimension)
+    if map_level is None:
+        raise ValueError(f"The query needs a mapLevel constraint on {dimension!r} to be rolled up")
+    fine_level = map_level.get("level")
+    predicate = map_level.get("predicate")
+
+    fine = conn.post_retrieve_df(dataset, payload, datarun)
+    results = {fine_level: fine}
+
+    metrics = [m["name"] if isinstance(m, dict) else m for m in payload.get("metrics", [])]
+    summable = [metric for metric in metrics if is_additive(metric, additive)]
+    queried = [metric for metric in metrics if metric not in summable]
+    rollup = HierarchyRollup(conn.get_dimension_hierarchy_df(dataset, dimension, datarun)) if summable else None
+
+    for level in levels:
+        if level == fine_level:
+            continue
+
+        df = None
+        if summable:
+            df = rollup.rollup(fine, dimension, level, summable)
+            if predicate is not None:
+                complete = df[dimension].isin(rollup.covered(predicate, fine_level, level))
+                partial = df.loc[~complete, dimension].unique().tolist()
+                df = df[complete]
+                if partial:
+                    whole = conn.post_retrieve_df(
+                        dataset, _at_level(payload, dimension, summable, level, partial), datarun
+                    )
+                    df = pd.concat([df, whole[[c for c in df.columns if c in whole.columns]]], ignore_index=True)
+        if queried:
+            api = conn.post_retrieve_df(dataset, _at_level(payload, dimension, queried, level), datarun)
+            if df is None:
+                df = api
+            else:
+                keys = [c for c in df.columns if c not in summable]
+                df = df.merge(api, on=keys, how="outer")
+
+        dimensions = [c for c in df.columns if c not in metrics]
+        results[level] = df[dimensions + metrics]
+
+    return results
@@ -0,0 +1,128 @@
+"""Memory-mappable snapshots of dimension hierarchies and skill taxonomies
+
+Snapshots are uncompressed Arrow IPC files. Opening one maps the file read-only instead of reading
+it, so the table's buffers point straight into the page cache: every process that opens the same
+snapshot (e.g. each gunicorn worker) shares one physical copy, and opening costs next to nothing
+whatever the file's size.
+
+    save_hierarchy(conn, "emsi.us.occupation", "Area", "2025.3", "area.arrow")   # once, at deploy
+    area = open_snapshot("area.arrow")                                            # in each worker
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING
+
+from .export import publish, require_pyarrow
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+HIERARCHY_COLUMNS = ("child", "parent", "name", "level_name", "display_id")
+
+# schema metadata key holding what the snapshot was built from
+METADATA_KEY = b"pyghtcast"
+
+
+def write_snapshot(path: str, columns: dict, metadata: dict = None) -> None:
+    """
+    Writes string columns to an uncompressed Arrow IPC file, atomically.
+
+    Args:
+        path (str): the file to write
+        columns (dict): column name -> list of values
+        metadata (dict, optional): JSON-serializable description stored in the schema
+    """
+    pa = require_pyarrow()
+    import pyarrow.ipc
+
+    table = pa.table({name: pa.array(values, type=pa.string()) for name, values in columns.items()})
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata or {}).encode()})
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".snapshot-", suffix=".tmp")
+    os.close(fd)
+    try:
+        # no compression: compressed buffers would have to be decompressed into each process's own memory
+        with pa.OSFile(tmp, "wb") as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        # readable by whoever can read `path`'s directory, e.g. worker processes running as another user
+        publish(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def open_snapshot(path: str) -> pa.Table:
+    """
+    Maps a snapshot read-only. The returned table's buffers live in the mapped file, not on the heap.
+
+    Args:
+        path (str): the snapshot file
+
+    Returns:
+        pyarrow.Table: the snapshot's columns
+    """
+    pa = require_pyarrow()
+    import pyarrow.ipc
+
+    return pyarrow.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def snapshot_metadata(table: pa.Table) -> dict:
+    """What a snapshot was built from (e.g. {"kind": "hierarchy", "dataset": ..., "dimension": ..., "datarun": ...})"""
+    raw = (table.schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else {}
+
+
+def to_df(table: pa.Table) -> pd.DataFrame:
+    """A DataFrame over a snapshot's Arrow buffers, with pyarrow-backed columns so the strings are not copied"""
+    import pandas as pd
+
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _text(value) -> str | None:
+    return None if value is None else str(value)
+
+
+def save_hierarchy(conn, dataset: str, dimension: str, datarun: str, path: str) -> None:
+    """
+    Snapshots a dimension hierarchy from `get_meta_dataset_dimension`.
+
+    Args:
+        conn (CoreLMIConnection): the connection to read the (cached) hierarchy from
+        dataset (str): the dataset (e.g. `emsi.us.occupation`)
+        dimension (str): the dimension (e.g. `Area`)
+        datarun (str): the data version (e.g. `2025.3`)
+        path (str): the snapshot file to write
+    """
+    hierarchy = conn.get_meta_dataset_dimension(dataset, dimension, datarun)["hierarchy"]
+    columns = {column: [_text(record.get(column)) for record in hierarchy] for column in HIERARCHY_COLUMNS}
+    metadata = {"kind": "hierarchy", "dataset": dataset, "dimension": dimension, "datarun": datarun}
+
+    write_snapshot(path, columns, metadata)
+
+
+def save_skill_taxonomy(conn, path: str, version: str = "latest") -> None:
+    """
+    Snapshots every skill of a skills version from `get_list_all_skills`.
+
+    Args:
+        conn (SkillsClassificationConnection): the connection to list skills with
+        path (str): the snapshot file to write
+        version (str, optional): the skills version (default: "latest")
+    """
+    skills = conn.get_list_all_skills(version=version)["data"]
+    columns = {
+        "id": [skill["id"] for skill in skills],
+        "name": [skill.get("name") for skill in skills],
+        "type_id": [(skill.get("type") or {}).get("id") for skill in skills],
+        "type_name": [(skill.get("type") or {}).get("name") for skill in skills],
+        "info_url": [skill.get("infoUrl") for skill in skills],
+    }
+
+    write_snapshot(path, columns, {"kind": "skills", "version": version})
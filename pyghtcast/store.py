@@ -0,0 +1,219 @@
+"""Local Parquet store of Core LMI query results
+
+Each result is kept once per (dataset, datarun, query hash) under a hive-style directory tree:
+
+    <root>/dataset=emsi.us.occupation/datarun=2025.3/query=<hash>/part-0.parquet
+
+`ResultStore.query` reads across every stored pull as one pyarrow dataset. Partition filters skip
+whole directories, and other filters are checked against row-group statistics before any data
+is read, so only the needed columns of the matching row groups are loaded. Rows are sorted by
+their dimension columns when written, which keeps those statistics selective.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from .export import publish, require_pyarrow
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# the partition columns every stored row carries
+PARTITIONS = ("dataset", "datarun", "query")
+
+_OPERATORS = ("==", "=", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+
+def query_hash(payload: dict) -> str:
+    """A short hash identifying a query independently of key order"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _as_text(column: pd.Series) -> pd.Series:
+    # astype(str) alone turns missing values into the text "nan"
+    return column.astype(str).where(column.notna(), None)
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    """Calls `write(tmp)` for a temporary file next to `path`, then moves it over `path`"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        publish(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _expression(filters: Any):
+    """A pyarrow expression from a dict ({column: value or list}), (column, op, value) tuples or an expression"""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+
+    if isinstance(filters, dict):
+        filters = [(column, "in" if isinstance(v, list | tuple | set) else "==", v) for column, v in filters.items()]
+
+    expression = None
+    for column, op, value in filters:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported filter operator {op!r}, expected one of: {', '.join(_OPERATORS)}")
+
+        field = pc.field(column)
+        if op in ("in", "not in"):
+            term = field.isin(list(value))
+            term = ~term if op == "not in" else term
+        else:
+            term = {
+                "==": field == value,
+                "=": field == value,
+                "!=": field != value,
+                "<": field < value,
+                "<=": field <= value,
+                ">": field > value,
+                ">=": field >= value,
+            }[op]
+        expression = term if expression is None else expression & term
+
+    return expression
+
+
+class ResultStore:
+    """Partitioned Parquet files of query results under one directory
+
+    Attributes:
+        root (str): the directory results are stored in
+        row_group_size (int): rows per Parquet row group, the unit filters can skip
+    """
+
+    def __init__(self, root: str, row_group_size: int = 64_000) -> None:
+        self.root = root
+        self.row_group_size = row_group_size
+
+    def path(self, dataset: str, datarun: str, payload: dict) -> str:
+        return os.path.join(self.root, f"dataset={dataset}", f"datarun={datarun}", f"query={query_hash(payload)}")
+
+    def has(self, dataset: str, datarun: str, payload: dict) -> bool:
+        return os.path.exists(os.path.join(self.path(dataset, datarun, payload), "part-0.parquet"))
+
+    def put(self, dataset: str, datarun: str, payload: dict, df: pd.DataFrame) -> str:
+        """
+        Stores a query result, replacing any earlier result of the same query. Rows are stored sorted by
+        their dimensions, with the dimension columns as strings (missing values stay missing), so `get`
+        returns the result in that form rather than exactly as passed in.
+
+        Args:
+            dataset (str): the dataset queried (e.g. `emsi.us.occupation`)
+            datarun (str): the data version queried (e.g. `2025.3`)
+            payload (dict): the query that produced `df`
+            df (pd.DataFrame): the result
+
+        Returns:
+            str: the directory the result was written to
+        """
+        pa = require_pyarrow()
+        import pyarrow.parquet as pq
+
+        metrics = {m["name"] if isinstance(m, dict) else m for m in payload.get("metrics", [])}
+        dimensions = [c for c in df.columns if c not in metrics]
+        if dimensions:
+            df = df.sort_values(dimensions, kind="stable")
+        # plain strings rather than per-file dictionaries, so the schemas of different pulls unify
+        table = pa.Table.from_pandas(df.assign(**{c: _as_text(df[c]) for c in dimensions}), preserve_index=False)
+
+        directory = self.path(dataset, datarun, payload)
+        os.makedirs(directory, exist_ok=True)
+
+        def write_query(tmp: str) -> None:
+            with open(tmp, "w") as f:
+                json.dump(payload, f)
+
+        # pyarrow skips files starting with "_" or ".", so the query and temporary files can sit next to the data
+        _write_atomic(os.path.join(directory, "_query.json"), write_query)
+        _write_atomic(
+            os.path.join(directory, "part-0.parquet"),
+            lambda tmp: pq.write_table(table, tmp, row_group_size=self.row_group_size),
+        )
+
+        return directory
+
+    def get(self, dataset: str, datarun: str, payload: dict, columns: list = None) -> pd.DataFrame | None:
+        """The stored result of a query (only `columns`, if given), or None if it is not stored"""
+        if not self.has(dataset, datarun, payload):
+            return None
+
+        require_pyarrow()
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.path(dataset, datarun, payload), "part-0.parquet")
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    def dataset(self, dataset: str = None, datarun: str = None):
+        """
+        Every stored result (optionally of one dataset and datarun) as a single pyarrow dataset.
+        Pulls with different metrics are combined under one schema, with nulls where a pull lacks a column.
+
+        Returns:
+            pyarrow.dataset.Dataset: the stored results, partitioned by dataset, datarun and query
+        """
+        pa = require_pyarrow()
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        root = self.root
+        partitions = list(PARTITIONS)
+        for value in (dataset, datarun):
+            if value is None:
+                break
+            root = os.path.join(root, f"{partitions.pop(0)}={value}")
+
+        partitioning = ds.partitioning(pa.schema([(name, pa.string()) for name in partitions]), flavor="hive")
+        files = [
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(root)
+            for name in names
+            if name.endswith(".parquet")
+        ]
+        # footers only: the data itself is not read to build the schema
+        schema = pa.unify_schemas([pq.read_schema(path) for path in files]) if files else pa.schema([])
+        for name in partitions:
+            schema = schema.append(pa.field(name, pa.string()))
+
+        return ds.dataset(files, schema=schema, format="parquet", partitioning=partitioning, partition_base_dir=root)
+
+    def query(
+        self,
+        columns: list = None,
+        filters: Any = None,
+        dataset: str = None,
+        datarun: str = None,
+    ) -> pd.DataFrame:
+        """
+        Reads matching rows of the stored results, loading only the requested columns of row groups
+        that can match the filters.
+
+        Args:
+            columns (list, optional): the columns to read (every column if omitted)
+            filters (optional): a dict of {column: value or list of values}, a list of (column, op, value)
+                tuples (ops: ==, !=, <, <=, >, >=, in, not in), or a pyarrow expression
+            dataset (str, optional): only read results of this dataset
+            datarun (str, optional): only read results of this datarun (requires `dataset`)
+
+        Returns:
+            pd.DataFrame: the matching rows
+        """
+        if datarun is not None and dataset is None:
+            raise ValueError("A datarun filter needs a dataset as well")
+
+        table = self.dataset(dataset, datarun).to_table(columns=columns, filter=_expression(filters))
+        return table.to_pandas()
@@ -0,0 +1,105 @@
+"""Metric-year columns for Core LMI queries, and reshaping of their wide results
+
+Agnitio names time-series columns `Metric.Year` (e.g. `Jobs.2023`), one per metric and year, so
+results come back wide. `expand_metrics` builds those names from metrics and years, `to_long`
+turns a wide result into one (dimensions..., metric, year, value) row per cell straight from the
+underlying arrays, and `change` / `pct_change` / `cagr` compare two years column-wise.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def expand_metrics(metrics: Iterable[str], years: Iterable[int]) -> list[str]:
+    """
+    The `Metric.Year` column names for every metric and year.
+
+    Args:
+        metrics (iterable): metric names without a year (e.g. `["Jobs", "Openings"]`)
+        years (iterable): the years to request (e.g. `range(2013, 2034)`)
+
+    Returns:
+        list: e.g. `["Jobs.2013", ..., "Jobs.2033", "Openings.2013", ...]`
+    """
+    years = list(years)
+    return [f"{metric}.{year}" for metric in metrics for year in years]
+
+
+def split_column(column: str) -> tuple[str, int] | None:
+    """(metric, year) for a `Metric.Year` column name, or None for any other column"""
+    metric, _, year = str(column).rpartition(".")
+    if metric and year.isdigit() and len(year) == 4:
+        return metric, int(year)
+
+    return None
+
+
+def to_long(df: pd.DataFrame, value_name: str = "value") -> pd.DataFrame:
+    """
+    Reshapes a wide Core LMI result into long format. Dimension, metric and year columns are categorical or
+    small integers indexing into the original values, so the only full-size copy made is of the numbers.
+
+    Args:
+        df (pd.DataFrame): a result with dimension columns and `Metric.Year` columns
+        value_name (str, optional): the name of the value column
+
+    Returns:
+        pd.DataFrame: (dimensions..., metric, year, value) columns, ordered by metric, year, then input row
+    """
+    parsed = {column: split_column(column) for column in df.columns}
+    value_columns = [column for column, parts in parsed.items() if parts is not None]
+    dimensions = [column for column, parts in parsed.items() if parts is None]
+
+    rows, cells = len(df), len(value_columns)
+    # column-major so each metric-year column is one contiguous run of the output
+    values = df[value_columns].to_numpy(dtype=np.float64).ravel(order="F")
+
+    long = {}
+    for dimension in dimensions:
+        codes, uniques = pd.factorize(df[dimension])
+        long[dimension] = pd.Categorical.from_codes(np.tile(codes, cells), categories=uniques)
+
+    metric_codes, metrics = pd.factorize(pd.Index([parsed[c][0] for c in value_columns]))
+    long["metric"] = pd.Categorical.from_codes(np.repeat(metric_codes, rows), categories=metrics)
+    long["year"] = np.repeat(np.array([parsed[c][1] for c in value_columns], dtype=np.int16), rows)
+    long[value_name] = values
+
+    return pd.DataFrame(long, copy=False)
+
+
+def _years(df: pd.DataFrame, metric: str, start: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+    return (
+        df[f"{metric}.{start}"].to_numpy(dtype=np.float64),
+        df[f"{metric}.{end}"].to_numpy(dtype=np.float64),
+    )
+
+
+def change(df: pd.DataFrame, metric: str, start: int, end: int) -> pd.Series:
+    """The absolute change in `metric` from `start` to `end`, per row of a wide result"""
+    first, last = _years(df, metric, start, end)
+    return pd.Series(last - first, index=df.index, name=f"{metric} change {start}-{end}")
+
+
+def pct_change(df: pd.DataFrame, metric: str, start: int, end: int) -> pd.Series:
+    """The relative change in `metric` from `start` to `end` (0.1 = 10%), NaN where `start` is 0"""
+    first, last = _years(df, metric, start, end)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where(first != 0, last / first - 1, np.nan)
+
+    return pd.Series(result, index=df.index, name=f"{metric} % change {start}-{end}")
+
+
+def cagr(df: pd.DataFrame, metric: str, start: int, end: int) -> pd.Series:
+    """The compound annual growth rate of `metric` from `start` to `end`, NaN where it is undefined"""
+    if end <= start:
+        raise ValueError("The end year must be after the start year")
+
+    first, last = _years(df, metric, start, end)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where((first > 0) & (last >= 0), np.power(last / first, 1 / (end - start)) - 1, np.nan)
+
+    return pd.Series(result, index=df.index, name=f"{metric} CAGR {start}-{end}")
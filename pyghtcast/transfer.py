@@ -0,0 +1,134 @@
+"""Compressed transfer negotiation, transfer accounting and raw response bodies
+
+Every request asks for a compressed body (`ACCEPT_ENCODING`; brotli only when a brotli decoder is
+installed, since urllib3 can only undo what it can decode). `TransferStats` counts the bytes that
+crossed the wire next to the bytes they decoded to, and `read_raw` hands back (or writes to disk)
+a response body without JSON decoding, optionally still compressed.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import threading
+
+import requests
+
+from . import metrics
+from .exceptions import check_response
+
+
+def _accept_encoding() -> str:
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+
+    return ", ".join(encodings)
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
+
+class TransferStats:
+    """Running totals of response sizes on a connection; safe to share between threads
+
+    Attributes:
+        connection (str): the connection the responses belong to, as labelled in `metrics`
+        responses (int): the number of responses counted
+        wire_bytes (int): body bytes received from the network, before decompression
+        decoded_bytes (int): body bytes after decompression
+    """
+
+    def __init__(self, connection: str = "") -> None:
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.responses = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def record(self, wire_bytes: int, decoded_bytes: int) -> None:
+        with self.lock:
+            self.responses += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+        metrics.count_transfer(self.connection, wire_bytes, decoded_bytes)
+
+    def record_response(self, response: requests.Response) -> None:
+        """Counts a response whose body has been read (i.e. one that was not streamed)"""
+        decoded = len(response.content or b"")
+        self.record(wire_size(response, decoded), decoded)
+
+    @property
+    def ratio(self) -> float:
+        """Decoded bytes per byte on the wire (1.0 if nothing was compressed)"""
+        return self.decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {"responses": self.responses, "wire_bytes": self.wire_bytes, "decoded_bytes": self.decoded_bytes}
+
+    def __repr__(self) -> str:
+        return (
+            f"TransferStats(responses={self.responses}, wire_bytes={self.wire_bytes}, "
+            f"decoded_bytes={self.decoded_bytes}, ratio={self.ratio:.2f})"
+        )
+
+
+def wire_size(response: requests.Response, default: int) -> int:
+    """The bytes of a response body that crossed the network: urllib3's count, else Content-Length, else `default`"""
+    tell = getattr(response.raw, "tell", None)
+    read = tell() if callable(tell) else None
+    if isinstance(read, int) and read > 0:
+        return read
+
+    length = response.headers.get("content-length")
+    if length is not None and str(length).isdigit():
+        return int(length)
+
+    return default
+
+
+def read_raw(
+    response: requests.Response,
+    path: str = None,
+    decode_content: bool = True,
+    chunk_size: int = 1 << 20,
+    stats: TransferStats = None,
+) -> bytes | int:
+    """
+    Reads a streamed response's body without decoding it as JSON.
+
+    Args:
+        response (requests.Response): a response requested with `stream=True`
+        path (str, optional): write the body to this file in chunks instead of returning it
+        decode_content (bool, optional): undo the transfer compression; if False the body is kept exactly as
+            sent (e.g. still gzipped), which is the cheapest way to persist it
+        chunk_size (int, optional): bytes read at a time when writing to `path`
+        stats (TransferStats, optional): count the transfer here
+
+    Returns:
+        bytes | int: the body, or the number of bytes written to `path`
+
+    Raises:
+        APIError: if the response is not a success, before anything is written
+    """
+    with response:
+        check_response(response)
+
+        if path is None:
+            body = response.content if decode_content else response.raw.read(decode_content=False)
+            size = len(body)
+        else:
+            body = None
+            size = 0
+            with open(path, "wb") as f:
+                for chunk in response.raw.stream(chunk_size, decode_content=decode_content):
+                    f.write(chunk)
+                    size += len(chunk)
+
+        if stats is not None:
+            stats.record(wire_size(response, size), size)
+
+    return size if body is None else body
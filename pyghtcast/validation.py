@@ -0,0 +1,162 @@
+"""Client-side checks of Agnitio queries against cached dataset metadata
+
+A query with a misspelled metric, an unknown dimension or a level the hierarchy does not have is
+only rejected by the API after a full round-trip, and still counts against the rate limit.
+`validate_query` catches those mistakes up front from `get_meta_dataset` and the dimension
+hierarchies, which the connection keeps in its metadata cache.
+"""
+
+from __future__ import annotations
+
+import difflib
+from typing import Any
+
+from .exceptions import LightcastError
+
+
+class QueryValidationError(LightcastError, ValueError):
+    """Raised when a query does not match the dataset's metadata
+
+    Attributes:
+        dataset (str): the dataset the query was checked against
+        datarun (str): the data version the query was checked against
+        errors (list): one message per problem found
+    """
+
+    def __init__(self, dataset: str, datarun: str, errors: list[str]) -> None:
+        self.dataset = dataset
+        self.datarun = datarun
+        self.errors = errors
+        super().__init__(f"Invalid query for {dataset} ({datarun}):\n" + "\n".join(f"  - {e}" for e in errors))
+
+
+def _suggest(name: str, candidates) -> str:
+    close = difflib.get_close_matches(str(name), [str(c) for c in candidates], n=3)
+    return f" (did you mean {', '.join(repr(c) for c in close)}?)" if close else ""
+
+
+def _metric_names(dataset_info: dict) -> tuple[set, dict]:
+    """The full metric names (e.g. `Jobs.2023`) and, for metrics listed without a year, their available years"""
+    metrics = dataset_info.get("metrics", [])
+    if isinstance(metrics, dict):
+        metrics = [{"name": name, **(info if isinstance(info, dict) else {})} for name, info in metrics.items()]
+
+    names = set()
+    years: dict = {}
+    for metric in metrics:
+        if not isinstance(metric, dict) or "name" not in metric:
+            continue
+        names.add(metric["name"])
+        available = metric.get("years") or metric.get("availableYears")
+        years[metric["name"]] = {str(year) for year in available} if available else None
+
+    return names, years
+
+
+def _check_metric(name: Any, names: set, years: dict) -> str | None:
+    if name in names:
+        return None
+
+    base, _, year = str(name).rpartition(".")
+    if base in years:
+        if years[base] is None or year in years[base]:
+            return None
+        return f"metric {name!r}: {base} is available for {min(years[base])}-{max(years[base])}"
+
+    return f"unknown metric {name!r}{_suggest(name, names)}"
+
+
+def level_numbers(level_names) -> list[int] | None:
+    """
+    The `mapLevel` levels of hierarchy members from their `level_name` values (e.g. "3"), or None unless
+    every one of them is a number, in which case the hierarchy does not number its levels.
+    """
+    names = [str(name).strip() for name in level_names]
+    if not all(name.isdigit() for name in names):
+        return None
+
+    return [int(name) for name in names]
+
+
+def _hierarchy_index(hierarchy: dict) -> tuple[set, set]:
+    """The member ids and the numeric levels (empty if it has none) of a `get_meta_dataset_dimension` response"""
+    records = hierarchy.get("hierarchy", [])
+    members = set()
+    for record in records:
+        for key in ("child", "display_id"):
+            if record.get(key) is not None:
+                members.add(str(record[key]))
+    levels = level_numbers(record.get("level_name") for record in records)
+
+    return members, set(levels or ())
+
+
+def _check_members(dimension: str, ids, members: set) -> list[str]:
+    unknown = [str(i) for i in ids if str(i) not in members]
+    if not unknown:
+        return []
+
+    shown = ", ".join(repr(i) for i in unknown[:5]) + (f" and {len(unknown) - 5} more" if len(unknown) > 5 else "")
+    return [f"{dimension}: unknown member(s) {shown}"]
+
+
+def validate_query(conn, dataset: str, payload: dict, datarun: str) -> None:
+    """
+    Checks a query's metrics, dimensions, `mapLevel` levels and predicates, and `map` members against
+    the dataset's metadata, without sending the query. Hierarchies are only fetched for the dimensions
+    the query constrains.
+
+    Args:
+        conn (CoreLMIConnection): the connection to read (cached) metadata from
+        dataset (str): the dataset to query (e.g. `emsi.us.occupation`)
+        payload (dict): the query, as built by `build_query_corelmi`
+        datarun (str): the data version to use when querying the dataset (e.g. `2020.3`)
+
+    Raises:
+        QueryValidationError: listing every problem found
+    """
+    from .coreLmi import dimension_names
+
+    dataset_info = conn.get_meta_dataset(dataset, datarun)
+    dimensions = dimension_names(dataset_info)
+    if not dimensions and not dataset_info.get("metrics"):
+        raise QueryValidationError(dataset, datarun, [f"no metadata for dataset {dataset!r} at datarun {datarun!r}"])
+
+    errors = []
+    names, years = _metric_names(dataset_info)
+    metrics = payload.get("metrics", [])
+    if not metrics:
+        errors.append("the query has no metrics")
+    for metric in metrics:
+        name = metric.get("name") if isinstance(metric, dict) else metric
+        error = _check_metric(name, names, years)
+        if error:
+            errors.append(error)
+
+    for constraint in payload.get("constraints", []):
+        dimension = constraint.get("dimensionName")
+        if dimension not in dimensions:
+            errors.append(f"unknown dimension {dimension!r}{_suggest(dimension, dimensions)}")
+            continue
+        if "mapLevel" not in constraint and "map" not in constraint:
+            continue
+
+        members, levels = _hierarchy_index(conn.get_meta_dataset_dimension(dataset, dimension, datarun))
+
+        if "mapLevel" in constraint:
+            map_level = constraint["mapLevel"]
+            level = map_level.get("level")
+            # the API accepts numeric strings such as "4" as well as numbers
+            if isinstance(level, str) and level_numbers([level]):
+                level = level_numbers([level])[0]
+            # only checked when the hierarchy numbers its levels
+            if levels and level not in levels:
+                errors.append(f"{dimension}: level {level!r} does not exist (levels are {min(levels)}-{max(levels)})")
+            errors += _check_members(dimension, map_level.get("predicate", []), members)
+
+        if "map" in constraint:
+            for ids in constraint["map"].values():
+                errors += _check_members(dimension, ids, members)
+
+    if errors:
+        raise QueryValidationError(dataset, datarun, errors)
@@ -0,0 +1,26 @@
+"""Shared fixtures for the unit tests."""
+
+import threading
+
+import pytest
+
+
+class SignallingLock:
+    """A lock that releases `entered` each time it is released, to tell when threads got past it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entered = threading.Semaphore(0)
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+        self.entered.release()
+
+
+@pytest.fixture
+def signalling_lock():
+    """A lock to swap in for SingleFlight's, so tests can wait until every caller has joined a call."""
+    return SignallingLock()
@@ -0,0 +1,167 @@
+"""Unit tests for cache module."""
+
+import threading
+from unittest.mock import MagicMock
+
+from pyghtcast.base import EmsiBaseConnection, JobPostingsConnection, ProfilesConnection
+from pyghtcast.cache import LRUCache, SingleFlight, TaxonomyCache
+
+
+class TestLRUCache:
+    """Test LRUCache functionality."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+
+
+class TestSingleFlight:
+    """Test SingleFlight functionality."""
+
+    def test_concurrent_calls_share_one_execution(self, signalling_lock):
+        """Test that concurrent calls with the same key run the function once."""
+        flight = SingleFlight()
+        flight._lock = signalling_lock
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        # every caller has looked the key up (and all but the first found the call in flight) before it finishes
+        for _ in threads:
+            assert flight._lock.entered.acquire(timeout=5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ["result"] * 5
+
+
+class TestTaxonomyCache:
+    """Test TaxonomyCache functionality."""
+
+    def test_complete_prefix_answers_longer_query(self):
+        """Test that a complete autocomplete result set is filtered locally for a longer prefix."""
+        cache = TaxonomyCache()
+        items = [{"id": "1", "name": "Software Developers"}, {"id": "2", "name": "Soft Drink Makers"}]
+        fetch = MagicMock(return_value=items)
+
+        cache.search("title", "soft", {"q": "soft", "limit": 10, "autocomplete": "true"}, fetch)
+        result = cache.search("title", "softw", {"q": "softw", "limit": 10, "autocomplete": "true"}, fetch)
+
+        assert fetch.call_count == 1
+        assert result == [{"id": "1", "name": "Software Developers"}]
+
+    def test_relevance_search_does_not_reuse_prefixes(self):
+        """Test that a search without autocomplete is never answered from a shorter search."""
+        cache = TaxonomyCache()
+        fetch = MagicMock(return_value=[{"id": "1", "name": "Software Developers"}])
+
+        cache.search("title", "soft", {"q": "soft", "limit": 10}, fetch)
+        cache.search("title", "softw", {"q": "softw", "limit": 10}, fetch)
+
+        assert fetch.call_count == 2
+
+    def test_results_are_copies(self):
+        """Test that changing a returned list does not change what the cache returns next time."""
+        cache = TaxonomyCache()
+        fetch = MagicMock(return_value=[{"id": "1", "name": "Software Developers"}])
+
+        cache.search("title", "soft", {"q": "soft"}, fetch).clear()
+        result = cache.search("title", "soft", {"q": "soft"}, fetch)
+
+        assert fetch.call_count == 1
+        assert result == [{"id": "1", "name": "Software Developers"}]
+
+    def test_result_items_are_copies(self):
+        """Test that changing a returned item does not change what the cache returns next time."""
+        cache = TaxonomyCache()
+        fetch = MagicMock(return_value=[{"id": "1", "name": "Software Developers"}])
+
+        cache.search("title", "soft", {"q": "soft", "limit": 10, "autocomplete": "true"}, fetch)[0]["name"] = "changed"
+        exact = cache.search("title", "soft", {"q": "soft", "limit": 10, "autocomplete": "true"}, fetch)
+        exact[0]["name"] = "changed"
+        prefix = cache.search("title", "softw", {"q": "softw", "limit": 10, "autocomplete": "true"}, fetch)
+        prefix[0]["name"] = "changed"
+
+        assert fetch.call_count == 1
+        assert cache.search("title", "soft", {"q": "soft", "limit": 10, "autocomplete": "true"}, fetch) == [
+            {"id": "1", "name": "Software Developers"}
+        ]
+        assert cache.search("title", "softw", {"q": "softw", "limit": 10, "autocomplete": "true"}, fetch) == [
+            {"id": "1", "name": "Software Developers"}
+        ]
+
+    def test_truncated_prefix_goes_to_api(self):
+        """Test that a result set cut off at the limit is not reused for longer prefixes."""
+        cache = TaxonomyCache()
+        fetch = MagicMock(return_value=[{"id": "1", "name": "Software Developers"}])
+
+        cache.search("title", "soft", {"q": "soft", "limit": 1, "autocomplete": "true"}, fetch)
+        cache.search("title", "softw", {"q": "softw", "limit": 1, "autocomplete": "true"}, fetch)
+
+        assert fetch.call_count == 2
+
+    def test_other_params_are_part_of_the_key(self):
+        """Test that searches with different querystring parameters are cached separately."""
+        cache = TaxonomyCache()
+        fetch = MagicMock(return_value=[])
+
+        cache.search("title", "soft", {"q": "soft"}, fetch)
+        cache.search("title", "soft", {"q": "soft", "autocomplete": "true"}, fetch)
+
+        assert fetch.call_count == 2
+
+
+class TestSearchTaxonomy:
+    """Test EmsiBaseConnection.search_taxonomy."""
+
+    def test_does_not_mutate_querystring(self):
+        """Test that the caller's querystring is left untouched."""
+        conn = EmsiBaseConnection("user", "pass")
+        conn.download_data = MagicMock()
+        conn.download_data.return_value.json.return_value = {"data": []}
+        querystring = {"autocomplete": "true"}
+
+        conn.search_taxonomy("skills", q="py", querystring=querystring)
+        conn.search_taxonomy("skills", q="py", querystring=querystring)
+
+        assert querystring == {"autocomplete": "true"}
+        conn.download_data.assert_called_once_with("taxonomies/skills", querystring={"autocomplete": "true", "q": "py"})
+
+    def test_postings_and_profiles_search_through_the_cache(self):
+        """Test that get_taxonomies authenticates with the API's own scope and reuses cached searches."""
+        for cls, url, scope in (
+            (JobPostingsConnection, "https://emsiservices.com/jpa/taxonomies/skills", "postings:us"),
+            (ProfilesConnection, "https://emsiservices.com/profiles/taxonomies/skills", "profiles:us"),
+        ):
+            conn = cls("user", "pass", authenticate=False)
+            conn.session = MagicMock()
+            conn.session.request.return_value.status_code = 200
+            conn.session.request.return_value.json.return_value = {"access_token": "abc", "expires_in": 3600}
+            conn.session.get.return_value.status_code = 200
+            conn.session.get.return_value.json.return_value = {"data": [{"id": "1", "name": "Soft Skills"}]}
+
+            first = conn.get_taxonomies("skills", q="soft")
+            second = conn.get_taxonomies("skills", q="soft")
+
+            assert first == second == [{"id": "1", "name": "Soft Skills"}]
+            assert conn.session.request.call_args.kwargs["data"]["scope"] == scope
+            conn.session.get.assert_called_once()
+            assert conn.session.get.call_args.args[0] == url
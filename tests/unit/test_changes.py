@@ -0,0 +1,74 @@
+"""Unit tests for changes module."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.changes import SkillChangeIndex, version_key
+from pyghtcast.openSkills import SkillsClassificationConnection
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+CHANGES = {
+    "9.1": {
+        "additions": [{"id": "KS3", "name": "Polars"}],
+        "removals": [{"id": "KS1", "name": "Old Skill", "replacementId": "KS2"}],
+        "consolidations": [],
+        "renames": [{"id": "KS4", "oldName": "Pandas", "newName": "pandas (Python)"}],
+    },
+    "9.10": {
+        "additions": [],
+        "removals": [{"id": "KS5", "name": "Gone"}],
+        "consolidations": [{"id": "KS2", "name": "Merged", "consolidatedId": "KS6"}],
+        "renames": [],
+    },
+}
+
+
+class TestSkillChangeIndex:
+    """Test SkillChangeIndex functionality."""
+
+    def test_composes_changes_across_versions(self):
+        """Test that a replacement that is later consolidated maps straight to the final ID."""
+        index = SkillChangeIndex.from_changes("9.0", "9.10", [("9.1", CHANGES["9.1"]), ("9.10", CHANGES["9.10"])])
+
+        assert index.replaced == {"KS1": "KS6", "KS2": "KS6"}
+        assert index.removed == {"KS5"}
+        assert index.added == {"KS3"}
+        assert index.renamed == {"KS4": ("Pandas", "pandas (Python)")}
+
+    def test_remap_keeps_series_index(self):
+        """Test that remapping a Series migrates each ID and keeps the index."""
+        index = SkillChangeIndex.from_changes("9.0", "9.10", [("9.1", CHANGES["9.1"]), ("9.10", CHANGES["9.10"])])
+        ids = pd.Series(["KS1", "KS4", "KS5", None, "KS1"], index=[10, 11, 12, 13, 14], name="skill_id")
+
+        remapped = index.remap(ids)
+
+        assert remapped.tolist() == ["KS6", "KS4", None, None, "KS6"]
+        assert remapped.index.tolist() == [10, 11, 12, 13, 14]
+        assert isinstance(index.remap(np.array(["KS2"], dtype=object)), np.ndarray)
+
+    def test_version_key_sorts_numerically(self):
+        """Test that versions sort by number, not as strings."""
+        assert sorted(["9.10", "9.2", "10.0"], key=version_key) == ["9.2", "9.10", "10.0"]
+
+    def test_version_key_mixes_numbers_and_text(self):
+        """Test that versions with text parts sort after numeric ones instead of failing to compare."""
+        assert sorted(["9.beta", "9.2", "9.10"], key=version_key) == ["9.2", "9.10", "9.beta"]
+
+
+class TestRemapSkillIds:
+    """Test SkillsClassificationConnection.remap_skill_ids."""
+
+    def test_fetches_changes_once_per_version_pair(self):
+        """Test that the change index is built from the versions in between and then cached."""
+        with patch.object(SkillsClassificationConnection, "get_new_token"):
+            conn = SkillsClassificationConnection("test_user", "test_pass")
+        conn.get_versions = MagicMock(return_value={"data": ["9.10", "9.1", "9.0"]})
+        conn.get_version_changes = MagicMock(side_effect=lambda version: CHANGES[version])
+
+        assert conn.remap_skill_ids(["KS1"], "9.0").tolist() == ["KS6"]
+        assert conn.remap_skill_ids(["KS2"], "9.0", "9.10").tolist() == ["KS6"]
+        assert [c.args[0] for c in conn.get_version_changes.call_args_list] == ["9.1", "9.10"]
+        conn.get_versions.assert_called_once()
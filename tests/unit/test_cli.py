@@ -2,7 +2,9 @@
 
 import json
 import os
-from unittest.mock import MagicMock, patch
+import subprocess
+import sys
+from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 from click.testing import CliRunner
@@ -32,6 +34,24 @@ class TestCLI:
         assert "discover" in result.output
         assert "query" in result.output
 
+    @pytest.mark.parametrize("args", [["--help"], ["--version"], ["query", "example"], ["discover", "--help"]])
+    def test_startup_does_not_import_heavy_modules(self, args):
+        """Test that commands which never touch the API do not import pandas or requests."""
+        script = (
+            "import sys\n"
+            "from pyghtcast.cli import cli\n"
+            "try:\n"
+            f"    cli({args!r})\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(sorted(m for m in ('pandas', 'requests', 'numpy') if m in sys.modules), file=sys.stderr)\n"
+        )
+        repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=repo_root
+        )
+        assert result.stderr.strip() == "[]"
+
     @patch.dict(os.environ, {}, clear=True)
     def test_get_connection_missing_env_vars(self):
         """Test connection fails with missing environment variables."""
@@ -40,7 +60,7 @@ class TestCLI:
         assert exc_info.value.code == 1
 
     @patch.dict(os.environ, {"LCAPI_USER": "test_user", "LCAPI_PASS": "test_pass"})
-    @patch("pyghtcast.cli.CoreLMIConnection")
+    @patch("pyghtcast.coreLmi.CoreLMIConnection")
     def test_get_connection_success(self, mock_conn_class):
         """Test successful connection creation."""
         mock_conn = MagicMock()
@@ -48,7 +68,7 @@ class TestCLI:
 
         result = get_connection()
 
-        mock_conn_class.assert_called_once_with("test_user", "test_pass")
+        mock_conn_class.assert_called_once_with("test_user", "test_pass", cache_dir=ANY, authenticate=False)
         assert result == mock_conn
 
     @patch("pyghtcast.cli.get_connection")
@@ -214,3 +234,207 @@ class TestCLI:
         result = runner.invoke(cli, ["discover", "datasets"])
         assert result.exit_code == 1
         assert "Error fetching datasets: API Error" in result.output
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_discover_hierarchy_parquet(self, mock_get_conn, runner, tmp_path):
+        """Test discover hierarchy written to a Parquet file."""
+        pd = pytest.importorskip("pandas")
+        pq = pytest.importorskip("pyarrow.parquet")
+        mock_conn = MagicMock()
+        mock_conn.get_dimension_hierarchy_df.return_value = pd.DataFrame(
+            {"child": ["00-0000", "11-0000"], "name": ["All Occupations", "Management"], "level": [0, 1]}
+        )
+        mock_get_conn.return_value = mock_conn
+        output = tmp_path / "hierarchy.parquet"
+
+        result = runner.invoke(
+            cli,
+            [
+                "discover",
+                "hierarchy",
+                "--dataset",
+                "emsi.us.occupation",
+                "--dimension",
+                "Occupation",
+                "--datarun",
+                "2025.3",
+                "--format",
+                "parquet",
+                "--output",
+                str(output),
+                "--columns",
+                "child,name",
+            ],
+        )
+        assert result.exit_code == 0
+        table = pq.read_table(output)
+        assert table.column_names == ["child", "name"]
+        assert str(table.schema.field("name").type).startswith("dictionary")
+
+    def test_discover_hierarchy_format_requires_output(self, runner):
+        """Test that --format without --output is rejected."""
+        result = runner.invoke(
+            cli,
+            [
+                "discover",
+                "hierarchy",
+                "--dataset",
+                "emsi.us.occupation",
+                "--dimension",
+                "Occupation",
+                "--datarun",
+                "2025.3",
+                "--format",
+                "feather",
+            ],
+        )
+        assert result.exit_code != 0
+        assert "--output is required" in result.output
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_query_run(self, mock_get_conn, runner, tmp_path):
+        """Test query run executes each spec and writes its result."""
+        pd = pytest.importorskip("pandas")
+        spec = tmp_path / "dallas_jobs.json"
+        spec.write_text(
+            json.dumps(
+                {
+                    "dataset": "emsi.us.occupation",
+                    "datarun": "2025.3",
+                    "metrics": ["Jobs.2023"],
+                    "constraints": [{"dimensionName": "Area", "map": {"Dallas": ["48113"]}}],
+                }
+            )
+        )
+        mock_conn = MagicMock()
+
+        def run_all(queries, max_workers, return_exceptions, callback):
+            for index, _ in enumerate(queries):
+                callback(index, pd.DataFrame({"Area": ["Dallas"], "Jobs.2023": [1.0]}))
+
+        mock_conn.post_retrieve_many.side_effect = run_all
+        mock_get_conn.return_value = mock_conn
+
+        result = runner.invoke(cli, ["query", "run", str(spec), "--output-dir", str(tmp_path / "out")])
+        assert result.exit_code == 0
+        queries = mock_conn.post_retrieve_many.call_args.args[0]
+        assert queries == [
+            (
+                "emsi.us.occupation",
+                {
+                    "metrics": [{"name": "Jobs.2023"}],
+                    "constraints": [{"dimensionName": "Area", "map": {"Dallas": ["48113"]}}],
+                },
+                "2025.3",
+            )
+        ]
+        assert (tmp_path / "out" / "dallas_jobs.csv").read_text().startswith("Area,Jobs.2023")
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_query_run_reports_failures(self, mock_get_conn, runner, tmp_path):
+        """Test query run exits non-zero when a query fails."""
+        spec = tmp_path / "bad.json"
+        spec.write_text(json.dumps({"dataset": "emsi.us.occupation", "metrics": ["Jobs.2099"]}))
+        mock_conn = MagicMock()
+        mock_conn.post_retrieve_many.side_effect = lambda queries, max_workers, return_exceptions, callback: callback(
+            0, Exception("Bad metric")
+        )
+        mock_get_conn.return_value = mock_conn
+
+        result = runner.invoke(cli, ["query", "run", str(spec), "--output-dir", str(tmp_path)])
+        assert result.exit_code == 1
+        assert "Bad metric" in result.output
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_query_run_invalid_json(self, mock_get_conn, runner, tmp_path):
+        """Test query run reports a spec that is not valid JSON without a traceback."""
+        spec = tmp_path / "broken.json"
+        spec.write_text('{"dataset": ')
+
+        result = runner.invoke(cli, ["query", "run", str(spec)])
+        assert result.exit_code == 2
+        assert "not a valid JSON query spec" in result.output
+        mock_get_conn.assert_not_called()
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_query_run_same_spec_names(self, mock_get_conn, runner, tmp_path):
+        """Test query run writes specs with the same file name to separate outputs."""
+        pd = pytest.importorskip("pandas")
+        specs = []
+        for folder in ("dallas", "tarrant"):
+            (tmp_path / folder).mkdir()
+            spec = tmp_path / folder / "jobs.json"
+            spec.write_text(json.dumps({"dataset": "emsi.us.occupation", "metrics": ["Jobs.2023"]}))
+            specs.append(str(spec))
+        mock_conn = MagicMock()
+
+        def run_all(queries, max_workers, return_exceptions, callback):
+            for index, _ in enumerate(queries):
+                callback(index, pd.DataFrame({"Jobs.2023": [float(index)]}))
+
+        mock_conn.post_retrieve_many.side_effect = run_all
+        mock_get_conn.return_value = mock_conn
+
+        result = runner.invoke(cli, ["query", "run", *specs, "--output-dir", str(tmp_path / "out")])
+        assert result.exit_code == 0
+        assert (tmp_path / "out" / "jobs.csv").read_text() == "Jobs.2023\n0.0\n"
+        assert (tmp_path / "out" / "jobs-2.csv").read_text() == "Jobs.2023\n1.0\n"
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_cache_warm(self, mock_get_conn, runner):
+        """Test cache warm fetches metadata for every dataset."""
+        mock_conn = MagicMock()
+        mock_conn.warm.return_value = {"emsi.us.occupation": ["Area", "Occupation"]}
+        mock_get_conn.return_value = mock_conn
+
+        result = runner.invoke(cli, ["cache", "warm", "--dataset", "emsi.us.occupation", "--datarun", "2025.3"])
+        assert result.exit_code == 0
+        mock_conn.warm.assert_called_once_with(["emsi.us.occupation"], "2025.3", 8)
+        assert "Area, Occupation" in result.output
+
+    @patch("pyghtcast.cli.get_connection")
+    def test_cache_snapshot(self, mock_get_conn, runner, tmp_path):
+        """Test cache snapshot writes a hierarchy snapshot file."""
+        pytest.importorskip("pyarrow")
+        mock_conn = MagicMock()
+        mock_conn.get_meta_dataset_dimension.return_value = {"hierarchy": [{"child": "1", "name": "US"}]}
+        mock_get_conn.return_value = mock_conn
+        output = tmp_path / "area.arrow"
+
+        result = runner.invoke(
+            cli,
+            ["cache", "snapshot", "--dataset", "emsi.us.occupation", "--dimension", "Area", "--datarun", "2025.3"]
+            + ["-o", str(output)],
+        )
+        assert result.exit_code == 0
+        assert output.exists()
+
+    def test_serve_detach_leaves_the_terminal(self, runner, tmp_path):
+        """Test that the detached daemon starts a new session and points its standard streams at /dev/null."""
+        env = {"LCAPI_USER": "user", "LCAPI_PASS": "pass", "PYGHTCAST_NO_DAEMON": ""}
+        with (
+            patch.dict(os.environ, env),
+            patch("pyghtcast.cli.os.fork", return_value=0),
+            patch("pyghtcast.cli.os.setsid") as setsid,
+            patch("pyghtcast.cli.os.open", return_value=99) as open_,
+            patch("pyghtcast.cli.os.dup2") as dup2,
+            patch("pyghtcast.cli.os.close"),
+            patch("pyghtcast.cli.get_connection"),
+            patch("pyghtcast.cli.daemon.serve") as serve,
+        ):
+            result = runner.invoke(cli, ["serve", "--detach", "--socket", str(tmp_path / "d.sock")])
+
+        assert result.exit_code == 0
+        setsid.assert_called_once()
+        open_.assert_called_once_with(os.devnull, os.O_RDWR)
+        assert [c.args for c in dup2.call_args_list] == [(99, 0), (99, 1), (99, 2)]
+        serve.assert_called_once()
+
+    def test_cache_clear(self, runner, tmp_path):
+        """Test cache clear removes cached files."""
+        (tmp_path / "meta.json").write_text("{}")
+
+        with patch.dict(os.environ, {"PYGHTCAST_CACHE_DIR": str(tmp_path)}):
+            result = runner.invoke(cli, ["cache", "clear"])
+        assert result.exit_code == 0
+        assert not (tmp_path / "meta.json").exists()
@@ -0,0 +1,328 @@
+"""Unit tests for coreLmi module."""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.base import Token
+from pyghtcast.coreLmi import CoreLMIConnection, Limiter
+from pyghtcast.exceptions import APIError, LightcastError
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def conn():
+    """Create a CoreLMIConnection without contacting the auth server."""
+    with patch.object(CoreLMIConnection, "get_new_token"):
+        connection = CoreLMIConnection("test_user", "test_pass")
+    connection.token = Token("test_token")
+    yield connection
+    connection.close()
+
+
+class TestLimiter:
+    """Test Limiter functionality."""
+
+    def test_acquire_counts_down(self):
+        """Test that each request is counted against the quota without waiting while some is left."""
+        limiter = Limiter()
+        sleep = MagicMock()
+
+        limiter.acquire(sleep)
+
+        assert limiter.upper_limit == 299
+        sleep.assert_not_called()
+
+    def test_expired_window_resets(self):
+        """Test that an expired quota window starts over instead of waiting."""
+        limiter = Limiter()
+        limiter.upper_limit = 0
+        limiter.expiration = datetime.now() - timedelta(seconds=1)
+        sleep = MagicMock()
+
+        assert limiter.seconds_left() == 0
+        limiter.acquire(sleep)
+        assert limiter.upper_limit == 299
+        sleep.assert_not_called()
+
+    def test_acquire_waits_for_the_window_when_used_up(self):
+        """Test that acquire sleeps until the window resets and then counts the request in the new window."""
+        limiter = Limiter()
+        limiter.upper_limit = 0
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            limiter.expiration = datetime.now() - timedelta(seconds=1)
+
+        limiter.acquire(sleep)
+
+        assert len(sleeps) == 1 and sleeps[0] > 0
+        assert limiter.upper_limit == 299
+
+    def test_concurrent_acquires_never_exceed_quota(self):
+        """Test that threads sharing a limiter take exactly the remaining quota without waiting."""
+        limiter = Limiter()
+        limiter.upper_limit = 8
+        sleep = MagicMock()
+        threads = [threading.Thread(target=limiter.acquire, args=(sleep,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert limiter.upper_limit == 0
+        sleep.assert_not_called()
+
+
+class TestPostRetrieveMany:
+    """Test CoreLMIConnection.post_retrieve_many."""
+
+    def test_results_in_query_order_and_deduplicated(self, conn):
+        """Test that identical queries are sent once and results keep the input order."""
+        conn.post_retrieve_df = MagicMock(
+            side_effect=lambda dataset, payload, datarun, validate: pd.DataFrame({"d": [dataset]})
+        )
+        queries = [
+            ("emsi.us.occupation", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3"),
+            ("emsi.us.industry", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3"),
+            ("emsi.us.occupation", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3"),
+        ]
+        done = []
+
+        results = conn.post_retrieve_many(queries, callback=lambda index, result: done.append(index))
+
+        assert conn.post_retrieve_df.call_count == 2
+        assert [df["d"][0] for df in results] == ["emsi.us.occupation", "emsi.us.industry", "emsi.us.occupation"]
+        assert sorted(done) == [0, 1, 2]
+
+    def test_processes_parse_in_worker_processes(self, conn):
+        """Test that raw responses are parsed in a process pool and come back as equal DataFrames."""
+        pytest.importorskip("pyarrow")
+        body = {"data": [{"name": "Area", "rows": ["48", "06"]}, {"name": "Jobs.2023", "rows": [10.5, 20.0]}]}
+        conn.download_data = MagicMock(return_value=MagicMock(content=json.dumps(body).encode()))
+        queries = [
+            ("emsi.us.occupation", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3"),
+            ("emsi.us.industry", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3"),
+        ]
+
+        results = conn.post_retrieve_many(queries, processes=2)
+
+        expected = pd.DataFrame({"Area": ["48", "06"], "Jobs.2023": [10.5, 20.0]})
+        for df in results:
+            pd.testing.assert_frame_equal(df, expected)
+        conn.download_data.assert_any_call("emsi.us.industry/2025.3", queries[1][1])
+
+    def test_processes_reuse_the_connection_pool(self, conn):
+        """Test that later calls reuse the connection's worker processes until the pool size changes or it closes."""
+        pytest.importorskip("pyarrow")
+        body = {"data": [{"name": "Area", "rows": ["48"]}]}
+        conn.download_data = MagicMock(return_value=MagicMock(content=json.dumps(body).encode()))
+        queries = [("emsi.us.occupation", {}, "2025.3")]
+
+        conn.post_retrieve_many(queries, processes=1)
+        pool = conn.parse_pool
+        conn.post_retrieve_many(queries, processes=1)
+        assert conn.parse_pool is pool
+
+        conn.post_retrieve_many(queries, processes=2)
+        assert conn.parse_pool is not pool
+
+        conn.close()
+        assert conn.parse_pool is None
+
+    def test_processes_return_parse_errors(self, conn):
+        """Test that a response that cannot be parsed is returned as the query's exception."""
+        pytest.importorskip("pyarrow")
+        conn.download_data = MagicMock(return_value=MagicMock(content=b'{"errors": ["bad"]}'))
+
+        results = conn.post_retrieve_many([("emsi.us.occupation", {}, "2025.3")], return_exceptions=True, processes=1)
+
+        assert isinstance(results[0], LightcastError)
+        assert "errors" in str(results[0])
+
+    def test_processes_raise_api_errors_and_validate(self, conn):
+        """Test that error statuses surface as APIError and queries are validated before they are sent."""
+        pytest.importorskip("pyarrow")
+        conn.get_data = MagicMock()
+        conn.post_data = MagicMock(return_value=MagicMock(status_code=404, text="no such dataset", headers={}))
+        queries = [("emsi.us.nope", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3")]
+
+        results = conn.post_retrieve_many(queries, return_exceptions=True, processes=1)
+        assert isinstance(results[0], APIError)
+        assert results[0].status_code == 404
+
+        with patch("pyghtcast.coreLmi.validation.validate_query", side_effect=ValueError("bad metric")) as validate:
+            with pytest.raises(ValueError, match="bad metric"):
+                conn.post_retrieve_many(queries, processes=1, validate=True)
+        validate.assert_called_once_with(conn, *queries[0])
+        conn.post_data.assert_called_once()
+
+    def test_return_exceptions(self, conn):
+        """Test that a failed query is returned in place when return_exceptions is set."""
+        conn.post_retrieve_df = MagicMock(side_effect=KeyError("data"))
+
+        results = conn.post_retrieve_many([("emsi.us.occupation", {}, "2025.3")], return_exceptions=True)
+
+        assert isinstance(results[0], KeyError)
+
+
+class TestMetaCache:
+    """Test CoreLMIConnection metadata caching."""
+
+    def test_meta_dataset_fetched_once(self, conn):
+        """Test that repeated metadata lookups are served from the cache."""
+        conn.download_data = MagicMock()
+        conn.download_data.return_value.status_code = 200
+        conn.download_data.return_value.json.return_value = {"dimensions": []}
+
+        conn.get_meta_dataset("emsi.us.occupation", "2025.3")
+        conn.get_meta_dataset("emsi.us.occupation", "2025.3")
+
+        conn.download_data.assert_called_once_with("meta/dataset/emsi.us.occupation/2025.3")
+
+    def test_listings_expire_sooner(self, conn, tmp_path):
+        """Test that the dataset listing is refetched after its short TTL while dataset metadata is kept."""
+        conn.meta_cache.directory = str(tmp_path)
+        conn.download_data = MagicMock()
+        conn.download_data.return_value.json.return_value = {"data": []}
+
+        conn.get_meta()
+        conn.get_meta_dataset("emsi.us.occupation", "2025.3")
+        with patch("pyghtcast.cache.time.time", return_value=time.time() + 60 * 60):
+            conn.get_meta()
+            conn.get_meta_dataset("emsi.us.occupation", "2025.3")
+
+        assert [c.args[0] for c in conn.download_data.call_args_list] == [
+            "meta",
+            "meta/dataset/emsi.us.occupation/2025.3",
+            "meta",
+        ]
+
+    def test_errors_are_raised_and_not_cached(self, conn):
+        """Test that a failed metadata lookup raises and is retried on the next call."""
+        conn.get_data = MagicMock(return_value=MagicMock(status_code=503, text='{"errors": []}', headers={}))
+
+        for _ in range(2):
+            with pytest.raises(APIError) as exc_info:
+                conn.get_meta_definitions()
+            assert exc_info.value.status_code == 503
+
+        assert conn.get_data.call_count == 2
+
+    def test_unknown_dataset_fails_warm(self, conn):
+        """Test that warming a dataset the API does not know raises instead of reporting no dimensions."""
+        conn.get_data = MagicMock(
+            side_effect=lambda url: MagicMock(status_code=404 if "nope" in url else 200, text="", headers={})
+        )
+
+        with pytest.raises(APIError, match="404"):
+            conn.warm(["emsi.us.nope"], "2025.3")
+
+
+class TestTokenRefresh:
+    """Test token refreshes shared between threads."""
+
+    def test_concurrent_requests_refresh_once(self, conn):
+        """Test that threads finding no token wait for a single token request."""
+        conn.token = None
+        barrier = threading.Barrier(4)
+
+        def get_new_token():
+            conn.token = Token("fresh")
+
+        conn.get_new_token = MagicMock(side_effect=get_new_token)
+        conn.get_data = MagicMock(return_value=MagicMock(status_code=200))
+
+        def request(index):
+            barrier.wait()
+            conn.download_data(f"meta/dataset/emsi.us.occupation/{index}")
+
+        threads = [threading.Thread(target=request, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        conn.get_new_token.assert_called_once()
+        assert conn.get_data.call_count == 4
+
+
+class TestRequestCoalescing:
+    """Test single-flight deduplication in CoreLMIConnection.download_data."""
+
+    def test_concurrent_identical_requests_share_one_response(self, conn, signalling_lock):
+        """Test that identical concurrent requests reach the API once and share one decoded payload."""
+        response = MagicMock(status_code=200)
+        decode = response.json
+        decode.return_value = {"data": []}
+        release = threading.Event()
+        conn.in_flight._lock = signalling_lock
+
+        def slow_get(url):
+            release.wait(5)
+            return response
+
+        conn.get_data = MagicMock(side_effect=slow_get)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(conn.download_data("meta/definitions"))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        # the request is only answered once every thread has joined it
+        for _ in threads:
+            assert conn.in_flight._lock.entered.acquire(timeout=5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert conn.get_data.call_count == 1
+        assert results == [response] * 4
+        assert len({id(result.json()) for result in results}) == 1
+        decode.assert_called_once()
+        assert conn.limiter.upper_limit == 299
+
+    def test_request_key_ignores_payload_key_order(self, conn):
+        """Test that payloads differing only in key order are the same request."""
+        first = conn.request_key("url", {"metrics": [], "constraints": []})
+        second = conn.request_key("url", {"constraints": [], "metrics": []})
+
+        assert first == second
+        assert first != conn.request_key("url")
+
+
+class TestWarm:
+    """Test CoreLMIConnection.warm."""
+
+    def test_fetches_every_dimension(self, conn):
+        """Test that warm fetches definitions, dataset metadata and each dimension hierarchy."""
+        conn.get_meta_definitions = MagicMock(return_value={})
+        conn.get_meta_dataset = MagicMock(return_value={"dimensions": [{"name": "Area"}, {"name": "Occupation"}]})
+        conn.get_meta_dataset_dimension = MagicMock(return_value={"hierarchy": []})
+
+        warmed = conn.warm(["emsi.us.occupation"], "2025.3")
+
+        assert warmed == {"emsi.us.occupation": ["Area", "Occupation"]}
+        conn.get_meta_definitions.assert_called_once()
+        assert sorted(call.args[1] for call in conn.get_meta_dataset_dimension.call_args_list) == ["Area", "Occupation"]
+
+    def test_cache_dir_survives_connections(self, tmp_path):
+        """Test that metadata persisted by one connection is reused by the next."""
+        with patch.object(CoreLMIConnection, "get_new_token"):
+            first = CoreLMIConnection("test_user", "test_pass", cache_dir=str(tmp_path))
+            second = CoreLMIConnection("test_user", "test_pass", cache_dir=str(tmp_path), authenticate=False)
+        first.download_data = MagicMock()
+        first.download_data.return_value.status_code = 200
+        first.download_data.return_value.json.return_value = {"dimensions": [{"name": "Area"}]}
+        second.download_data = MagicMock()
+
+        first.get_meta_dataset("emsi.us.occupation", "2025.3")
+
+        assert second.get_meta_dataset("emsi.us.occupation", "2025.3") == {"dimensions": [{"name": "Area"}]}
+        second.download_data.assert_not_called()
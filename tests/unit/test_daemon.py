@@ -0,0 +1,116 @@
+"""Unit tests for daemon module."""
+
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast import daemon
+from pyghtcast.exceptions import RateLimitError
+from pyghtcast.validation import QueryValidationError
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    """Serve a mocked connection on a socket in a background thread."""
+    conn = MagicMock()
+    path = str(tmp_path / "pyghtcast.sock")
+    server = daemon.DaemonServer(path, conn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield conn, path
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestDaemon:
+    """Test daemon functionality."""
+
+    def test_connect_without_daemon(self, tmp_path):
+        """Test that connect returns None when nothing is listening."""
+        assert daemon.connect(str(tmp_path / "missing.sock")) is None
+
+    def test_remote_call(self, running_daemon):
+        """Test that a remote method is answered by the daemon's connection."""
+        conn, path = running_daemon
+        conn.get_meta_dataset.return_value = {"dimensions": ["Area"]}
+
+        client = daemon.connect(path)
+
+        assert client.get_meta_dataset("emsi.us.occupation", "2025.3") == {"dimensions": ["Area"]}
+        conn.get_meta_dataset.assert_called_once_with("emsi.us.occupation", "2025.3")
+
+    def test_remote_error(self, running_daemon):
+        """Test that an exception in the daemon is raised in the client."""
+        conn, path = running_daemon
+        conn.get_meta_definitions.side_effect = KeyError("data")
+
+        client = daemon.connect(path)
+
+        with pytest.raises(daemon.DaemonError, match="KeyError"):
+            client.get_meta_definitions()
+
+    def test_remote_api_errors_keep_their_type(self, running_daemon):
+        """Test that pyghtcast exceptions are raised in the client as the same type, with their attributes."""
+        conn, path = running_daemon
+        conn.get_meta.side_effect = RateLimitError("slow down", retry_after=30.0, status_code=429, url="meta")
+        conn.get_meta_dataset.side_effect = QueryValidationError("emsi.us.occupation", "2025.3", ["bad metric"])
+        client = daemon.connect(path)
+
+        with pytest.raises(RateLimitError, match="slow down") as raised:
+            client.get_meta()
+        with pytest.raises(QueryValidationError) as invalid:
+            client.get_meta_dataset("emsi.us.occupation", "2025.3")
+
+        assert (raised.value.status_code, raised.value.retry_after, raised.value.url) == (429, 30.0, "meta")
+        assert invalid.value.errors == ["bad metric"]
+
+    def test_connect_only_to_own_sockets(self, running_daemon, tmp_path):
+        """Test that connect refuses files that are not sockets, and sockets owned by another user."""
+        _, path = running_daemon
+        not_a_socket = tmp_path / "plain.sock"
+        not_a_socket.write_text("")
+
+        assert daemon.connect(str(not_a_socket)) is None
+        with patch("pyghtcast.daemon.os.getuid", return_value=os.getuid() + 1):
+            assert daemon.connect(path) is None
+        with pytest.raises(RuntimeError, match="not a socket owned"):
+            daemon.serve(MagicMock(), str(not_a_socket))
+        assert daemon.connect(path) is not None
+
+    def test_local_dataframe_method(self, running_daemon):
+        """Test that DataFrame methods are built in the client from remote JSON."""
+        pytest.importorskip("pandas")
+        conn, path = running_daemon
+        conn.get_meta_dataset_dimension.return_value = {"hierarchy": [{"child": "00-0000", "name": "All"}]}
+
+        df = daemon.connect(path).get_dimension_hierarchy_df("emsi.us.occupation", "Occupation", "2025.3")
+
+        assert list(df["child"]) == ["00-0000"]
+
+    def test_local_query_methods(self, running_daemon):
+        """Test that the query methods run in the client on top of the daemon, including with processes."""
+        pd = pytest.importorskip("pandas")
+        conn, path = running_daemon
+        conn.post_retrieve_data.return_value = {
+            "data": [{"name": "Area", "rows": ["48"]}, {"name": "Jobs.2023", "rows": [1.0]}]
+        }
+        query = ("emsi.us.occupation", {"metrics": [{"name": "Jobs.2023"}]}, "2025.3")
+        client = daemon.connect(path)
+
+        df = client.post_retrieve_df(*query, columns=["Jobs.2023"])
+        results = client.post_retrieve_many([query], processes=2)
+
+        assert df.columns.tolist() == ["Jobs.2023"]
+        pd.testing.assert_frame_equal(results[0], pd.DataFrame({"Area": ["48"], "Jobs.2023": [1.0]}))
+        assert conn.post_retrieve_data.call_count == 2
+
+    def test_unknown_method_is_rejected(self, running_daemon):
+        """Test that only whitelisted connection methods can be called."""
+        _, path = running_daemon
+
+        with pytest.raises(daemon.DaemonError, match="Unknown method"):
+            daemon.DaemonClient(path).call("get_new_token")
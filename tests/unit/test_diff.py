@@ -0,0 +1,100 @@
+"""Unit tests for diff module."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyghtcast.diff import diff_dataruns, incremental_refresh
+
+pd = pytest.importorskip("pandas")
+
+
+def hierarchy(*members):
+    return {"hierarchy": [{"child": c, "parent": p, "name": n} for c, p, n in members]}
+
+
+OLD_AREA = hierarchy(
+    ("0", "0", "US"),
+    ("48113", "0", "Dallas"),
+    ("48439", "0", "Tarrant"),
+    ("75001", "48113", "Addison"),
+    ("76101", "48439", "Fort Worth"),
+)
+NEW_AREA = hierarchy(
+    ("0", "0", "US"),
+    ("48113", "0", "Dallas"),
+    ("48439", "0", "Tarrant"),
+    ("75001", "48113", "Addison"),
+    ("75002", "48113", "Allen"),
+    ("76101", "48439", "Fort Worth"),
+)
+OCCUPATION = hierarchy(("0", "0", "All"), ("15-0000", "0", "Computer"))
+
+QUERY = {
+    "metrics": [{"name": "Jobs.2023"}],
+    "constraints": [
+        {"dimensionName": "Area", "mapLevel": {"level": 3, "predicate": [48113, 48439]}},
+        {"dimensionName": "Occupation", "mapLevel": {"level": 2, "predicate": ["15-0000"]}},
+    ],
+}
+
+
+@pytest.fixture
+def conn():
+    """A connection with an Area hierarchy that gained a ZIP under Dallas in 2025.4."""
+    meta = {"dimensions": [{"name": "Area"}, {"name": "Occupation"}], "metrics": [{"name": "Jobs.2023"}]}
+    hierarchies = {
+        ("Area", "2025.3"): OLD_AREA,
+        ("Area", "2025.4"): NEW_AREA,
+        ("Occupation", "2025.3"): OCCUPATION,
+        ("Occupation", "2025.4"): OCCUPATION,
+    }
+    connection = MagicMock()
+    connection.get_meta_dataset.return_value = meta
+    connection.get_meta_dataset_dimension.side_effect = lambda dataset, dim, datarun: hierarchies[(dim, datarun)]
+    return connection
+
+
+class TestDiffDataruns:
+    """Test diff_dataruns functionality."""
+
+    def test_finds_added_members(self, conn):
+        """Test that members new in the later datarun are reported per dimension."""
+        diff = diff_dataruns(conn, "emsi.us.occupation", "2025.3", "2025.4")
+
+        assert diff.dimensions["Area"].added == {"75002"}
+        assert not diff.dimensions["Occupation"]
+        assert diff.metrics_added == set()
+
+
+class TestIncrementalRefresh:
+    """Test incremental_refresh functionality."""
+
+    def test_requeries_only_affected_shards(self, conn):
+        """Test that only the shard containing the change is re-queried and the rest is reused."""
+        previous = pd.DataFrame(
+            {"Area": ["75001", "76101"], "Occupation": ["15-0000", "15-0000"], "Jobs.2023": [10.0, 20.0]}
+        )
+        conn.post_retrieve_df.return_value = pd.DataFrame(
+            {"Area": ["75001", "75002"], "Occupation": ["15-0000", "15-0000"], "Jobs.2023": [11.0, 5.0]}
+        )
+
+        df = incremental_refresh(conn, "emsi.us.occupation", QUERY, previous, "2025.3", "2025.4", "Area")
+
+        sent = conn.post_retrieve_df.call_args.args[1]
+        assert sent["constraints"][0]["mapLevel"]["predicate"] == [48113]
+        assert df.attrs["refreshed_shards"] == ["48113"]
+        assert df.attrs["reused_shards"] == ["48439"]
+        assert sorted(df["Area"]) == ["75001", "75002", "76101"]
+        assert df.loc[df["Area"] == "76101", "Jobs.2023"].item() == 20.0
+
+    def test_new_metric_requeries_everything(self, conn):
+        """Test that a result missing a requested metric column is fully re-queried."""
+        previous = pd.DataFrame({"Area": ["75001"], "Occupation": ["15-0000"]})
+        conn.post_retrieve_df.return_value = pd.DataFrame()
+
+        df = incremental_refresh(conn, "emsi.us.occupation", QUERY, previous, "2025.3", "2025.4", "Area")
+
+        assert conn.post_retrieve_df.call_args.args[1] is QUERY
+        assert df.attrs["refreshed_shards"] == ["48113", "48439"]
+        assert df.attrs["reused_shards"] == []
@@ -0,0 +1,102 @@
+"""Tests for the exception hierarchy and sampled error logging."""
+
+import logging
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast import logs
+from pyghtcast.base import Token
+from pyghtcast.coreLmi import CoreLMIConnection
+from pyghtcast.exceptions import APIError, AuthenticationError, LightcastError, RateLimitError, check_response
+
+
+def response(status_code, text="", headers=None):
+    """Create a mock response."""
+    return MagicMock(status_code=status_code, text=text, headers=headers or {}, url="https://example.com/q")
+
+
+class TestCheckResponse:
+    """Tests for mapping error statuses to exceptions."""
+
+    def test_success_is_returned(self):
+        """Test that a successful response passes through."""
+        ok = response(200)
+        assert check_response(ok) is ok
+
+    @pytest.mark.parametrize(
+        "status, error",
+        [(401, AuthenticationError), (403, AuthenticationError), (429, RateLimitError), (500, APIError)],
+    )
+    def test_status_maps_to_exception(self, status, error):
+        """Test that each error status raises its exception type."""
+        with pytest.raises(error) as exc_info:
+            check_response(response(status, "x" * 2000))
+
+        assert isinstance(exc_info.value, LightcastError)
+        assert exc_info.value.status_code == status
+        assert len(exc_info.value.body) < 600
+
+    def test_retry_after(self):
+        """Test that a 429's Retry-After header is kept."""
+        with pytest.raises(RateLimitError) as exc_info:
+            check_response(response(429, headers={"retry-after": "30"}))
+
+        assert exc_info.value.retry_after == 30.0
+
+    def test_rejected_credentials(self):
+        """Test that rejected credentials raise an AuthenticationError that is still a ValueError."""
+        conn = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+        conn.session = MagicMock()
+        conn.session.request.return_value = response(400, '{"error": "invalid_client"}')
+
+        with pytest.raises(ValueError) as exc_info:
+            conn.get_new_token()
+
+        assert isinstance(exc_info.value, AuthenticationError)
+
+
+class TestSampledLogging:
+    """Tests for sampled logging of failed responses."""
+
+    def test_sampler_counts_suppressed_events(self):
+        """Test that events past the burst are suppressed and reported with the next window's first event."""
+        sampler = logs.ErrorSampler(burst=2, window=60)
+
+        assert [sampler.allow("503")[0] for _ in range(5)] == [True, True, False, False, False]
+        with patch("pyghtcast.logs.time.monotonic", return_value=10**9):
+            assert sampler.allow("503") == (True, 3)
+
+    def test_error_storm_is_sampled(self, caplog):
+        """Test that repeated failures from download_data are logged only up to the burst."""
+        conn = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+        conn.token = Token("test_token")
+        conn.post_data = MagicMock(return_value=response(503, "unavailable"))
+
+        with patch.object(logs, "sampler", logs.ErrorSampler(burst=3)), caplog.at_level(logging.WARNING):
+            for _ in range(20):
+                with pytest.raises(APIError):
+                    conn.download_data("emsi.us.occupation/2025.3", {"metrics": []})
+
+        assert len(caplog.records) == 3
+        assert caplog.records[0].status_code == 503
+
+    def test_other_success_statuses_are_not_logged(self, caplog):
+        """Test that a 2xx other than 200 is neither logged as a failure nor raised, as in check_response."""
+        conn = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+        conn.token = Token("test_token")
+        conn.post_data = MagicMock(return_value=response(202, "accepted"))
+
+        with caplog.at_level(logging.WARNING):
+            conn.download_data("emsi.us.occupation/2025.3", {"metrics": []})
+
+        assert caplog.records == []
+
+    def test_data_query_raises(self):
+        """Test that a failed data query raises an APIError instead of failing on the response body."""
+        conn = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+        conn.token = Token("test_token")
+        conn.post_data = MagicMock(return_value=response(500, "boom"))
+
+        with pytest.raises(APIError, match="500"):
+            conn.post_retrieve_data("emsi.us.occupation", {"metrics": []}, "2025.3")
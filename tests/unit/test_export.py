@@ -0,0 +1,82 @@
+"""Unit tests for export module."""
+
+import pytest
+
+from pyghtcast import export
+
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pyarrow")
+
+
+class TestWriteDf:
+    """Test write_df functionality."""
+
+    @pytest.fixture
+    def df(self):
+        """Create a small Core LMI style DataFrame."""
+        return pd.DataFrame(
+            {
+                "Area": ["48113", "48113", "48085", "48085", "48121"],
+                "Occupation": ["11-1011", "11-1021", "11-1011", "11-1021", "11-1011"],
+                "Jobs.2023": [1.0, 2.0, 3.0, 4.0, 5.0],
+            }
+        )
+
+    @pytest.mark.parametrize("to", ["parquet", "feather", "arrow"])
+    def test_round_trip_across_shards(self, df, tmp_path, to):
+        """Test that every shard is written and dimension columns are dictionary-encoded."""
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        path = tmp_path / f"data.{to}"
+        export.write_df(df, str(path), to=to, dimensions=["Area", "Occupation"], shard_size=2)
+
+        if to == "parquet":
+            table = pyarrow.parquet.read_table(path)
+        elif to == "feather":
+            table = pyarrow.ipc.open_file(path).read_all()
+        else:
+            table = pyarrow.ipc.open_stream(path).read_all()
+
+        assert table.num_rows == 5
+        assert pa.types.is_dictionary(table.schema.field("Area").type)
+        assert not pa.types.is_dictionary(table.schema.field("Jobs.2023").type)
+        assert table.column("Jobs.2023").to_pylist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def test_column_empty_in_first_shard(self, tmp_path):
+        """Test that columns with no values in the first shard keep the type of the later shards."""
+        import pyarrow.parquet
+
+        df = pd.DataFrame(
+            {
+                "Area": [None, None, "48113", "48085"],
+                "Note": pd.Series([None, None, "revised", None], dtype=object),
+                "Jobs.2023": [1.0, 2.0, 3.0, 4.0],
+            }
+        )
+        path = tmp_path / "data.parquet"
+        export.write_df(df, str(path), dimensions=["Area"], shard_size=2)
+
+        table = pyarrow.parquet.read_table(path)
+        assert table.schema.field("Note").type == pa.string()
+        assert table.column("Area").to_pylist() == [None, None, "48113", "48085"]
+        assert table.column("Note").to_pylist() == [None, None, "revised", None]
+
+    def test_column_projection(self, df, tmp_path):
+        """Test that only the requested columns are written."""
+        import pyarrow.parquet
+
+        path = tmp_path / "data.parquet"
+        export.write_df(df, str(path), columns=["Jobs.2023", "Area"])
+
+        assert pyarrow.parquet.read_table(path).column_names == ["Jobs.2023", "Area"]
+
+    def test_unknown_column(self, df):
+        """Test that projecting a missing column raises a KeyError."""
+        with pytest.raises(KeyError, match="Jobs.2099"):
+            export.project(df, ["Jobs.2099"])
+
+    def test_unknown_format(self, df, tmp_path):
+        """Test that an unsupported format raises a ValueError."""
+        with pytest.raises(ValueError, match="Unsupported format"):
+            export.write_df(df, str(tmp_path / "data.orc"), to="orc")
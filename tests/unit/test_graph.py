@@ -0,0 +1,43 @@
+"""Unit tests for graph module."""
+
+from unittest.mock import MagicMock
+
+from pyghtcast.graph import RelatedSkillsGraph
+
+EDGES = {
+    "KS1": ["KS2", "KS3"],
+    "KS2": ["KS1", "KS4"],
+    "KS3": ["KS4"],
+    "KS4": ["KS5"],
+}
+
+
+def related(skill_ids, limit=10, version="latest"):
+    (skill_id,) = skill_ids
+    return {"data": [{"id": neighbor, "name": neighbor} for neighbor in EDGES.get(skill_id, [])]}
+
+
+class TestRelatedSkillsGraph:
+    """Test RelatedSkillsGraph functionality."""
+
+    def test_expand_to_depth(self):
+        """Test that BFS returns the adjacency of every skill within depth - 1 hops."""
+        conn = MagicMock()
+        conn.post_find_related_skills.side_effect = related
+        graph = RelatedSkillsGraph(conn)
+
+        adjacency = graph.expand(["KS1"], depth=2)
+
+        assert adjacency == {"KS1": ["KS2", "KS3"], "KS2": ["KS1", "KS4"], "KS3": ["KS4"]}
+
+    def test_overlapping_expansions_fetch_each_skill_once(self):
+        """Test that adjacency is cached, so overlapping seeds only cost one request per distinct skill."""
+        conn = MagicMock()
+        conn.post_find_related_skills.side_effect = related
+        graph = RelatedSkillsGraph(conn)
+
+        graph.expand(["KS1"], depth=2)
+        graph.expand(["KS2", "KS3"], depth=2)
+
+        fetched = sorted(c.args[0][0] for c in conn.post_find_related_skills.call_args_list)
+        assert fetched == ["KS1", "KS2", "KS3", "KS4"]
@@ -0,0 +1,101 @@
+"""Tests for the metrics registry."""
+
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast import metrics
+from pyghtcast.base import Token
+from pyghtcast.coreLmi import CoreLMIConnection
+
+
+@pytest.fixture
+def registry():
+    """Enable metrics for one test."""
+    yield metrics.enable()
+    metrics.disable()
+
+
+@pytest.fixture
+def conn():
+    """A CoreLMIConnection whose requests never leave the process."""
+    connection = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+    connection.token = Token("test_token")
+    connection.session = MagicMock()
+    connection.session.post.return_value = MagicMock(status_code=200, content=b'{"data": []}', headers={})
+    connection.session.post.return_value.raw.tell.return_value = 4
+    connection.session.get.return_value = MagicMock(status_code=200, content=b'{"dimensions": []}', headers={})
+    return connection
+
+
+class TestMetrics:
+    """Tests for recording and exposing metrics."""
+
+    def test_disabled_by_default(self, conn):
+        """Test that nothing is recorded while metrics are disabled."""
+        assert metrics.registry() is None
+        conn.post_retrieve_data("emsi.us.occupation", {"metrics": []}, "2025.3")
+        assert metrics.registry() is None
+
+    def test_requests_cache_and_bytes(self, registry, conn):
+        """Test that requests, latencies, cache lookups and bytes are recorded per connection."""
+        conn.post_retrieve_data("emsi.us.occupation", {"metrics": []}, "2025.3")
+        conn.get_meta_definitions()
+        conn.get_meta_definitions()
+
+        assert registry.requests.value("CoreLMIConnection", "emsi.us.occupation/:id", "200") == 1
+        assert registry.request_duration.count("CoreLMIConnection", "emsi.us.occupation/:id") == 1
+        assert registry.cache_lookups.value("meta", "miss") == 1
+        assert registry.cache_lookups.value("meta", "hit") == 1
+        assert registry.transfer_bytes.value("CoreLMIConnection", "wire") == 4 + len(b'{"dimensions": []}')
+
+    def test_limiter_waits_and_token_refreshes(self, registry, conn):
+        """Test that rate limiter waits and token requests are recorded."""
+        conn.session.request.return_value = MagicMock(status_code=200, json=lambda: {"access_token": "t"})
+        conn.get_new_token()
+        with patch("pyghtcast.coreLmi.time.sleep"):
+            conn.wait(2.0)
+
+        assert registry.token_refreshes.value("CoreLMIConnection", "ok") == 1
+        assert registry.limiter_wait.count("CoreLMIConnection") == 1
+
+    def test_exposition_format(self, registry):
+        """Test the text exposition of counters and cumulative histogram buckets."""
+        metrics.observe_request("CoreLMIConnection", "meta", 200, 0.3)
+        metrics.observe_request("CoreLMIConnection", "meta", 200, 0.07)
+
+        text = registry.exposition()
+        assert "# TYPE pyghtcast_requests_total counter" in text
+        assert 'pyghtcast_requests_total{connection="CoreLMIConnection",endpoint="meta",status="200"} 2' in text
+        assert (
+            'pyghtcast_request_duration_seconds_bucket{connection="CoreLMIConnection",endpoint="meta",le="0.1"} 1'
+            in text
+        )
+        assert (
+            'pyghtcast_request_duration_seconds_bucket{connection="CoreLMIConnection",endpoint="meta",le="+Inf"} 2'
+            in text
+        )
+
+    def test_serve_and_write(self, registry, tmp_path):
+        """Test that the exposition is served over HTTP and written to a file."""
+        metrics.count_cache_lookup("taxonomy", True)
+        server = registry.serve(port=0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        path = tmp_path / "pyghtcast.prom"
+        registry.write(str(path))
+        assert 'pyghtcast_cache_lookups_total{cache="taxonomy",result="hit"} 1' in body
+        assert path.read_text() == registry.exposition()
+
+    def test_endpoint_label_is_bounded(self):
+        """Test that ids and versions are collapsed in endpoint labels."""
+        assert (
+            metrics.endpoint_label("meta/dataset/emsi.us.occupation/2025.3/Area") == "meta/dataset/emsi.us.occupation"
+        )
+        assert metrics.endpoint_label("versions/9.0/skills/KS125QC6K0QLLKCTPJQ0") == "versions/:id/skills"
@@ -0,0 +1,45 @@
+"""Unit tests for openSkills module."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.openSkills import SkillsClassificationConnection
+
+
+@pytest.fixture
+def conn():
+    """Create a SkillsClassificationConnection without contacting the auth server."""
+    with patch.object(SkillsClassificationConnection, "get_new_token"):
+        connection = SkillsClassificationConnection("test_user", "test_pass")
+    return connection
+
+
+def answer_ids(api_endpoint, payload=None, querystring=None):
+    """Answer a skills lookup with the requested IDs in reverse order, as the API may."""
+    response = MagicMock()
+    response.json.return_value = {"data": [{"id": i, "name": f"Skill {i}"} for i in reversed(payload["ids"])]}
+    return response
+
+
+class TestPostListRequestedSkills:
+    """Test post_list_requested_skills functionality."""
+
+    def test_fields_and_types_are_sent(self, conn):
+        """Test that typeIds and fields reach the server as comma-separated parameters."""
+        conn.download_data = MagicMock(side_effect=answer_ids)
+
+        conn.post_list_requested_skills({"ids": ["KS1"]}, typeIds="ST1", fields=["id", "name"])
+
+        assert conn.download_data.call_args.kwargs["querystring"] == {"typeIds": "ST1", "fields": "id,name"}
+
+    def test_large_id_lists_are_chunked_in_order(self, conn):
+        """Test that long ID lists are split into chunks and merged back in request order."""
+        conn.download_data = MagicMock(side_effect=answer_ids)
+        ids = [f"KS{i}" for i in range(7)]
+
+        result = conn.post_list_requested_skills({"ids": ids}, fields="name", chunk_size=3)
+
+        assert conn.download_data.call_count == 3
+        assert [skill["id"] for skill in result["data"]] == ids
+        assert conn.download_data.call_args.kwargs["querystring"] == {"fields": "id,name"}
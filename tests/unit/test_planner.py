@@ -0,0 +1,110 @@
+"""Unit tests for planner module."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.planner import QueryBatch
+
+pd = pytest.importorskip("pandas")
+
+AREA = {
+    "hierarchy": [
+        {"child": "0", "parent": "0", "name": "US"},
+        {"child": "48113", "parent": "0", "name": "Dallas"},
+        {"child": "48439", "parent": "0", "name": "Tarrant"},
+        {"child": "75001", "parent": "48113", "name": "Addison"},
+        {"child": "76101", "parent": "48439", "name": "Fort Worth"},
+    ]
+}
+
+
+def query(metrics, area):
+    return {
+        "metrics": [{"name": m} for m in metrics],
+        "constraints": [
+            {"dimensionName": "Area", "mapLevel": {"level": 3, "predicate": area}},
+            {"dimensionName": "Occupation", "mapLevel": {"level": 2, "predicate": ["15-0000"]}},
+        ],
+    }
+
+
+@pytest.fixture
+def conn():
+    """A connection whose queries return one ZIP row per requested county."""
+    zips = {"48113": "75001", "48439": "76101"}
+
+    def retrieve_many(queries, **kwargs):
+        results = []
+        for _, payload, _ in queries:
+            areas = [zips[a] for a in payload["constraints"][0]["mapLevel"]["predicate"]]
+            data = {"Area": areas, "Occupation": ["15-0000"] * len(areas)}
+            for metric in payload["metrics"]:
+                data[metric["name"]] = [float(len(metric["name"]))] * len(areas)
+            results.append(pd.DataFrame(data))
+        return results
+
+    connection = MagicMock()
+    connection.post_retrieve_many.side_effect = retrieve_many
+    connection.get_meta_dataset_dimension.return_value = AREA
+    return connection
+
+
+class TestQueryBatch:
+    """Test QueryBatch functionality."""
+
+    def test_metrics_are_merged(self, conn):
+        """Test that queries with the same constraints are sent once and split by metric."""
+        with QueryBatch(conn) as batch:
+            jobs = batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48113"]), "2025.3")
+            pay = batch.add("emsi.us.occupation", query(["Earnings.2023"], ["48113"]), "2025.3")
+
+        (sent,) = conn.post_retrieve_many.call_args.args[0]
+        assert [m["name"] for m in sent[1]["metrics"]] == ["Jobs.2023", "Earnings.2023"]
+        assert list(jobs.result().columns) == ["Area", "Occupation", "Jobs.2023"]
+        assert list(pay.result().columns) == ["Area", "Occupation", "Earnings.2023"]
+
+    def test_predicates_are_merged(self, conn):
+        """Test that queries differing in one predicate are sent once and split by hierarchy."""
+        with QueryBatch(conn) as batch:
+            dallas = batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48113"]), "2025.3")
+            tarrant = batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48439"]), "2025.3")
+
+        (sent,) = conn.post_retrieve_many.call_args.args[0]
+        assert sent[1]["constraints"][0]["mapLevel"]["predicate"] == ["48113", "48439"]
+        assert dallas.result()["Area"].tolist() == ["75001"]
+        assert tarrant.result()["Area"].tolist() == ["76101"]
+
+    def test_result_flushes_pending_queries(self, conn):
+        """Test that asking for a result sends the batch without waiting for the scope to end."""
+        batch = QueryBatch(conn)
+        jobs = batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48113"]), "2025.3")
+
+        assert jobs.result()["Jobs.2023"].tolist() == [9.0]
+        conn.post_retrieve_many.assert_called_once()
+
+    def test_failed_flush_resolves_every_query(self, conn):
+        """Test that an error while planning or sending fails each popped query instead of leaving it pending."""
+        conn.post_retrieve_many.side_effect = RuntimeError("connection reset")
+        batch = QueryBatch(conn)
+        jobs = batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48113"]), "2025.3")
+        wages = batch.add("emsi.us.occupation", query(["Earnings.2023"], ["48439"]), "2025.3")
+
+        batch.flush()
+
+        assert jobs.done() and wages.done()
+        with pytest.raises(RuntimeError, match="connection reset"):
+            jobs.result(timeout=1)
+
+    def test_map_level_without_predicate_is_not_merged(self, conn):
+        """Test that a mapLevel covering every member is sent as its own request."""
+        everything = query(["Jobs.2023"], ["48113"])
+        del everything["constraints"][0]["mapLevel"]["predicate"]
+        batch = QueryBatch(conn)
+        batch.add("emsi.us.occupation", everything, "2025.3")
+        batch.add("emsi.us.occupation", query(["Jobs.2023"], ["48439"]), "2025.3")
+
+        with patch.object(conn, "post_retrieve_many", return_value=[pd.DataFrame(), pd.DataFrame()]) as send:
+            batch.flush()
+
+        assert len(send.call_args.args[0]) == 2
@@ -0,0 +1,77 @@
+"""Unit tests for pool module."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyghtcast.base import Token
+from pyghtcast.exceptions import APIError, AuthenticationError
+from pyghtcast.pool import ConnectionPool
+
+
+def response(status_code):
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.headers = {}
+    return resp
+
+
+@pytest.fixture
+def pool():
+    """A pool over three credentials whose members answer without any network access."""
+    connection_pool = ConnectionPool([("a", "1"), ("b", "2"), ("c", "3")], authenticate=False)
+    for member in connection_pool.members:
+        member.token = Token("test_token")
+        member.get_data = MagicMock(return_value=response(200))
+    return connection_pool
+
+
+class TestConnectionPool:
+    """Test ConnectionPool functionality."""
+
+    def test_routes_to_member_with_most_budget(self, pool):
+        """Test that requests go to the credential with the most quota left."""
+        pool.members[0].limiter.upper_limit = 10
+        pool.members[1].limiter.upper_limit = 250
+        pool.members[2].limiter.upper_limit = 100
+
+        pool.download_data("meta")
+
+        pool.members[1].get_data.assert_called_once()
+        assert pool.members[1].limiter.upper_limit == 249
+
+    def test_spreads_requests_across_members(self, pool):
+        """Test that each member's quota is drawn down evenly."""
+        for _ in range(30):
+            pool.download_data("meta")
+
+        assert [m.get_data.call_count for m in pool.members] == [10, 10, 10]
+
+    def test_fails_over_on_rate_limit(self, pool):
+        """Test that a 429 from one credential is retried on another and that member is avoided."""
+        pool.members[0].limiter.upper_limit = 300
+        pool.members[1].limiter.upper_limit = 200
+        pool.members[2].limiter.upper_limit = 100
+        pool.members[0].get_data.return_value = response(429)
+
+        assert pool.download_data("meta").status_code == 200
+        pool.members[1].get_data.assert_called_once()
+        assert pool.members[0].limiter.upper_limit == 0
+
+    def test_all_members_failing_raises_last_error(self, pool):
+        """Test that the last failure is raised once every credential has been tried."""
+        for member in pool.members:
+            member.get_data.return_value = response(401)
+
+        with pytest.raises(AuthenticationError):
+            pool.download_data("meta")
+        assert all(m.get_data.call_count == 1 for m in pool.members)
+
+    def test_other_errors_are_not_retried(self, pool):
+        """Test that an error other than 401 or 429 is raised without trying another credential."""
+        for member in pool.members:
+            member.get_data.return_value = response(500)
+
+        with pytest.raises(APIError):
+            pool.download_data("meta")
+        assert sum(m.get_data.call_count for m in pool.members) == 1
@@ -0,0 +1,88 @@
+"""Unit tests for records module."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.openSkills import SkillsClassificationConnection
+from pyghtcast.records import ExtractedSkill, Skill, SkillTable
+
+SKILLS = [
+    {"id": "KS1", "name": "Python", "type": {"id": "ST1", "name": "Specialized Skill"}, "infoUrl": "https://x/KS1"},
+    {"id": "KS2", "name": "Teamwork", "type": {"id": "ST2", "name": "Common Skill"}, "infoUrl": "https://x/KS2"},
+    {"id": "KS3", "name": "SQL", "type": {"id": "ST1", "name": "Specialized Skill"}, "infoUrl": "https://x/KS3"},
+]
+
+
+@pytest.fixture
+def conn():
+    """Create a SkillsClassificationConnection without contacting the auth server."""
+    with patch.object(SkillsClassificationConnection, "get_new_token"):
+        connection = SkillsClassificationConnection("test_user", "test_pass")
+    connection.download_data = MagicMock()
+    return connection
+
+
+class TestSkillTable:
+    """Test SkillTable functionality."""
+
+    def test_types_stored_once(self):
+        """Test that each distinct type is stored once and referenced by code."""
+        table = SkillTable.from_json(SKILLS)
+
+        assert len(table) == 3
+        assert table.types == [("ST1", "Specialized Skill"), ("ST2", "Common Skill")]
+        assert list(table.type_codes) == [0, 1, 0]
+        assert table[2] == Skill("KS3", "SQL", "ST1", "Specialized Skill", "https://x/KS3")
+
+    def test_to_df(self):
+        """Test that the DataFrame form has categorical type columns."""
+        df = SkillTable.from_json(SKILLS).to_df()
+
+        assert df["type_name"].dtype == "category"
+        assert df["id"].tolist() == ["KS1", "KS2", "KS3"]
+
+
+class TestReturnFormat:
+    """Test the return_format option of the skills connection."""
+
+    def test_list_all_skills_records(self, conn):
+        """Test that skills listings can be returned as Skill records."""
+        conn.download_data.return_value.json.return_value = {"data": SKILLS}
+
+        skills = conn.get_list_all_skills(return_format="records")
+
+        assert skills[0] == Skill("KS1", "Python", "ST1", "Specialized Skill", "https://x/KS1")
+
+    def test_extract_table_keeps_confidence(self, conn):
+        """Test that extraction results keep their confidence in both compact forms."""
+        conn.download_data.return_value.json.return_value = {
+            "data": [{"skill": SKILLS[0], "confidence": 0.9}, {"skill": SKILLS[1], "confidence": 0.6}]
+        }
+
+        table = conn.post_extract("python and teamwork", return_format="table")
+        records = conn.post_extract("python and teamwork", return_format="records")
+
+        assert list(table.confidences) == [0.9, 0.6]
+        assert records[1] == ExtractedSkill(Skill("KS2", "Teamwork", "ST2", "Common Skill", "https://x/KS2"), 0.6)
+
+    def test_unknown_format(self, conn):
+        """Test that an unknown format is rejected."""
+        conn.download_data.return_value.json.return_value = {"data": SKILLS}
+
+        with pytest.raises(ValueError, match="Unknown return_format"):
+            conn.get_list_all_skills(return_format="xml")
+        with pytest.raises(ValueError, match="Unknown return_format"):
+            conn.post_extract("python", return_format="xml")
+        conn.download_data.assert_not_called()
+
+    def test_missing_confidences_are_nan(self, conn):
+        """Test that skills without a confidence keep the confidences aligned with the skills."""
+        conn.download_data.return_value.json.return_value = {
+            "data": [{"skill": SKILLS[0]}, {"skill": SKILLS[1], "confidence": 0.6}, {"skill": SKILLS[0]}]
+        }
+
+        table = conn.post_extract("python and teamwork", return_format="table")
+
+        assert len(table.confidences) == len(table) == 3
+        assert table.to_df()["confidence"].isna().tolist() == [True, False, True]
@@ -0,0 +1,99 @@
+"""Unit tests for rollup module."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyghtcast.rollup import HierarchyRollup, query_levels
+
+pd = pytest.importorskip("pandas")
+
+HIERARCHY = pd.DataFrame(
+    [
+        {"child": "0", "parent": "0", "name": "US", "level_name": "1", "display_id": "0"},
+        {"child": "48", "parent": "0", "name": "Texas", "level_name": "2", "display_id": "48"},
+        {"child": "48113", "parent": "48", "name": "Dallas", "level_name": "3", "display_id": "48113"},
+        {"child": "48439", "parent": "48", "name": "Tarrant", "level_name": "3", "display_id": "48439"},
+        {"child": "75001", "parent": "48113", "name": "Addison", "level_name": "4", "display_id": "75001"},
+        {"child": "75002", "parent": "48113", "name": "Allen", "level_name": "4", "display_id": "75002"},
+        {"child": "76101", "parent": "48439", "name": "Fort Worth", "level_name": "4", "display_id": "76101"},
+    ]
+)
+
+FINE = pd.DataFrame(
+    {
+        "Area": ["75001", "75002", "76101", "75001"],
+        "Occupation": ["15-1252", "15-1252", "15-1252", "11-1021"],
+        "Jobs.2023": [10.0, 20.0, 5.0, 1.0],
+    }
+)
+
+
+class TestHierarchyRollup:
+    """Test HierarchyRollup functionality."""
+
+    def test_sums_to_each_level(self):
+        """Test that ZIP rows are summed to counties and states, keeping other dimensions."""
+        rollup = HierarchyRollup(HIERARCHY)
+
+        counties = rollup.rollup(FINE, "Area", 3)
+        states = rollup.rollup(FINE, "Area", 2)
+
+        assert sorted(counties.itertuples(index=False, name=None)) == [
+            ("48113", "11-1021", 1.0),
+            ("48113", "15-1252", 30.0),
+            ("48439", "15-1252", 5.0),
+        ]
+        assert states.loc[states["Occupation"] == "15-1252", "Jobs.2023"].item() == 35.0
+
+    def test_levels_from_depth_without_level_names(self):
+        """Test that levels are derived from the parent links when the hierarchy has no numeric level names."""
+        rollup = HierarchyRollup(HIERARCHY.drop(columns="level_name"))
+
+        assert rollup.levels.tolist() == [1, 2, 3, 3, 4, 4, 4]
+
+    def test_unknown_member(self):
+        """Test that values missing from the hierarchy are reported."""
+        with pytest.raises(KeyError, match="99999"):
+            HierarchyRollup(HIERARCHY).rollup(pd.DataFrame({"Area": ["99999"], "Jobs.2023": [1.0]}), "Area", 3)
+
+
+class TestQueryLevels:
+    """Test query_levels functionality."""
+
+    def test_additive_metrics_use_one_pull(self):
+        """Test that coarser levels of an additive metric are served without more queries."""
+        conn = MagicMock()
+        conn.post_retrieve_df.return_value = FINE
+        conn.get_dimension_hierarchy_df.return_value = HIERARCHY
+        payload = {
+            "metrics": [{"name": "Jobs.2023"}],
+            "constraints": [{"dimensionName": "Area", "mapLevel": {"level": 4, "predicate": ["48"]}}],
+        }
+
+        results = query_levels(conn, "emsi.us.occupation", payload, "2025.3", "Area", [2, 3])
+
+        assert set(results) == {2, 3, 4}
+        conn.post_retrieve_df.assert_called_once()
+
+    def test_partially_covered_ancestors_are_queried(self):
+        """Test that only ancestors whose children are all in the pull are rolled up, and the rest come from the API."""
+        dallas = FINE[FINE["Area"].isin(["75001", "75002"])]
+        texas = pd.DataFrame({"Area": ["48", "48"], "Occupation": ["15-1252", "11-1021"], "Jobs.2023": [900.0, 40.0]})
+        conn = MagicMock()
+        conn.post_retrieve_df.side_effect = [dallas, texas]
+        conn.get_dimension_hierarchy_df.return_value = HIERARCHY
+        payload = {
+            "metrics": [{"name": "Jobs.2023"}],
+            "constraints": [{"dimensionName": "Area", "mapLevel": {"level": 4, "predicate": ["48113"]}}],
+        }
+
+        results = query_levels(conn, "emsi.us.occupation", payload, "2025.3", "Area", [2, 3])
+
+        assert sorted(results[3].itertuples(index=False, name=None)) == [
+            ("48113", "11-1021", 1.0),
+            ("48113", "15-1252", 30.0),
+        ]
+        assert results[2].loc[results[2]["Occupation"] == "15-1252", "Jobs.2023"].item() == 900.0
+        texas_query = conn.post_retrieve_df.call_args_list[1].args[1]
+        assert texas_query["constraints"][0]["mapLevel"] == {"level": 2, "predicate": ["48"]}
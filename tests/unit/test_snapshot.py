@@ -0,0 +1,96 @@
+"""Tests for memory-mapped hierarchy and taxonomy snapshots."""
+
+import os
+import stat
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyghtcast import snapshot
+
+pa = pytest.importorskip("pyarrow")
+
+HIERARCHY = {
+    "hierarchy": [
+        {"child": "0", "parent": None, "name": "United States", "level_name": "1", "display_id": "0"},
+        {"child": "48", "parent": "0", "name": "Texas", "level_name": "2", "display_id": "48"},
+        {"child": 48113, "parent": "48", "name": "Dallas County", "level_name": "3", "display_id": "48113"},
+    ]
+}
+
+
+class TestHierarchySnapshot:
+    """Tests for hierarchy snapshots."""
+
+    def test_round_trip(self, tmp_path):
+        """Test a hierarchy is written and mapped back with its metadata."""
+        conn = MagicMock()
+        conn.get_meta_dataset_dimension.return_value = HIERARCHY
+        path = str(tmp_path / "area.arrow")
+
+        snapshot.save_hierarchy(conn, "emsi.us.occupation", "Area", "2025.3", path)
+        table = snapshot.open_snapshot(path)
+
+        conn.get_meta_dataset_dimension.assert_called_once_with("emsi.us.occupation", "Area", "2025.3")
+        assert table.column_names == list(snapshot.HIERARCHY_COLUMNS)
+        assert table.column("child").to_pylist() == ["0", "48", "48113"]
+        assert table.column("parent").to_pylist() == [None, "0", "48"]
+        assert snapshot.snapshot_metadata(table) == {
+            "kind": "hierarchy",
+            "dataset": "emsi.us.occupation",
+            "dimension": "Area",
+            "datarun": "2025.3",
+        }
+
+    def test_file_mode_follows_umask(self, tmp_path):
+        """Test a snapshot gets the permissions of a normally created file, not mkstemp's owner-only mode."""
+        old_umask = os.umask(0o022)
+        try:
+            path = str(tmp_path / "skills.arrow")
+            snapshot.write_snapshot(path, {"id": ["KS1"]})
+        finally:
+            os.umask(old_umask)
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    def test_buffers_are_mapped(self, tmp_path):
+        """Test opening a snapshot allocates no heap memory for its data."""
+        path = str(tmp_path / "big.arrow")
+        snapshot.write_snapshot(path, {"name": [f"member {i}" for i in range(100_000)]})
+
+        before = pa.total_allocated_bytes()
+        table = snapshot.open_snapshot(path)
+        assert pa.total_allocated_bytes() - before < 1024
+        assert table.num_rows == 100_000
+
+    def test_to_df(self, tmp_path):
+        """Test the DataFrame view keeps pyarrow-backed columns."""
+        path = str(tmp_path / "area.arrow")
+        snapshot.write_snapshot(path, {"child": ["1", "2"], "name": ["a", None]})
+
+        df = snapshot.to_df(snapshot.open_snapshot(path))
+        assert list(df["child"]) == ["1", "2"]
+        assert str(df["name"].dtype).startswith("string[pyarrow]")
+
+
+class TestSkillTaxonomySnapshot:
+    """Tests for skill taxonomy snapshots."""
+
+    def test_flattens_skill_types(self, tmp_path):
+        """Test skills are flattened into columns."""
+        conn = MagicMock()
+        conn.get_list_all_skills.return_value = {
+            "data": [
+                {"id": "KS1", "name": "Python", "type": {"id": "ST1", "name": "Specialized Skill"}, "infoUrl": "u"},
+                {"id": "KS2", "name": "Teamwork"},
+            ]
+        }
+        path = str(tmp_path / "skills.arrow")
+
+        snapshot.save_skill_taxonomy(conn, path, version="9.0")
+        table = snapshot.open_snapshot(path)
+
+        conn.get_list_all_skills.assert_called_once_with(version="9.0")
+        assert table.column("id").to_pylist() == ["KS1", "KS2"]
+        assert table.column("type_name").to_pylist() == ["Specialized Skill", None]
+        assert snapshot.snapshot_metadata(table) == {"kind": "skills", "version": "9.0"}
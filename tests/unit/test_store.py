@@ -0,0 +1,111 @@
+"""Unit tests for store module."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pyghtcast.coreLmi import CoreLMIConnection
+from pyghtcast.lightcast import Lightcast
+from pyghtcast.store import ResultStore, query_hash
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+
+def query(metrics, area):
+    return {
+        "metrics": [{"name": m} for m in metrics],
+        "constraints": [{"dimensionName": "Area", "mapLevel": {"level": 4, "predicate": [area]}}],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store holding pulls for two counties and two dataruns, with different metrics."""
+    result_store = ResultStore(str(tmp_path), row_group_size=2)
+    result_store.put(
+        "emsi.us.occupation",
+        "2025.3",
+        query(["Jobs.2023"], "48113"),
+        pd.DataFrame({"Area": ["ZIP75002", "ZIP75001", "ZIP75003"], "Jobs.2023": [2.0, 1.0, 3.0]}),
+    )
+    result_store.put(
+        "emsi.us.occupation",
+        "2025.3",
+        query(["Jobs.2023", "Jobs.2024"], "48439"),
+        pd.DataFrame({"Area": ["ZIP76101"], "Jobs.2023": [5.0], "Jobs.2024": [6.0]}),
+    )
+    result_store.put(
+        "emsi.us.occupation",
+        "2025.4",
+        query(["Jobs.2023"], "48113"),
+        pd.DataFrame({"Area": ["ZIP75001"], "Jobs.2023": [1.5]}),
+    )
+    return result_store
+
+
+class TestResultStore:
+    """Test ResultStore functionality."""
+
+    def test_round_trip(self, store):
+        """Test that a stored pull is found again by its query, sorted by dimension."""
+        df = store.get("emsi.us.occupation", "2025.3", query(["Jobs.2023"], "48113"))
+
+        assert df["Area"].tolist() == ["ZIP75001", "ZIP75002", "ZIP75003"]
+        assert store.get("emsi.us.occupation", "2025.3", query(["Jobs.2030"], "48113")) is None
+
+    def test_query_across_pulls(self, store):
+        """Test that filters and projection apply across every pull, with a unified schema."""
+        df = store.query(
+            columns=["Area", "Jobs.2023", "Jobs.2024", "datarun"],
+            filters=[("Jobs.2023", ">=", 2.0)],
+            dataset="emsi.us.occupation",
+        )
+
+        assert sorted(df["Area"]) == ["ZIP75002", "ZIP75003", "ZIP76101"]
+        assert df.loc[df["Area"] == "ZIP76101", "Jobs.2024"].item() == 6.0
+        assert set(df["datarun"]) == {"2025.3"}
+
+    def test_partition_filter(self, store):
+        """Test that restricting to one datarun only reads that datarun's pulls."""
+        df = store.query(filters={"Area": ["ZIP75001"]}, dataset="emsi.us.occupation", datarun="2025.4")
+
+        assert df["Jobs.2023"].tolist() == [1.5]
+
+    def test_query_hash_ignores_key_order(self):
+        """Test that the same query hashes the same regardless of key order."""
+        assert query_hash({"a": 1, "b": [1, 2]}) == query_hash({"b": [1, 2], "a": 1})
+
+    def test_missing_dimension_values_stay_missing(self, tmp_path):
+        """Test that a missing dimension value is stored as null rather than the text "nan"."""
+        result_store = ResultStore(str(tmp_path))
+        payload = query(["Jobs.2023"], "48113")
+        result_store.put("emsi.us.occupation", "2025.3", payload, pd.DataFrame({"Area": ["ZIP75001", None]}))
+
+        df = result_store.get("emsi.us.occupation", "2025.3", payload)
+
+        assert df["Area"].isna().tolist() == [False, True]
+        directory = result_store.path("emsi.us.occupation", "2025.3", payload)
+        with open(f"{directory}/_query.json") as f:
+            assert json.load(f) == payload
+
+
+class TestLightcastStore:
+    """Test Lightcast.query_corelmi with a result store."""
+
+    def test_miss_and_hit_return_the_same_frame(self, tmp_path):
+        """Test that the first (fetched) answer matches later answers read from the store."""
+        with patch.object(CoreLMIConnection, "get_new_token"):
+            lc = Lightcast("user", "pass", store_dir=str(tmp_path))
+        lc.conn.post_retrieve_df = MagicMock(
+            return_value=pd.DataFrame({"Area": [75002, 75001], "Jobs.2023": [2.0, 1.0]})
+        )
+        payload = query(["Jobs.2023"], "48113")
+
+        fetched = lc.query_corelmi("emsi.us.occupation", payload)
+        stored = lc.query_corelmi("emsi.us.occupation", payload)
+
+        lc.conn.post_retrieve_df.assert_called_once()
+        pd.testing.assert_frame_equal(fetched, stored)
+        assert fetched["Area"].tolist() == ["75001", "75002"]
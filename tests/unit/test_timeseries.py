@@ -0,0 +1,61 @@
+"""Unit tests for timeseries module."""
+
+import pytest
+
+from pyghtcast import timeseries
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def wide():
+    """A wide Core LMI result with two areas and two metrics over two years."""
+    return pd.DataFrame(
+        {
+            "Area": ["48113", "48439"],
+            "Jobs.2023": [100.0, 0.0],
+            "Jobs.2033": [121.0, 10.0],
+            "Openings.2023": [5.0, 6.0],
+        }
+    )
+
+
+class TestExpandMetrics:
+    """Test expand_metrics functionality."""
+
+    def test_metric_major_order(self):
+        """Test that each metric is expanded over every year in turn."""
+        assert timeseries.expand_metrics(["Jobs", "Openings"], range(2023, 2025)) == [
+            "Jobs.2023",
+            "Jobs.2024",
+            "Openings.2023",
+            "Openings.2024",
+        ]
+
+
+class TestToLong:
+    """Test to_long functionality."""
+
+    def test_one_row_per_cell(self, wide):
+        """Test that every metric-year cell becomes a typed row."""
+        long = timeseries.to_long(wide)
+
+        assert list(long.columns) == ["Area", "metric", "year", "value"]
+        assert len(long) == 6
+        assert long["Area"].dtype == "category"
+        assert long["year"].dtype == np.int16
+        row = long[(long["Area"] == "48439") & (long["metric"] == "Jobs") & (long["year"] == 2033)]
+        assert row["value"].item() == 10.0
+
+
+class TestGrowth:
+    """Test change, pct_change and cagr."""
+
+    def test_cagr_and_change(self, wide):
+        """Test the growth measures, with NaN where the start value is zero."""
+        assert timeseries.change(wide, "Jobs", 2023, 2033).tolist() == [21.0, 10.0]
+        cagr = timeseries.cagr(wide, "Jobs", 2023, 2033)
+        assert cagr[0] == pytest.approx(1.21 ** (1 / 10) - 1)
+        assert np.isnan(cagr[1])
+        assert np.isnan(timeseries.pct_change(wide, "Jobs", 2023, 2033)[1])
@@ -0,0 +1,98 @@
+"""Tests for compressed transfers, transfer stats and raw response bodies."""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pyghtcast.base import Token
+from pyghtcast.coreLmi import CoreLMIConnection
+from pyghtcast.exceptions import APIError
+
+BODY = json.dumps({"data": [{"name": "Area", "rows": ["48"] * 2000}]}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.accept_encoding = self.headers.get("Accept-Encoding")
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.startswith("/missing"):
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        compressed = gzip.compress(BODY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(compressed)))
+        self.end_headers()
+        self.wfile.write(compressed)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """A local API that always answers with a gzipped body."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def conn(server):
+    """A CoreLMIConnection pointed at the local API."""
+    connection = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+    connection.token = Token("test_token")
+    connection.base_url = f"http://127.0.0.1:{server.server_port}/"
+    return connection
+
+
+class TestCompressedTransfer:
+    """Tests for content negotiation and transfer stats."""
+
+    def test_requests_compression_and_counts_bytes(self, conn, server):
+        """Test that compression is requested and both wire and decoded sizes are counted."""
+        data = conn.post_retrieve_data("emsi.us.occupation", {"metrics": []}, "2025.3")
+
+        assert data["data"][0]["rows"][0] == "48"
+        assert "gzip" in server.accept_encoding
+        assert conn.transfer_stats.responses == 1
+        assert conn.transfer_stats.wire_bytes == len(gzip.compress(BODY))
+        assert conn.transfer_stats.decoded_bytes == len(BODY)
+        assert conn.transfer_stats.ratio > 10
+
+
+class TestRawMode:
+    """Tests for raw response bodies."""
+
+    def test_returns_decoded_bytes(self, conn):
+        """Test that the raw body is returned without JSON decoding."""
+        assert conn.post_retrieve_raw("emsi.us.occupation", {}, "2025.3") == BODY
+        assert conn.limiter.upper_limit == 299
+
+    def test_streams_compressed_body_to_file(self, conn, tmp_path):
+        """Test that the body can be written to disk exactly as sent."""
+        path = tmp_path / "result.json.gz"
+
+        written = conn.post_retrieve_raw("emsi.us.occupation", {}, "2025.3", path=str(path), decode_content=False)
+
+        assert written == path.stat().st_size
+        assert gzip.decompress(path.read_bytes()) == BODY
+        assert conn.transfer_stats.decoded_bytes == written
+
+    def test_error_is_raised_before_writing(self, conn, tmp_path):
+        """Test that a failed request raises instead of writing the error body."""
+        path = tmp_path / "result.json"
+
+        with pytest.raises(APIError):
+            conn.download_raw("missing", {}, path=str(path))
+        assert not path.exists()
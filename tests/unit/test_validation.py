@@ -0,0 +1,102 @@
+"""Unit tests for validation module."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from pyghtcast.validation import QueryValidationError, validate_query
+
+DATASET_INFO = {
+    "dimensions": [{"name": "Area"}, {"name": "Occupation"}],
+    "metrics": [{"name": "Jobs.2023"}, {"name": "Jobs.2033"}, {"name": "Earnings", "years": [2022, 2023]}],
+}
+
+HIERARCHY = {
+    "hierarchy": [
+        {"child": "0", "parent": "0", "name": "All", "level_name": "1", "display_id": "0"},
+        {"child": "48", "parent": "0", "name": "Texas", "level_name": "2", "display_id": "48"},
+        {"child": "48113", "parent": "48", "name": "Dallas", "level_name": "3", "display_id": "48113"},
+    ]
+}
+
+
+@pytest.fixture
+def conn():
+    """A connection whose metadata calls answer from fixed responses."""
+    connection = MagicMock()
+    connection.get_meta_dataset.return_value = DATASET_INFO
+    connection.get_meta_dataset_dimension.return_value = HIERARCHY
+    return connection
+
+
+def query(metrics, constraints=None):
+    return {"metrics": [{"name": m} for m in metrics], "constraints": constraints or []}
+
+
+class TestValidateQuery:
+    """Test validate_query functionality."""
+
+    def test_valid_query_passes(self, conn):
+        """Test that a query matching the metadata raises nothing."""
+        constraints = [{"dimensionName": "Area", "mapLevel": {"level": 3, "predicate": ["48"]}}]
+        validate_query(conn, "emsi.us.occupation", query(["Jobs.2023", "Earnings.2022"], constraints), "2025.3")
+
+    def test_numeric_string_level_passes(self, conn):
+        """Test that a level given as a numeric string is checked as a number."""
+        constraints = [{"dimensionName": "Area", "mapLevel": {"level": "3", "predicate": ["48"]}}]
+        validate_query(conn, "emsi.us.occupation", query(["Jobs.2023"], constraints), "2025.3")
+
+        constraints = [{"dimensionName": "Area", "mapLevel": {"level": "7", "predicate": ["48"]}}]
+        with pytest.raises(QueryValidationError, match="level 7 does not exist"):
+            validate_query(conn, "emsi.us.occupation", query(["Jobs.2023"], constraints), "2025.3")
+
+    def test_levels_come_from_level_name(self, conn):
+        """Test that levels are read from level_name, and not checked when the hierarchy does not number them all."""
+        numbered = {"hierarchy": [dict(record, level=9) for record in HIERARCHY["hierarchy"]]}
+        conn.get_meta_dataset_dimension.return_value = numbered
+        constraints = [{"dimensionName": "Area", "mapLevel": {"level": 9, "predicate": ["48"]}}]
+        with pytest.raises(QueryValidationError, match="level 9 does not exist"):
+            validate_query(conn, "emsi.us.occupation", query(["Jobs.2023"], constraints), "2025.3")
+
+        named = {"hierarchy": [dict(record, level_name="State") for record in HIERARCHY["hierarchy"]]}
+        conn.get_meta_dataset_dimension.return_value = named
+        validate_query(conn, "emsi.us.occupation", query(["Jobs.2023"], constraints), "2025.3")
+
+    def test_unknown_metric_suggests_close_match(self, conn):
+        """Test that a misspelled metric is reported with a suggestion."""
+        with pytest.raises(QueryValidationError) as exc_info:
+            validate_query(conn, "emsi.us.occupation", query(["Jobs.2034"]), "2025.3")
+
+        assert exc_info.value.errors == ["unknown metric 'Jobs.2034' (did you mean 'Jobs.2033', 'Jobs.2023'?)"]
+
+    def test_metric_year_out_of_range(self, conn):
+        """Test that a year outside a metric's available years is reported."""
+        with pytest.raises(QueryValidationError, match="Earnings is available for 2022-2023"):
+            validate_query(conn, "emsi.us.occupation", query(["Earnings.2030"]), "2025.3")
+
+    def test_collects_every_problem(self, conn):
+        """Test that dimension, level and predicate errors are all reported together."""
+        constraints = [
+            {"dimensionName": "Industry", "mapLevel": {"level": 2, "predicate": ["54"]}},
+            {"dimensionName": "Area", "mapLevel": {"level": 7, "predicate": ["99999"]}},
+        ]
+        with pytest.raises(QueryValidationError) as exc_info:
+            validate_query(conn, "emsi.us.occupation", query(["Jobs.2023"], constraints), "2025.3")
+
+        assert exc_info.value.errors == [
+            "unknown dimension 'Industry'",
+            "Area: level 7 does not exist (levels are 1-3)",
+            "Area: unknown member(s) '99999'",
+        ]
+
+    def test_no_request_sent_when_invalid(self):
+        """Test that post_retrieve_df fails before sending an invalid query."""
+        from pyghtcast.coreLmi import CoreLMIConnection
+
+        connection = CoreLMIConnection("test_user", "test_pass", authenticate=False)
+        connection.get_meta_dataset = MagicMock(return_value=DATASET_INFO)
+        connection.download_data = MagicMock()
+
+        with pytest.raises(QueryValidationError):
+            connection.post_retrieve_df("emsi.us.occupation", query(["Jobz.2023"]), "2025.3", validate=True)
+        connection.download_data.assert_not_called()